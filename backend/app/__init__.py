@@ -14,12 +14,13 @@ migrate = Migrate()
 jwt = JWTManager()
 
 
-def create_app(config_name='development'):
+def create_app(config_name='development', overrides=None):
     """
     Create and configure the Flask application
     
     Args:
         config_name (str): Configuration environment (development, production, testing)
+        overrides (dict): Settings applied on top of the environment's
     
     Returns:
         Flask: Configured Flask application
@@ -28,6 +29,10 @@ def create_app(config_name='development'):
     
     # Load configuration
     app.config.from_object(config[config_name])
+    app.config.update(overrides or {})
+    
+    from app.utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions
     db.init_app(app)
@@ -35,6 +40,21 @@ def create_app(config_name='development'):
     jwt.init_app(app)
     CORS(app)
     
+    from app.utils.pubsub import init_broker
+    from app.utils.password_hasher import init_password_hasher
+    from app.utils.payment_gateway import init_payment_gateway
+    init_broker(app)
+    init_password_hasher(app)
+    init_payment_gateway(app)
+    
+    # Per-request SQL statistics and profiling
+    from app.middleware.query_profiler import init_query_profiler
+    init_query_profiler(app)
+    
+    # Negotiated gzip/brotli response compression
+    from app.middleware.compression import init_compression
+    init_compression(app)
+    
     # Register blueprints
     from app.api.v1 import api_v1_bp
     app.register_blueprint(api_v1_bp, url_prefix='/api/v1')
@@ -43,4 +63,20 @@ def create_app(config_name='development'):
     from app.utils.error_handlers import register_error_handlers
     register_error_handlers(app)
     
+    # CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Background tasks
+    from app.services.location_service import start_location_flusher
+    from app.services.dispatch_service import start_dispatcher
+    from app.services.mpesa_callback_service import start_callback_workers
+    from app.services.reconciliation_service import start_payment_reconciler
+    from app.services.badge_service import start_badge_reconciler
+    start_location_flusher(app)
+    start_dispatcher(app)
+    start_callback_workers(app)
+    start_payment_reconciler(app)
+    start_badge_reconciler(app)
+    
     return app
@@ -2,10 +2,11 @@
 Authentication Routes
 """
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.v1 import api_v1_bp
 from app.services.auth_service import AuthService
-from app.schemas.user_schema import UserSchema, LoginSchema
+from app.utils.password_hasher import HasherBusy
+from app.utils import serializers
 
 auth_service = AuthService()
 
@@ -18,8 +19,10 @@ def register():
         user = auth_service.register_user(data)
         return jsonify({
             'message': 'User registered successfully',
-            'user': UserSchema().dump(user)
+            'user': serializers.user.dump(user)
         }), 201
+    except HasherBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -31,6 +34,8 @@ def login():
         data = request.get_json()
         result = auth_service.login_user(data)
         return jsonify(result), 200
+    except HasherBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 401
 
@@ -39,9 +44,12 @@ def login():
 @jwt_required(refresh=True)
 def refresh():
     """Refresh access token"""
-    identity = get_jwt_identity()
-    access_token = create_access_token(identity=identity)
-    return jsonify({'access_token': access_token}), 200
+    try:
+        identity = get_jwt_identity()
+        access_token = auth_service.refresh_access_token(identity)
+        return jsonify({'access_token': access_token}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 401
 
 
 @api_v1_bp.route('/auth/forgot-password', methods=['POST'])
@@ -1,7 +1,7 @@
 """
 Chat Routes
 """
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.v1 import api_v1_bp
 from app.services.chat_service import ChatService
@@ -39,12 +39,63 @@ def get_messages(conversation_id):
     """Get messages in a conversation"""
     try:
         user_id = get_jwt_identity()
-        messages = chat_service.get_messages(user_id, conversation_id)
+        since_id = request.args.get('since_id', type=int)
+        if since_id is not None:
+            messages = chat_service.get_messages_since(
+                user_id,
+                conversation_id,
+                since_id,
+                limit=request.args.get('limit', type=int)
+            )
+            return jsonify(messages), 200
+        
+        messages = chat_service.get_messages(
+            user_id,
+            conversation_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int)
+        )
         return jsonify(messages), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 
+@api_v1_bp.route('/chat/conversations/<int:conversation_id>/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_messages(conversation_id):
+    """Stream new messages as Server-Sent Events"""
+    try:
+        user_id = get_jwt_identity()
+        since_id = request.args.get('since_id', type=int)
+        if since_id is None:
+            since_id = request.headers.get('Last-Event-ID', type=int)
+        events = chat_service.stream_messages(
+            user_id,
+            conversation_id,
+            since_id=since_id,
+            heartbeat=current_app.config['SSE_HEARTBEAT_SECONDS']
+        )
+        return Response(
+            stream_with_context(events),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@api_v1_bp.route('/chat/conversations/<int:conversation_id>/read', methods=['POST'])
+@jwt_required()
+def mark_conversation_read(conversation_id):
+    """Mark messages in a conversation as read"""
+    try:
+        user_id = get_jwt_identity()
+        chat_service.mark_conversation_read(user_id, conversation_id)
+        return jsonify({'message': 'Conversation marked as read'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
 @api_v1_bp.route('/chat/conversations/<int:conversation_id>/messages', methods=['POST'])
 @jwt_required()
 def send_message(conversation_id):
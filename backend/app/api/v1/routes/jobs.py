@@ -1,12 +1,14 @@
 """
 Jobs Routes
 """
-from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.api.v1 import api_v1_bp
 from app.services.job_service import JobService
+from app.services.export_service import ExportService
 
 job_service = JobService()
+export_service = ExportService()
 
 
 @api_v1_bp.route('/jobs', methods=['POST'])
@@ -28,7 +30,12 @@ def get_job(job_id):
     """Get job details"""
     try:
         user_id = get_jwt_identity()
-        job = job_service.get_job_by_id(job_id, user_id)
+        job = job_service.get_job_by_id(
+            job_id,
+            user_id,
+            fields=request.args.get('fields'),
+            view=request.args.get('view')
+        )
         return jsonify(job), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 404
@@ -65,7 +72,13 @@ def get_upcoming_jobs():
     """Get upcoming jobs for current user"""
     try:
         user_id = get_jwt_identity()
-        jobs = job_service.get_upcoming_jobs(user_id)
+        jobs = job_service.get_upcoming_jobs(
+            user_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            fields=request.args.get('fields'),
+            view=request.args.get('view')
+        )
         return jsonify(jobs), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -77,7 +90,13 @@ def get_job_history():
     """Get job history for current user"""
     try:
         user_id = get_jwt_identity()
-        jobs = job_service.get_job_history(user_id)
+        jobs = job_service.get_job_history(
+            user_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            fields=request.args.get('fields'),
+            view=request.args.get('view')
+        )
         return jsonify(jobs), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -89,7 +108,13 @@ def get_available_jobs():
     """Get available jobs for providers"""
     try:
         user_id = get_jwt_identity()
-        jobs = job_service.get_available_jobs(user_id)
+        jobs = job_service.get_available_jobs(
+            user_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            fields=request.args.get('fields'),
+            view=request.args.get('view')
+        )
         return jsonify(jobs), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -107,6 +132,18 @@ def accept_job(job_id):
         return jsonify({'error': str(e)}), 400
 
 
+@api_v1_bp.route('/jobs/<int:job_id>/decline', methods=['POST'])
+@jwt_required()
+def decline_job(job_id):
+    """Decline a job offer (for providers)"""
+    try:
+        user_id = get_jwt_identity()
+        job_service.decline_job(job_id, user_id)
+        return jsonify({'message': 'Job offer declined'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
 @api_v1_bp.route('/jobs/<int:job_id>/complete', methods=['POST'])
 @jwt_required()
 def complete_job(job_id):
@@ -130,3 +167,27 @@ def review_job(job_id):
         return jsonify(review), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
+
+
+@api_v1_bp.route('/jobs/export', methods=['GET'])
+@jwt_required()
+def export_jobs():
+    """Stream the user's jobs as CSV or NDJSON (?format=, as=client|provider, month= or from=/to=)"""
+    try:
+        user_id = get_jwt_identity()
+        side = request.args.get('as') or ('provider' if get_jwt().get('role') == 'provider' else 'client')
+        rows, mimetype, filename = export_service.export_jobs(
+            user_id,
+            side=side,
+            fmt=request.args.get('format', 'csv'),
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            month=request.args.get('month')
+        )
+        return Response(
+            stream_with_context(rows),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
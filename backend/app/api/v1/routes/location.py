@@ -37,6 +37,30 @@ def update_provider_location():
         return jsonify({'error': str(e)}), 500
 
 
+@api_v1_bp.route('/providers/location/batch', methods=['POST'])
+@jwt_required()
+def update_provider_location_batch():
+    """Update provider's location from several fixes buffered on the device"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        fixes = data.get('locations')
+        
+        if not isinstance(fixes, list) or not fixes:
+            return jsonify({'error': 'Missing locations'}), 400
+        
+        accepted = location_service.update_provider_locations(
+            provider_id=user_id,
+            fixes=fixes
+        )
+        
+        return jsonify({'message': 'Locations updated', 'accepted': accepted}), 200
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @api_v1_bp.route('/providers/nearby', methods=['POST'])
 @jwt_required()
 def find_nearby_providers():
@@ -48,6 +72,7 @@ def find_nearby_providers():
         longitude = data.get('longitude')
         service_type = data.get('serviceType')
         radius = data.get('radius', 10)  # Default 10km radius
+        limit = data.get('limit')  # Optional: only the k nearest
         
         if not all([latitude, longitude, service_type]):
             return jsonify({'error': 'Missing required fields'}), 400
@@ -56,7 +81,8 @@ def find_nearby_providers():
             latitude=latitude,
             longitude=longitude,
             service_type=service_type,
-            radius=radius
+            radius=radius,
+            limit=limit
         )
         
         return jsonify({'providers': providers}), 200
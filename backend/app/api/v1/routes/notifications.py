@@ -15,7 +15,13 @@ def get_notifications():
     """Get user notifications"""
     try:
         user_id = get_jwt_identity()
-        notifications = notification_service.get_notifications(user_id)
+        notifications = notification_service.get_notifications(
+            user_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            fields=request.args.get('fields'),
+            view=request.args.get('view')
+        )
         return jsonify(notifications), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -1,13 +1,17 @@
 """
 Payments Routes - M-Pesa, Card, and Cash payment processing
 """
-from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.api.v1 import api_v1_bp
 from app.services.payment_service import PaymentService
+from app.services.export_service import ExportService
+from app.services.mpesa_callback_service import MpesaCallbackService
 from app.services.invoice_service import InvoiceService
 
 payment_service = PaymentService()
+mpesa_callback_service = MpesaCallbackService()
+export_service = ExportService()
 invoice_service = InvoiceService()
 
 
@@ -88,22 +92,53 @@ def initiate_mpesa_payment():
 @api_v1_bp.route('/payments/mpesa/status/<transaction_id>', methods=['GET'])
 @jwt_required()
 def check_mpesa_status(transaction_id):
-    """Check M-Pesa payment status"""
+    """Check M-Pesa payment status; ?wait=N holds the request up to N seconds until it settles"""
     try:
-        status = payment_service.check_mpesa_payment_status(transaction_id)
+        user_id = get_jwt_identity()
+        status = payment_service.check_mpesa_payment_status(
+            transaction_id,
+            user_id,
+            wait=request.args.get('wait', 0, type=float)
+        )
         return jsonify(status), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_v1_bp.route('/payments/mpesa/status/<transaction_id>/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_mpesa_status(transaction_id):
+    """Stream M-Pesa payment status as Server-Sent Events until it settles"""
+    try:
+        user_id = get_jwt_identity()
+        events = payment_service.stream_mpesa_payment_status(
+            transaction_id,
+            user_id,
+            heartbeat=current_app.config['SSE_HEARTBEAT_SECONDS']
+        )
+        return Response(
+            stream_with_context(events),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @api_v1_bp.route('/payments/mpesa/callback', methods=['POST'])
 def mpesa_callback():
-    """M-Pesa callback endpoint"""
+    """M-Pesa callback endpoint; the payload is stored and applied in the background"""
     try:
-        data = request.get_json()
-        result = payment_service.handle_mpesa_callback(data)
-        return jsonify({'ResultCode': 0, 'ResultDesc': 'Success'}), 200
+        mpesa_callback_service.receive(request.get_data(as_text=True))
+        return jsonify({'ResultCode': 0, 'ResultDesc': 'Accepted'}), 200
+    except ValueError as e:
+        return jsonify({'ResultCode': 1, 'ResultDesc': str(e)}), 400
     except Exception as e:
+        # Not stored, so let Safaricom retry
         return jsonify({'ResultCode': 1, 'ResultDesc': str(e)}), 500
 
 
@@ -176,21 +211,24 @@ def confirm_cash_payment():
 @api_v1_bp.route('/payments/invoice/generate', methods=['POST'])
 @jwt_required()
 def generate_invoice():
-    """Generate invoice for a job"""
+    """Generate (or refresh) the invoice for a job"""
     try:
+        user_id = get_jwt_identity()
         data = request.get_json()
         job_id = data.get('jobId')
         
         if not job_id:
             return jsonify({'error': 'Job ID is required'}), 400
         
-        invoice = invoice_service.generate_invoice(job_id)
+        invoice = invoice_service.generate_invoice(job_id, user_id=user_id)
         
         if invoice:
             return jsonify({'invoice': invoice}), 200
         else:
             return jsonify({'error': 'Failed to generate invoice'}), 400
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -198,15 +236,26 @@ def generate_invoice():
 @api_v1_bp.route('/payments/invoice/<invoice_id>', methods=['GET'])
 @jwt_required()
 def get_invoice(invoice_id):
-    """Get invoice by ID"""
+    """Get invoice by ID or number; ?format=html or pdf returns the rendered document"""
     try:
-        invoice = invoice_service.get_invoice(invoice_id)
+        user_id = get_jwt_identity()
+        fmt = request.args.get('format', 'json')
+        if fmt != 'json':
+            rendered = invoice_service.get_rendered_invoice(invoice_id, user_id=user_id, fmt=fmt)
+            if not rendered:
+                return jsonify({'error': 'Invoice not found'}), 404
+            data, mimetype = rendered
+            return Response(data, mimetype=mimetype)
+        
+        invoice = invoice_service.get_invoice(invoice_id, user_id=user_id)
         
         if invoice:
             return jsonify({'invoice': invoice}), 200
         else:
             return jsonify({'error': 'Invoice not found'}), 404
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -260,7 +309,35 @@ def get_payment_history():
     """Get payment history"""
     try:
         user_id = get_jwt_identity()
-        history = payment_service.get_payment_history(user_id)
+        history = payment_service.get_payment_history(
+            user_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int)
+        )
         return jsonify(history), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
+
+
+@api_v1_bp.route('/payments/export', methods=['GET'])
+@jwt_required()
+def export_payments():
+    """Stream the user's payments as CSV or NDJSON (?format=, as=client|provider, month= or from=/to=)"""
+    try:
+        user_id = get_jwt_identity()
+        side = request.args.get('as') or ('provider' if get_jwt().get('role') == 'provider' else 'client')
+        rows, mimetype, filename = export_service.export_payments(
+            user_id,
+            side=side,
+            fmt=request.args.get('format', 'csv'),
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            month=request.args.get('month')
+        )
+        return Response(
+            stream_with_context(rows),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
@@ -1,10 +1,11 @@
 """
 Providers Routes
 """
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.v1 import api_v1_bp
-from app.services.provider_service import ProviderService
+from app.services.provider_service import ProviderService, profile_cache
+from app.utils.http_cache import cached_json_response
 
 provider_service = ProviderService()
 
@@ -24,8 +25,13 @@ def get_providers():
 def get_provider(provider_id):
     """Get provider details"""
     try:
-        provider = provider_service.get_provider_by_id(provider_id)
-        return jsonify(provider), 200
+        fields, view = request.args.get('fields'), request.args.get('view')
+        return cached_json_response(
+            profile_cache,
+            (provider_id, fields, view),
+            lambda: provider_service.get_provider_by_id(provider_id, fields=fields, view=view),
+            max_age=current_app.config['PROFILE_CACHE_MAX_AGE']
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
@@ -36,7 +42,7 @@ def get_provider_dashboard():
     """Get provider dashboard statistics"""
     try:
         user_id = get_jwt_identity()
-        stats = provider_service.get_dashboard_stats(user_id)
+        stats = provider_service.get_dashboard_stats(user_id, days=request.args.get('days', type=int))
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
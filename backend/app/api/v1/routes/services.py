@@ -1,10 +1,11 @@
 """
 Services Routes
 """
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.v1 import api_v1_bp
-from app.services.service_service import ServiceService
+from app.services.service_service import ServiceService, catalog_cache
+from app.utils.http_cache import cached_json_response
 
 service_service = ServiceService()
 
@@ -13,8 +14,13 @@ service_service = ServiceService()
 def get_services():
     """Get all available services"""
     try:
-        services = service_service.get_all_services()
-        return jsonify(services), 200
+        fields, view = request.args.get('fields'), request.args.get('view')
+        return cached_json_response(
+            catalog_cache,
+            ('services', fields, view),
+            lambda: service_service.get_all_services(fields=fields, view=view),
+            max_age=current_app.config['CATALOG_CACHE_MAX_AGE']
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -23,8 +29,13 @@ def get_services():
 def get_service(service_id):
     """Get service by ID"""
     try:
-        service = service_service.get_service_by_id(service_id)
-        return jsonify(service), 200
+        fields, view = request.args.get('fields'), request.args.get('view')
+        return cached_json_response(
+            catalog_cache,
+            ('service', service_id, fields, view),
+            lambda: service_service.get_service_by_id(service_id, fields=fields, view=view),
+            max_age=current_app.config['CATALOG_CACHE_MAX_AGE']
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
@@ -33,7 +44,11 @@ def get_service(service_id):
 def get_service_categories():
     """Get all service categories"""
     try:
-        categories = service_service.get_categories()
-        return jsonify(categories), 200
+        return cached_json_response(
+            catalog_cache,
+            ('categories',),
+            service_service.get_categories,
+            max_age=current_app.config['CATALOG_CACHE_MAX_AGE']
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -5,9 +5,11 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.v1 import api_v1_bp
 from app.services.user_service import UserService
-from app.schemas.user_schema import UserSchema
+from app.services.badge_service import BadgeService
+from app.utils import serializers
 
 user_service = UserService()
+badge_service = BadgeService()
 
 
 @api_v1_bp.route('/users/profile', methods=['GET'])
@@ -17,7 +19,7 @@ def get_profile():
     try:
         user_id = get_jwt_identity()
         user = user_service.get_user_by_id(user_id)
-        return jsonify(UserSchema().dump(user)), 200
+        return jsonify(serializers.user.dump(user)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
@@ -30,7 +32,19 @@ def update_profile():
         user_id = get_jwt_identity()
         data = request.get_json()
         user = user_service.update_user(user_id, data)
-        return jsonify(UserSchema().dump(user)), 200
+        return jsonify(serializers.user.dump(user)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@api_v1_bp.route('/me/badges', methods=['GET'])
+@jwt_required()
+def get_badges():
+    """Get unread notification and message counts"""
+    try:
+        user_id = get_jwt_identity()
+        badges = badge_service.get_badges(user_id)
+        return jsonify(badges), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -41,6 +55,6 @@ def get_user(user_id):
     """Get user by ID"""
     try:
         user = user_service.get_user_by_id(user_id)
-        return jsonify(UserSchema().dump(user)), 200
+        return jsonify(serializers.user.dump(user)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 404
@@ -0,0 +1,106 @@
+"""
+CLI Commands
+"""
+import click
+
+
+def register_commands(app):
+    """Register custom flask CLI commands"""
+    
+    @app.cli.command('check-indexes')
+    def check_indexes():
+        """Fail if a service query filters on columns with no supporting index"""
+        import app.models.user, app.models.service, app.models.job  # noqa: F401
+        import app.models.payment, app.models.notification, app.models.chat  # noqa: F401
+        import app.models.location, app.models.stats  # noqa: F401
+        from app.utils.index_check import check_service_indexes
+        
+        problems = check_service_indexes()
+        for problem in problems:
+            click.echo(problem, err=True)
+        if problems:
+            raise SystemExit(1)
+        click.echo('All service queries have a supporting index')
+    
+    @app.cli.command('check-query-counts')
+    def check_query_counts():
+        """Fail if listing conversations issues more queries for more conversations"""
+        from app import create_app, db
+        from app.utils.query_count_check import check_conversation_queries
+        
+        # A throwaway in-memory database, so the configured one is never touched
+        scratch = create_app('testing', {'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        with scratch.app_context():
+            db.create_all()
+            counts, problems = check_conversation_queries()
+        for problem in problems:
+            click.echo(problem, err=True)
+        if problems:
+            raise SystemExit(1)
+        click.echo('Conversation listing: ' +
+                   ', '.join(f'{size} conversations -> {n} queries' for size, n in counts.items()))
+    
+    @app.cli.command('reconcile-ratings')
+    @click.option('--batch-size', default=1000, show_default=True, help='Profiles per transaction')
+    def reconcile_ratings(batch_size):
+        """Recompute provider rating aggregates from the reviews table"""
+        from app.services.rating_service import RatingService
+        
+        checked, corrected = RatingService().reconcile(batch_size=batch_size, log=click.echo)
+        click.echo(f'Reconciled ratings: {checked} profiles checked, {corrected} corrected')
+    
+    @app.cli.command('reconcile-badges')
+    @click.option('--batch-size', default=1000, show_default=True, help='Counters per transaction')
+    def reconcile_badges(batch_size):
+        """Recount unread notification and message badges from the source tables"""
+        from app.services.badge_service import BadgeService
+        
+        checked, corrected = BadgeService().reconcile(batch_size=batch_size, log=click.echo)
+        click.echo(f'Reconciled badges: {checked} counters checked, {corrected} corrected')
+    
+    @app.cli.command('rebuild-dashboard-stats')
+    @click.option('--batch-size', default=500, show_default=True, help='Providers per transaction')
+    def rebuild_dashboard_stats(batch_size):
+        """Recompute provider daily rollups from jobs, payments and reviews"""
+        from app.services.stats_service import StatsService
+        
+        processed, written = StatsService().rebuild(batch_size=batch_size, log=click.echo)
+        click.echo(f'Rebuilt dashboard stats: {processed} providers, {written} rows')
+    
+    @app.cli.command('reconcile-payments')
+    @click.option('--min-age', type=int, help='Only payments unsettled for this many seconds')
+    @click.option('--batch-size', type=int, help='Payments per gateway batch')
+    @click.option('--concurrency', type=int, help='Gateway queries in flight')
+    def reconcile_payments(min_age, batch_size, concurrency):
+        """Settle M-Pesa payments stuck pending by asking the payment gateway"""
+        from app.services.reconciliation_service import ReconciliationService
+        
+        metrics = ReconciliationService().reconcile(
+            min_age=min_age, batch_size=batch_size, concurrency=concurrency, log=click.echo
+        )
+        click.echo(f'Reconciled payments in {metrics["seconds"]}s: ' +
+                   ', '.join(f'{value} {name}' for name, value in metrics.items() if name != 'seconds'))
+    
+    @app.cli.command('generate-invoices')
+    @click.option('--days', default=30, show_default=True, help='Jobs completed in the last N days')
+    def generate_invoices(days):
+        """Generate or refresh invoices for recently completed jobs on the background pool"""
+        from datetime import datetime, timedelta
+        from app import db
+        from app.models.job import Job
+        from app.services.invoice_service import InvoiceService
+        
+        job_ids = [job_id for (job_id,) in db.session.query(Job.id).filter(
+            Job.status == 'completed',
+            Job.completed_at >= datetime.utcnow() - timedelta(days=days)
+        ).order_by(Job.id)]
+        db.session.close()
+        
+        failed = 0
+        for job_id, future in zip(job_ids, InvoiceService().generate_invoices(job_ids)):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                click.echo(f'Job {job_id}: {e}', err=True)
+        click.echo(f'Generated {len(job_ids) - failed} invoices, {failed} failed')
@@ -3,7 +3,7 @@ Authentication Middleware
 """
 from functools import wraps
 from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 from app.models.user import User
 
 
@@ -22,10 +22,17 @@ def role_required(role):
         @wraps(fn)
         def wrapper(*args, **kwargs):
             verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
+            claims = get_jwt()
             
-            if not user or user.role != role:
+            if 'role' in claims:
+                # Role and status travel in the token; no database round-trip
+                user_role, is_active = claims['role'], claims.get('is_active', True)
+            else:
+                # Tokens minted before the claims were added
+                user = User.query.get(get_jwt_identity())
+                user_role, is_active = (user.role, user.is_active) if user else (None, False)
+            
+            if not is_active or user_role != role:
                 return jsonify({'error': 'Unauthorized', 'message': f'{role} access required'}), 403
             
             return fn(*args, **kwargs)
@@ -0,0 +1,139 @@
+"""
+Compression Middleware - negotiated gzip/brotli encoding of response bodies
+"""
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+}
+# Cached bodies are compressed once and reused, so spend more CPU on them
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 11
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data):
+        # Sync-flush every chunk so streamed events reach the client promptly
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+def compress(body, coding, level):
+    """Compress a complete body with the given content-coding"""
+    if coding == 'br':
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _compress_stream(chunks, coding, level):
+    stream = _BrotliStream(level) if coding == 'br' else _GzipStream(level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = stream.compress(chunk)
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        # Closing the wrapper must still close the wrapped body, e.g. to end
+        # a chat stream's pub/sub subscription
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _is_compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def _negotiate():
+    """Best content-coding the client accepts, or None for identity"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def init_compression(app):
+    """
+    Compress responses for clients that send Accept-Encoding
+
+    Bodies under COMPRESS_MIN_SIZE are left alone since framing overhead
+    would outweigh the saving. Streamed responses are compressed chunk by
+    chunk. Responses served from a ResponseCache (catalog, provider
+    profiles) keep their compressed variants next to the identity body, so
+    each is compressed once per revision.
+    """
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+    gzip_level = app.config.get('COMPRESS_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+            or not _is_compressible(response)
+            or 'no-transform' in (response.headers.get('Cache-Control') or '')
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        coding = _negotiate()
+        if coding is None or response.status_code == 304:
+            return response
+
+        if response.is_streamed:
+            level = brotli_quality if coding == 'br' else gzip_level
+            response.response = _compress_stream(response.response, coding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            if response.content_length is not None and response.content_length < min_size:
+                return response
+            cached = getattr(response, 'cached_body', None)
+            if cached is not None:
+                body = cached.variants.get(coding)
+                if body is None:
+                    level = CACHED_BROTLI_QUALITY if coding == 'br' else CACHED_GZIP_LEVEL
+                    body = cached.variants[coding] = compress(cached.body, coding, level)
+            else:
+                level = brotli_quality if coding == 'br' else gzip_level
+                body = compress(response.get_data(), coding, level)
+            response.set_data(body)
+
+        response.headers['Content-Encoding'] = coding
+        # The representation changed, so a strong validator must not be reused
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
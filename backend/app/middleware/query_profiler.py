@@ -0,0 +1,126 @@
+"""
+Query Profiler Middleware - per-request SQL statistics and sampled cProfile dumps
+"""
+import cProfile
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOWEST_KEPT = 3
+STATEMENT_PREVIEW = 200
+REQUEST_LOGGER = 'wirasasa.requests'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_stats' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'query_stats' in g):
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    stats = g.query_stats
+    stats['count'] += 1
+    stats['time'] += elapsed
+    entry = (elapsed, stats['count'], ' '.join(statement.split())[:STATEMENT_PREVIEW])
+    if len(stats['slowest']) < SLOWEST_KEPT:
+        heapq.heappush(stats['slowest'], entry)
+    else:
+        heapq.heappushpop(stats['slowest'], entry)
+
+
+def init_query_profiler(app):
+    """
+    Record query count, DB time and slowest statements for every request
+
+    Debug mode adds X-DB-* and Server-Timing response headers; otherwise one
+    JSON log line is written per request to the wirasasa.requests logger, at
+    WARNING when it ran a query slower than SLOW_QUERY_MS. That logger logs
+    INFO to stderr unless the deployment has configured handlers for it. A PROFILE_SAMPLE_RATE share of requests (or
+    any request sent with X-Profile: 1 in debug mode) is also run under
+    cProfile and dumped to PROFILE_DIR for flame graphs.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    # Flask's app.logger stops at WARNING, which would drop all but slow requests
+    request_logger = logging.getLogger(REQUEST_LOGGER)
+    if not request_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+        request_logger.addHandler(handler)
+        request_logger.setLevel(logging.INFO)
+        request_logger.propagate = False
+
+    slow_query_seconds = app.config.get('SLOW_QUERY_MS', 100) / 1000.0
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+
+    @app.before_request
+    def start_request_stats():
+        g.query_stats = {'count': 0, 'time': 0.0, 'slowest': []}
+        g.request_started = time.perf_counter()
+
+        forced = app.debug and request.headers.get('X-Profile') == '1'
+        if forced or (sample_rate and random.random() < sample_rate):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def emit_request_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+
+        total_ms = (time.perf_counter() - g.pop('request_started')) * 1000
+        db_ms = stats['time'] * 1000
+        route = request.url_rule.rule if request.url_rule else request.path
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            name = f'{int(time.time() * 1000)}-{request.method}-{request.endpoint or "unknown"}.prof'
+            profiler.dump_stats(os.path.join(profile_dir, name))
+
+        slowest = sorted(stats['slowest'], reverse=True)
+
+        if app.debug:
+            response.headers['X-DB-Query-Count'] = str(stats['count'])
+            response.headers['X-DB-Time-Ms'] = f'{db_ms:.2f}'
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_ms:.2f};desc="{stats["count"]} queries", app;dur={total_ms:.2f}'
+            )
+            if slowest:
+                response.headers['X-DB-Slowest-Ms'] = f'{slowest[0][0] * 1000:.2f}'
+            return response
+
+        record = {
+            'event': 'request',
+            'method': request.method,
+            'route': route,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'db_queries': stats['count'],
+            'db_time_ms': round(db_ms, 2),
+            'slowest': [
+                {'ms': round(elapsed * 1000, 2), 'statement': statement}
+                for elapsed, _, statement in slowest
+            ]
+        }
+        is_slow = bool(slowest) and slowest[0][0] >= slow_query_seconds
+        (request_logger.warning if is_slow else request_logger.info)(json.dumps(record))
+        return response
@@ -9,7 +9,7 @@ class Conversation(db.Model):
     __tablename__ = 'conversations'
     
     id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'))
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -28,9 +28,15 @@ class ConversationParticipant(db.Model):
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     user = db.relationship('User')
     
+    __table_args__ = (
+        db.Index('ix_conversation_participants_conversation_id_user_id', 'conversation_id', 'user_id'),
+        db.Index('ix_conversation_participants_user_id_conversation_id', 'user_id', 'conversation_id'),
+    )
+    
     def __repr__(self):
         return f'<ConversationParticipant {self.conversation_id}-{self.user_id}>'
 
@@ -50,5 +56,9 @@ class Message(db.Model):
     
     sender = db.relationship('User')
     
+    __table_args__ = (
+        db.Index('ix_messages_conversation_id_created_at', 'conversation_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Message {self.id}>'
@@ -42,6 +42,19 @@ class Job(db.Model):
     service = db.relationship('Service', backref='jobs')
     reviews = db.relationship('Review', backref='job', lazy=True)
     
+    __table_args__ = (
+        db.Index('ix_jobs_client_id_created_at', 'client_id', 'created_at', 'id'),
+        db.Index('ix_jobs_provider_id_created_at', 'provider_id', 'created_at', 'id'),
+        # Open job board: only pending jobs nobody has taken yet
+        db.Index('ix_jobs_pending_unassigned', 'created_at', 'id',
+                 postgresql_where=db.and_(status == 'pending', provider_id.is_(None)),
+                 sqlite_where=db.and_(status == 'pending', provider_id.is_(None))),
+        # Provider dashboard: jobs currently in hand
+        db.Index('ix_jobs_provider_id_active', 'provider_id',
+                 postgresql_where=status.in_(['accepted', 'in_progress']),
+                 sqlite_where=status.in_(['accepted', 'in_progress'])),
+    )
+    
     def __repr__(self):
         return f'<Job {self.id} - {self.status}>'
 
@@ -50,9 +63,9 @@ class Review(db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False, index=True)
     reviewer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    reviewee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    reviewee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     rating = db.Column(db.Integer, nullable=False)  # 1-5
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -60,5 +73,38 @@ class Review(db.Model):
     reviewer = db.relationship('User', foreign_keys=[reviewer_id])
     reviewee = db.relationship('User', foreign_keys=[reviewee_id])
     
+    __table_args__ = (
+        # One review per job per reviewer, so aggregates never count a review twice
+        db.UniqueConstraint('job_id', 'reviewer_id', name='uq_reviews_job_id_reviewer_id'),
+    )
+    
     def __repr__(self):
         return f'<Review {self.id} - Rating: {self.rating}>'
+
+
+class JobOffer(db.Model):
+    __tablename__ = 'job_offers'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    wave = db.Column(db.Integer, nullable=False, default=1)
+    score = db.Column(db.Float)
+    status = db.Column(db.String(20), nullable=False, default='offered')  # offered, accepted, declined, expired, withdrawn
+    offered_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    responded_at = db.Column(db.DateTime)
+    
+    job = db.relationship('Job', backref='offers')
+    
+    __table_args__ = (
+        db.Index('ix_job_offers_job_id_status', 'job_id', 'status'),
+        db.Index('ix_job_offers_provider_id_status', 'provider_id', 'status', 'expires_at'),
+        # Sweeper: live offers ordered by deadline
+        db.Index('ix_job_offers_live_expires_at', 'expires_at',
+                 postgresql_where=(status == 'offered'),
+                 sqlite_where=(status == 'offered')),
+    )
+    
+    def __repr__(self):
+        return f'<JobOffer {self.job_id}->{self.provider_id} - {self.status}>'
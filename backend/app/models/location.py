@@ -0,0 +1,19 @@
+"""
+Location Models
+"""
+from datetime import datetime
+from app import db
+
+
+class ProviderLocation(db.Model):
+    __tablename__ = 'provider_locations'
+    
+    # One row per provider holding only the latest coalesced fix
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    recorded_at = db.Column(db.DateTime, nullable=False)  # device time of the fix
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ProviderLocation {self.provider_id}>'
@@ -20,5 +20,25 @@ class Notification(db.Model):
     
     user = db.relationship('User', backref='notifications')
     
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', 'created_at', 'id'),
+        # Badge counts and mark-all-as-read only ever touch unread rows
+        db.Index('ix_notifications_user_id_unread', 'user_id',
+                 postgresql_where=(is_read == False),
+                 sqlite_where=(is_read == False)),
+    )
+    
     def __repr__(self):
         return f'<Notification {self.id} - {self.type}>'
+
+
+class UnreadCounter(db.Model):
+    __tablename__ = 'unread_counters'
+    
+    # Badge totals per user, kept in step with every notification/message write
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0)
+    unread_messages = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UnreadCounter {self.user_id}>'
@@ -9,7 +9,7 @@ class PaymentMethod(db.Model):
     __tablename__ = 'payment_methods'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     type = db.Column(db.String(20), nullable=False)  # card, mobile_money, etc.
     card_last_four = db.Column(db.String(4))
     card_brand = db.Column(db.String(20))
@@ -28,7 +28,7 @@ class Payment(db.Model):
     __tablename__ = 'payments'
     
     id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False, index=True)
     payer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     payee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     payment_method_id = db.Column(db.Integer, db.ForeignKey('payment_methods.id'))
@@ -47,5 +47,64 @@ class Payment(db.Model):
     payer = db.relationship('User', foreign_keys=[payer_id])
     payee = db.relationship('User', foreign_keys=[payee_id])
     
+    __table_args__ = (
+        db.Index('ix_payments_payer_id_created_at', 'payer_id', 'created_at', 'id'),
+        db.Index('ix_payments_payee_id_created_at', 'payee_id', 'created_at', 'id'),
+        # Reconciliation: unsettled payments, oldest first
+        db.Index('ix_payments_unsettled_created_at', 'created_at', 'id',
+                 postgresql_where=status.in_(['pending', 'processing']),
+                 sqlite_where=status.in_(['pending', 'processing'])),
+    )
+    
     def __repr__(self):
         return f'<Payment {self.id} - {self.status}>'
+
+
+class MpesaCallback(db.Model):
+    """Raw M-Pesa STK push callback, stored before it is applied to its payment"""
+    __tablename__ = 'mpesa_callbacks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Payment.transaction_id of an STK push; unique so Safaricom's retries are stored once
+    checkout_request_id = db.Column(db.String(100), nullable=False, unique=True)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='received')  # received, processed, failed, unverified
+    error = db.Column(db.String(255))
+    
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # Callback workers: the backlog in arrival order
+        db.Index('ix_mpesa_callbacks_received', 'id',
+                 postgresql_where=(status == 'received'),
+                 sqlite_where=(status == 'received')),
+    )
+    
+    def __repr__(self):
+        return f'<MpesaCallback {self.checkout_request_id} - {self.status}>'
+
+
+class Invoice(db.Model):
+    """A job's invoice; the rendered documents live on disk under content_hash"""
+    __tablename__ = 'invoices'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False, unique=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    # Digest of the job and payment fields the document depends on when it was
+    # built; a fetch that finds it out of date generates the invoice again
+    source_version = db.Column(db.String(64))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    job = db.relationship('Job', backref=db.backref('invoice', uselist=False))
+    
+    @property
+    def number(self):
+        return f'INV-{self.id:06d}'
+    
+    def __repr__(self):
+        return f'<Invoice {self.id} - job {self.job_id}>'
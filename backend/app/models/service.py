@@ -26,8 +26,8 @@ class ProviderService(db.Model):
     __tablename__ = 'provider_services'
     
     id = db.Column(db.Integer, primary_key=True)
-    provider_id = db.Column(db.Integer, db.ForeignKey('provider_profiles.id'), nullable=False)
-    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False)
+    provider_id = db.Column(db.Integer, db.ForeignKey('provider_profiles.id'), nullable=False, index=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False, index=True)
     custom_price = db.Column(db.Float)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -49,5 +49,9 @@ class Availability(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_availability_provider_id_day_of_week', 'provider_id', 'day_of_week'),
+    )
+    
     def __repr__(self):
         return f'<Availability {self.provider_id}-{self.day_of_week}>'
@@ -0,0 +1,23 @@
+"""
+Statistics Models
+"""
+from app import db
+
+
+class ProviderDailyStats(db.Model):
+    __tablename__ = 'provider_daily_stats'
+    
+    # One row per provider per (local) day, incremented as jobs, payments
+    # and reviews happen so the dashboard never aggregates raw jobs. The row
+    # dated LIFETIME_DAY (0001-01-01, see StatsService) holds running totals.
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    jobs_completed = db.Column(db.Integer, nullable=False, default=0)
+    jobs_cancelled = db.Column(db.Integer, nullable=False, default=0)
+    earnings = db.Column(db.Float, nullable=False, default=0.0)
+    payments = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    reviews = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ProviderDailyStats {self.provider_id} {self.day}>'
@@ -3,7 +3,7 @@ User Model
 """
 from datetime import datetime
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.password_hasher import get_password_hasher
 
 
 class User(db.Model):
@@ -29,11 +29,15 @@ class User(db.Model):
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
         """Check password"""
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash predates the configured hashing parameters"""
+        return get_password_hasher().needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -48,6 +52,9 @@ class ProviderProfile(db.Model):
     experience_years = db.Column(db.Integer)
     rating = db.Column(db.Float, default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
+    # Running aggregates maintained by RatingService on each review
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_score = db.Column(db.Float, index=True)  # Bayesian-smoothed rating used for ranking
     total_jobs_completed = db.Column(db.Integer, default=0)
     is_available = db.Column(db.Boolean, default=True)
     verification_status = db.Column(db.String(20), default='pending')  # pending, verified, rejected
@@ -40,8 +40,13 @@ class AuthService:
         if not user.is_active:
             raise ValueError('Account is deactivated')
         
+        # Upgrade hashes made with older work factors while we have the password
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+        
         # Create tokens
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=self.auth_claims(user))
         refresh_token = create_refresh_token(identity=user.id)
         
         return {
@@ -56,6 +61,23 @@ class AuthService:
             }
         }
     
+    def refresh_access_token(self, user_id):
+        """Mint a new access token with the user's current role and status"""
+        user = User.query.get(user_id)
+        if not user or not user.is_active:
+            raise ValueError('Account is deactivated')
+        
+        return create_access_token(identity=user.id, additional_claims=self.auth_claims(user))
+    
+    def auth_claims(self, user):
+        """
+        Authorization facts carried in the access token
+        
+        role_required reads these instead of loading the user, so a role or
+        status change takes effect when the token is next refreshed.
+        """
+        return {'role': user.role, 'is_active': bool(user.is_active)}
+    
     def forgot_password(self, email):
         """Send password reset email"""
         user = User.query.filter_by(email=email).first()
@@ -0,0 +1,123 @@
+"""
+Availability Service - provider weekly schedules
+"""
+from datetime import datetime, time, timedelta, timezone
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models.service import Availability
+from app.utils import serializers
+from app.utils.availability_index import AvailabilityIndex, schedule_mask, window_mask
+
+# Weekly schedule bitsets by provider profile id, shared by every request in
+# this process. Replacing a schedule here updates it at once; other workers'
+# changes show up when the index is rebuilt (SEARCH_INDEX_MAX_AGE).
+availability_index = AvailabilityIndex()
+
+MAX_SLOTS_PER_WEEK = 100
+
+
+def _parse_time(value, name):
+    if isinstance(value, time):
+        return value
+    try:
+        return time.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f'Invalid {name}: {value}')
+
+
+class AvailabilityService:
+    """Store provider schedules and answer "who is free" from the in-memory index"""
+
+    def get_schedule(self, provider_id):
+        """Get a provider's weekly schedule, ordered by day and start time"""
+        slots = serializers.availability.select(Availability.query.filter(
+            Availability.provider_id == provider_id
+        )).order_by(Availability.day_of_week, Availability.start_time).all()
+        return serializers.availability.dump_many(slots)
+
+    def replace_week(self, provider_id, slots):
+        """
+        Replace a provider's whole weekly schedule in one transaction
+
+        Args:
+            slots (list): Dicts with day_of_week (0 = Monday), start_time and
+                end_time ('HH:MM') and optional is_available (default True;
+                false blocks the time out of overlapping slots)
+        """
+        if not isinstance(slots, list):
+            raise ValueError('slots must be a list')
+        if len(slots) > MAX_SLOTS_PER_WEEK:
+            raise ValueError(f'At most {MAX_SLOTS_PER_WEEK} slots per week')
+
+        rows = []
+        for slot in slots:
+            if not isinstance(slot, dict):
+                raise ValueError('Each slot must be an object')
+            try:
+                day_of_week = int(slot.get('day_of_week'))
+            except (TypeError, ValueError):
+                raise ValueError('day_of_week is required')
+            if not 0 <= day_of_week <= 6:
+                raise ValueError('day_of_week must be between 0 (Monday) and 6 (Sunday)')
+            start_time = _parse_time(slot.get('start_time'), 'start_time')
+            end_time = _parse_time(slot.get('end_time'), 'end_time')
+            if end_time <= start_time:
+                raise ValueError('end_time must be after start_time')
+            rows.append({
+                'provider_id': provider_id,
+                'day_of_week': day_of_week,
+                'start_time': start_time,
+                'end_time': end_time,
+                'is_available': bool(slot.get('is_available', True))
+            })
+
+        Availability.query.filter(Availability.provider_id == provider_id).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(insert(Availability), rows)
+        db.session.commit()
+
+        if availability_index.built_at is not None:
+            availability_index.set(provider_id, schedule_mask(
+                (r['day_of_week'], r['start_time'], r['end_time'], r['is_available']) for r in rows
+            ) if rows else None)
+        return self.get_schedule(provider_id)
+
+    def local_time(self, moment=None):
+        """
+        Wall-clock time in LOCAL_UTC_OFFSET_HOURS, which schedules are written in
+
+        Naive datetimes (e.g. job.scheduled_date) are already local; aware
+        ones are converted, and None means now.
+        """
+        offset = timezone(timedelta(hours=current_app.config['LOCAL_UTC_OFFSET_HOURS']))
+        if moment is None:
+            moment = datetime.now(timezone.utc)
+        if moment.tzinfo is None:
+            return moment
+        return moment.astimezone(offset).replace(tzinfo=None)
+
+    def coverage(self, provider_ids, start, end):
+        """
+        Whether each provider's schedule covers [start, end)
+
+        Returns:
+            dict: provider id -> True/False, or None for providers without a schedule
+        """
+        self._ensure_index()
+        window = window_mask(self.local_time(start), self.local_time(end))
+        return {pid: availability_index.is_free(pid, window) for pid in provider_ids}
+
+    def free_providers(self, provider_ids, start, end):
+        """The providers (profile ids) whose schedule covers all of [start, end)"""
+        self._ensure_index()
+        return availability_index.free(provider_ids, window_mask(self.local_time(start), self.local_time(end)))
+
+    def _ensure_index(self):
+        """Load every schedule on first use and whenever older than SEARCH_INDEX_MAX_AGE"""
+        if not availability_index.is_stale(current_app.config['SEARCH_INDEX_MAX_AGE']):
+            return
+        availability_index.rebuild(db.session.query(
+            Availability.provider_id, Availability.day_of_week, Availability.start_time,
+            Availability.end_time, Availability.is_available
+        ).yield_per(10000))
@@ -0,0 +1,139 @@
+"""
+Badge Service - materialized unread counters for notifications and chat
+"""
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.notification import Notification, UnreadCounter
+from app.models.chat import ConversationParticipant
+from app.utils.background import run_periodically
+from app.utils.upsert import upsert_insert
+
+
+class BadgeService:
+    """
+    Maintain per-user unread totals.
+
+    The adjust_* methods only stage an UPDATE in the caller's transaction so
+    the counter changes commit (or roll back) together with the write that
+    caused them. A user's row is created on their first badge read, counted
+    by the insert itself; until then adjustments are no-ops because that
+    count already includes them. reconcile() repairs any drift.
+    """
+
+    def get_badges(self, user_id):
+        """Get unread totals for a user"""
+        counter = UnreadCounter.query.get(user_id)
+        if counter is None:
+            counter = self._initialize(user_id)
+        return {
+            'notifications': counter.unread_notifications,
+            'messages': counter.unread_messages
+        }
+
+    def adjust_notifications(self, user_ids, delta):
+        """Add delta to the unread notification count of each user"""
+        self._adjust(UnreadCounter.unread_notifications, user_ids, delta)
+
+    def adjust_messages(self, user_ids, delta):
+        """Add delta to the unread message count of each user"""
+        self._adjust(UnreadCounter.unread_messages, user_ids, delta)
+
+    def reconcile(self, batch_size=1000, log=None):
+        """
+        Recount every user's unread totals and correct counters that drifted
+
+        Counters are walked in user id order, one batch per transaction. A
+        correction only applies while the counter still holds the value read
+        before counting, so one that changed meanwhile is left for next time.
+
+        Returns:
+            tuple: (counters checked, counters corrected)
+        """
+        checked = corrected = 0
+        last_id = 0
+        while True:
+            counters = db.session.query(
+                UnreadCounter.user_id, UnreadCounter.unread_notifications, UnreadCounter.unread_messages
+            ).filter(UnreadCounter.user_id > last_id).order_by(UnreadCounter.user_id).limit(batch_size).all()
+            if not counters:
+                break
+            last_id = counters[-1].user_id
+            user_ids = [c.user_id for c in counters]
+
+            notifications = dict(db.session.query(Notification.user_id, db.func.count(Notification.id)).filter(
+                Notification.user_id.in_(user_ids),
+                Notification.is_read == False
+            ).group_by(Notification.user_id).all())
+            messages = dict(db.session.query(
+                ConversationParticipant.user_id, db.func.sum(ConversationParticipant.unread_count)
+            ).filter(
+                ConversationParticipant.user_id.in_(user_ids)
+            ).group_by(ConversationParticipant.user_id).all())
+
+            for counter in counters:
+                actual = (notifications.get(counter.user_id, 0), int(messages.get(counter.user_id) or 0))
+                if (counter.unread_notifications, counter.unread_messages) == actual:
+                    continue
+                corrected += UnreadCounter.query.filter(
+                    UnreadCounter.user_id == counter.user_id,
+                    UnreadCounter.unread_notifications == counter.unread_notifications,
+                    UnreadCounter.unread_messages == counter.unread_messages
+                ).update({
+                    UnreadCounter.unread_notifications: actual[0],
+                    UnreadCounter.unread_messages: actual[1]
+                }, synchronize_session=False)
+            db.session.commit()
+
+            checked += len(counters)
+            if log:
+                log(f'{checked} counters checked, {corrected} corrected')
+        return checked, corrected
+
+    def _adjust(self, column, user_ids, delta):
+        user_ids = list(user_ids)
+        if not user_ids or not delta:
+            return
+        value = column + delta
+        if delta < 0:
+            # A counter that had drifted low bottoms out at zero until reconciled
+            value = db.case((value < 0, 0), else_=value)
+        UnreadCounter.query.filter(UnreadCounter.user_id.in_(user_ids)).update(
+            {column: value}, synchronize_session=False
+        )
+
+    def _initialize(self, user_id):
+        """Create a user's counter row, counting unread items in the same statement"""
+        values = {
+            'user_id': user_id,
+            'unread_notifications': db.session.query(db.func.count(Notification.id)).filter(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            ).scalar_subquery(),
+            'unread_messages': db.session.query(
+                db.func.coalesce(db.func.sum(ConversationParticipant.unread_count), 0)
+            ).filter(ConversationParticipant.user_id == user_id).scalar_subquery()
+        }
+        upsert = upsert_insert()
+        try:
+            if upsert is not None:
+                # Another request may initialise it first; theirs is as good
+                db.session.execute(upsert(UnreadCounter).values(**values).on_conflict_do_nothing(
+                    index_elements=['user_id']
+                ))
+            else:
+                db.session.execute(insert(UnreadCounter).values(**values))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        return UnreadCounter.query.get(user_id)
+
+
+def start_badge_reconciler(app):
+    """Reconcile unread counters every BADGE_RECONCILE_INTERVAL seconds"""
+    def reconcile():
+        checked, corrected = BadgeService().reconcile()
+        if corrected:
+            app.logger.info('Unread counters: %s checked, %s corrected', checked, corrected)
+
+    run_periodically(app, 'badge-reconciler', app.config.get('BADGE_RECONCILE_INTERVAL'), reconcile)
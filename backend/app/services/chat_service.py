@@ -1,19 +1,58 @@
 """
 Chat Service
 """
+import json
+from datetime import datetime
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models.chat import Conversation, ConversationParticipant, Message
+from app.services.badge_service import BadgeService
+from app.utils import serializers
+from app.utils.pagination import paginate, clamp_limit
+from app.utils.pubsub import get_broker
 
 
 class ChatService:
     """Handle chat-related business logic"""
     
+    def __init__(self):
+        self.badge_service = BadgeService()
+    
     def get_conversations(self, user_id):
-        """Get user's conversations"""
-        participants = ConversationParticipant.query.filter_by(user_id=user_id).all()
-        conversations = [p.conversation for p in participants]
+        """
+        Get user's conversations, most recently active first
+        
+        Two queries however many conversations there are: one for the
+        conversations with the user's unread count and last message, and
+        one loading every participant list at once.
+        """
+        last_message_id = db.session.query(Message.id).filter(
+            Message.conversation_id == Conversation.id
+        ).order_by(
+            Message.created_at.desc(), Message.id.desc()
+        ).limit(1).correlate(Conversation).scalar_subquery()
+        
+        rows = db.session.query(
+            Conversation, ConversationParticipant.unread_count, Message
+        ).join(
+            ConversationParticipant,
+            db.and_(
+                ConversationParticipant.conversation_id == Conversation.id,
+                ConversationParticipant.user_id == user_id
+            )
+        ).outerjoin(
+            Message, Message.id == last_message_id
+        ).options(
+            selectinload(Conversation.participants)
+        ).order_by(
+            db.func.coalesce(Message.created_at, Conversation.created_at).desc(),
+            Conversation.id.desc()
+        ).all()
         
-        return [self._serialize_conversation(c) for c in conversations]
+        return [
+            self._serialize_conversation(conversation, unread_count=unread_count, last_message=last_message)
+            for conversation, unread_count, last_message in rows
+        ]
     
     def get_conversation(self, user_id, conversation_id):
         """Get conversation details"""
@@ -21,44 +60,79 @@ class ChatService:
         if not conversation:
             raise ValueError('Conversation not found')
         
-        # Check if user is participant
-        participant = ConversationParticipant.query.filter_by(
-            conversation_id=conversation_id,
-            user_id=user_id
-        ).first()
-        
-        if not participant:
-            raise ValueError('Unauthorized access')
+        self._require_participant(user_id, conversation_id)
         
         return self._serialize_conversation(conversation)
     
-    def get_messages(self, user_id, conversation_id):
-        """Get messages in a conversation"""
-        # Check if user is participant
-        participant = ConversationParticipant.query.filter_by(
-            conversation_id=conversation_id,
-            user_id=user_id
-        ).first()
+    def get_messages(self, user_id, conversation_id, cursor=None, limit=None):
+        """Get messages in a conversation, newest first"""
+        self._require_participant(user_id, conversation_id)
         
-        if not participant:
-            raise ValueError('Unauthorized access')
+        query = serializers.message.select(Message.query.filter_by(conversation_id=conversation_id))
+        messages, next_cursor = paginate(query, [Message.created_at, Message.id], cursor, limit)
         
-        messages = Message.query.filter_by(conversation_id=conversation_id).order_by(
-            Message.created_at.asc()
-        ).all()
+        return {
+            'items': serializers.message.dump_many(messages),
+            'next_cursor': next_cursor
+        }
+    
+    def get_messages_since(self, user_id, conversation_id, since_id, limit=None):
+        """Get messages newer than since_id, oldest first (for catching up)"""
+        self._require_participant(user_id, conversation_id)
+        
+        messages = serializers.message.select(Message.query.filter(
+            Message.conversation_id == conversation_id,
+            Message.id > since_id
+        )).order_by(Message.id.asc()).limit(clamp_limit(limit)).all()
+        
+        return serializers.message.dump_many(messages)
+    
+    def stream_messages(self, user_id, conversation_id, since_id=None, heartbeat=15):
+        """
+        Server-Sent Events stream of new messages in a conversation
+        
+        Subscribes before reading the backlog so nothing published in
+        between is missed; duplicates are skipped by message id.
+        
+        Returns:
+            generator: SSE-formatted chunks
+        """
+        self._require_participant(user_id, conversation_id)
+        
+        subscription = get_broker().subscribe(self.channel(conversation_id))
+        try:
+            backlog = []
+            if since_id is not None:
+                backlog = self.get_messages_since(user_id, conversation_id, since_id)
+            # Release the pooled connection; the stream itself never touches the DB
+            db.session.close()
+        except Exception:
+            subscription.close()
+            raise
+        
+        def generate():
+            last_id = since_id or 0
+            try:
+                for message in backlog:
+                    last_id = message['id']
+                    yield self._format_event(message)
+                while True:
+                    message = subscription.get(timeout=heartbeat)
+                    if message is None:
+                        yield ': keep-alive\n\n'
+                        continue
+                    if message['id'] <= last_id:
+                        continue
+                    last_id = message['id']
+                    yield self._format_event(message)
+            finally:
+                subscription.close()
         
-        return [self._serialize_message(m) for m in messages]
+        return generate()
     
     def send_message(self, user_id, conversation_id, data):
         """Send a message"""
-        # Check if user is participant
-        participant = ConversationParticipant.query.filter_by(
-            conversation_id=conversation_id,
-            user_id=user_id
-        ).first()
-        
-        if not participant:
-            raise ValueError('Unauthorized access')
+        self._require_participant(user_id, conversation_id)
         
         message = Message(
             conversation_id=conversation_id,
@@ -69,29 +143,73 @@ class ChatService:
         )
         
         db.session.add(message)
+        
+        recipients = [uid for (uid,) in db.session.query(ConversationParticipant.user_id).filter(
+            ConversationParticipant.conversation_id == conversation_id,
+            ConversationParticipant.user_id != user_id
+        )]
+        if recipients:
+            ConversationParticipant.query.filter(
+                ConversationParticipant.conversation_id == conversation_id,
+                ConversationParticipant.user_id.in_(recipients)
+            ).update({
+                ConversationParticipant.unread_count: ConversationParticipant.unread_count + 1
+            }, synchronize_session=False)
+            self.badge_service.adjust_messages(recipients, 1)
         db.session.commit()
         
-        return self._serialize_message(message)
+        serialized = serializers.message.dump(message)
+        get_broker().publish(self.channel(conversation_id), serialized)
+        return serialized
     
-    def _serialize_conversation(self, conversation):
-        """Serialize conversation object"""
-        return {
-            'id': conversation.id,
-            'job_id': conversation.job_id,
-            'created_at': conversation.created_at.isoformat(),
-            'updated_at': conversation.updated_at.isoformat(),
-            'participants': [p.user_id for p in conversation.participants]
-        }
+    def mark_conversation_read(self, user_id, conversation_id):
+        """Mark the other participants' messages as read (read receipt)"""
+        participant = self._require_participant(user_id, conversation_id)
+        unread = participant.unread_count or 0
+        
+        Message.query.filter(
+            Message.conversation_id == conversation_id,
+            Message.sender_id != user_id,
+            Message.is_read == False
+        ).update({'is_read': True, 'read_at': datetime.utcnow()}, synchronize_session=False)
+        
+        # Subtract what we saw rather than zeroing, so messages that arrive
+        # concurrently stay counted
+        if unread:
+            ConversationParticipant.query.filter(
+                ConversationParticipant.id == participant.id
+            ).update({
+                ConversationParticipant.unread_count: ConversationParticipant.unread_count - unread
+            }, synchronize_session=False)
+            self.badge_service.adjust_messages([user_id], -unread)
+        db.session.commit()
     
-    def _serialize_message(self, message):
-        """Serialize message object"""
-        return {
-            'id': message.id,
-            'conversation_id': message.conversation_id,
-            'sender_id': message.sender_id,
-            'content': message.content,
-            'message_type': message.message_type,
-            'attachment_url': message.attachment_url,
-            'is_read': message.is_read,
-            'created_at': message.created_at.isoformat()
-        }
+    @staticmethod
+    def channel(conversation_id):
+        """Pub/sub channel carrying a conversation's new messages"""
+        return f'conversation:{conversation_id}'
+    
+    def _require_participant(self, user_id, conversation_id):
+        """Raise unless the user takes part in the conversation"""
+        participant = ConversationParticipant.query.filter_by(
+            conversation_id=conversation_id,
+            user_id=user_id
+        ).first()
+        
+        if not participant:
+            raise ValueError('Unauthorized access')
+        
+        return participant
+    
+    def _format_event(self, message):
+        """Format a message as a Server-Sent Event"""
+        return f'id: {message["id"]}\nevent: message\ndata: {json.dumps(message)}\n\n'
+    
+    def _serialize_conversation(self, conversation, unread_count=None, last_message=None):
+        """Serialize conversation object"""
+        data = serializers.conversation.dump(conversation)
+        data['participants'] = [p.user_id for p in conversation.participants]
+        if unread_count is not None:
+            data['unread_count'] = unread_count
+            data['last_message'] = serializers.message.dump(last_message) if last_message else None
+        return data
@@ -0,0 +1,332 @@
+"""
+Dispatch Service - offers pending jobs to the best-matched providers in waves
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.job import Job, JobOffer
+from app.models.user import ProviderProfile
+from app.models.service import ProviderService
+from app.services.availability_service import AvailabilityService
+from app.services.location_service import provider_index, sync_provider_index
+from app.services.notification_service import NotificationService
+from app.utils.background import run_periodically
+
+# Relative weight of each factor in a provider's match score (sums to 1)
+SCORE_WEIGHTS = {
+    'distance': 0.4,
+    'rating': 0.3,
+    'availability': 0.2,
+    'price': 0.1
+}
+SWEEP_BATCH_SIZE = 100
+DEFAULT_JOB_MINUTES = 60  # assumed length of jobs without an estimated_duration
+
+
+class DispatchService:
+    """Match pending jobs to providers and manage their offers"""
+
+    def __init__(self):
+        self.notification_service = NotificationService()
+        self.availability_service = AvailabilityService()
+
+    def dispatch_job(self, job_id):
+        """
+        Offer a pending job to the next wave of top-scoring providers
+
+        When nobody can be offered the job and its waves are used up or the
+        dispatch window (DISPATCH_OFFER_TIMEOUT * DISPATCH_MAX_WAVES) has
+        passed, the job is closed and the client told; otherwise the sweeper
+        retries it.
+
+        Returns:
+            list: User ids of the providers offered the job in this wave
+        """
+        job = Job.query.get(job_id)
+        if not job or job.status != 'pending' or job.provider_id:
+            return []
+
+        config = current_app.config
+        previous = db.session.query(JobOffer.provider_id, JobOffer.wave).filter(
+            JobOffer.job_id == job.id
+        ).all()
+        wave = max((w for _, w in previous), default=0) + 1
+
+        ranked = []
+        if wave <= config['DISPATCH_MAX_WAVES']:
+            ranked = self.rank_providers(job, exclude={p for p, _ in previous})
+        chosen = ranked[:config['DISPATCH_OFFER_SIZE']]
+
+        if not chosen:
+            window = timedelta(seconds=config['DISPATCH_OFFER_TIMEOUT'] * config['DISPATCH_MAX_WAVES'])
+            if wave > config['DISPATCH_MAX_WAVES'] or datetime.utcnow() - job.created_at >= window:
+                self.close_unmatched_job(job)
+            return []
+
+        expires_at = datetime.utcnow() + timedelta(seconds=config['DISPATCH_OFFER_TIMEOUT'])
+        for score, provider_id in chosen:
+            db.session.add(JobOffer(
+                job_id=job.id,
+                provider_id=provider_id,
+                wave=wave,
+                score=score,
+                expires_at=expires_at
+            ))
+        db.session.commit()
+
+        provider_ids = [provider_id for _, provider_id in chosen]
+        self.notification_service.notify_users(provider_ids, {
+            'type': 'job_offer',
+            'title': 'New job request',
+            'message': job.title,
+            'data': {'job_id': job.id, 'expires_at': expires_at.isoformat()}
+        })
+        return provider_ids
+
+    def rank_providers(self, job, exclude=()):
+        """
+        Score candidate providers for a job, best first
+
+        Candidates come from the spatial index when the job has coordinates,
+        otherwise from everyone offering the service. Providers whose
+        schedule rules out the job's time are dropped.
+
+        Returns:
+            list: (score, provider_user_id) tuples
+        """
+        config = current_app.config
+        radius = config['DISPATCH_RADIUS_KM']
+        pool = config['DISPATCH_OFFER_SIZE'] * config['DISPATCH_MAX_WAVES'] + len(exclude)
+        exclude = set(exclude) | {job.client_id}
+
+        if job.latitude is not None and job.longitude is not None:
+            sync_provider_index()
+            nearby = provider_index.nearest(str(job.service_id), job.latitude, job.longitude,
+                                            pool, max_km=radius)
+            distances = {user_id: d for d, user_id in nearby if user_id not in exclude}
+        else:
+            rows = db.session.query(ProviderProfile.user_id).join(
+                ProviderService, ProviderService.provider_id == ProviderProfile.id
+            ).filter(
+                ProviderService.service_id == job.service_id,
+                ProviderService.is_active == True,
+                ProviderProfile.is_available == True
+            ).limit(pool).all()
+            distances = {user_id: None for (user_id,) in rows if user_id not in exclude}
+
+        if not distances:
+            return []
+
+        profiles = ProviderProfile.query.filter(
+            ProviderProfile.user_id.in_(list(distances)),
+            ProviderProfile.is_available == True
+        ).all()
+        profile_ids = [p.id for p in profiles]
+
+        offered = {ps.provider_id: ps for ps in ProviderService.query.filter(
+            ProviderService.provider_id.in_(profile_ids),
+            ProviderService.service_id == job.service_id,
+            ProviderService.is_active == True
+        )}
+
+        # Schedules are local time; so is scheduled_date, but utcnow() is not
+        start = self.availability_service.local_time(job.scheduled_date)
+        end = start + timedelta(minutes=job.estimated_duration or DEFAULT_JOB_MINUTES)
+        coverage = self.availability_service.coverage(profile_ids, start, end)
+
+        ranked = []
+        for profile in profiles:
+            provider_service = offered.get(profile.id)
+            if not provider_service:
+                continue
+
+            availability = self._availability_score(coverage.get(profile.id))
+            if availability == 0:
+                continue
+
+            distance = distances[profile.user_id]
+            factors = {
+                'distance': 0.5 if distance is None else 1 - min(distance, radius) / radius,
+                'rating': (profile.rating_score or 0) / 5,
+                'availability': availability,
+                'price': self._price_score(job.estimated_price, provider_service.custom_price)
+            }
+            score = sum(SCORE_WEIGHTS[k] * v for k, v in factors.items())
+            ranked.append((round(score, 4), profile.user_id))
+
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+    def claim_job(self, job_id, provider_id):
+        """
+        Atomically assign a pending job to a provider
+
+        The UPDATE only matches while the job is still pending and unassigned,
+        so when two providers accept at once exactly one of them wins.
+        """
+        now = datetime.utcnow()
+
+        has_offers = JobOffer.query.filter_by(job_id=job_id).first() is not None
+        if has_offers and not JobOffer.query.filter(
+            JobOffer.job_id == job_id,
+            JobOffer.provider_id == provider_id,
+            JobOffer.status == 'offered',
+            JobOffer.expires_at > now
+        ).first():
+            raise ValueError('Job not available')
+
+        claimed = Job.query.filter(
+            Job.id == job_id,
+            Job.status == 'pending',
+            Job.provider_id.is_(None)
+        ).update({
+            'provider_id': provider_id,
+            'status': 'accepted',
+            'accepted_at': now,
+            'updated_at': now
+        }, synchronize_session=False)
+
+        if not claimed:
+            db.session.rollback()
+            raise ValueError('Job not available')
+
+        self.close_offers(job_id, accepted_by=provider_id, commit=False)
+        db.session.commit()
+
+    def close_unmatched_job(self, job):
+        """Cancel a pending job nobody could take and tell the client"""
+        now = datetime.utcnow()
+        closed = Job.query.filter(
+            Job.id == job.id,
+            Job.status == 'pending',
+            Job.provider_id.is_(None)
+        ).update({'status': 'cancelled', 'cancelled_at': now, 'updated_at': now},
+                 synchronize_session=False)
+        if not closed:
+            db.session.rollback()
+            return False
+        self.close_offers(job.id, commit=False)
+        db.session.commit()
+
+        self.notification_service.notify_users([job.client_id], {
+            'type': 'job_update',
+            'title': 'No providers available',
+            'message': f'Nobody nearby could take "{job.title}", so the request was closed',
+            'data': {'job_id': job.id}
+        })
+        return True
+
+    def decline_offer(self, job_id, provider_id):
+        """Decline an offer; moves on to the next wave once the current one is exhausted"""
+        declined = JobOffer.query.filter(
+            JobOffer.job_id == job_id,
+            JobOffer.provider_id == provider_id,
+            JobOffer.status == 'offered'
+        ).update({'status': 'declined', 'responded_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+        if not declined:
+            raise ValueError('Offer not found')
+
+        if not JobOffer.query.filter_by(job_id=job_id, status='offered').first():
+            self.dispatch_job(job_id)
+
+    def close_offers(self, job_id, accepted_by=None, commit=True):
+        """Withdraw a job's live offers, marking the accepting provider's as accepted"""
+        now = datetime.utcnow()
+        live = JobOffer.query.filter(JobOffer.job_id == job_id, JobOffer.status == 'offered')
+        if accepted_by is not None:
+            live.filter(JobOffer.provider_id == accepted_by).update(
+                {'status': 'accepted', 'responded_at': now}, synchronize_session=False
+            )
+        live.update({'status': 'withdrawn'}, synchronize_session=False)
+        if commit:
+            db.session.commit()
+
+    def advance_expired_offers(self):
+        """
+        Expire timed-out offers and send their jobs to the next wave; also
+        retries jobs a previous wave found nobody for
+
+        Expiry is claimed with a conditional UPDATE per job, so when several
+        workers sweep at once each job advances only once.
+
+        Returns:
+            int: Number of jobs advanced
+        """
+        now = datetime.utcnow()
+        job_ids = [job_id for (job_id,) in db.session.query(JobOffer.job_id).filter(
+            JobOffer.status == 'offered',
+            JobOffer.expires_at <= now
+        ).distinct().limit(SWEEP_BATCH_SIZE)]
+
+        advanced = 0
+        for job_id in job_ids:
+            expired = JobOffer.query.filter(
+                JobOffer.job_id == job_id,
+                JobOffer.status == 'offered',
+                JobOffer.expires_at <= now
+            ).update({'status': 'expired'}, synchronize_session=False)
+            db.session.commit()
+
+            if expired and not JobOffer.query.filter_by(job_id=job_id, status='offered').first():
+                self.dispatch_job(job_id)
+                advanced += 1
+        return advanced + self.retry_stalled_jobs(now)
+
+    def retry_stalled_jobs(self, now=None):
+        """
+        Re-dispatch pending jobs left without live offers
+
+        A wave that found nobody leaves the job with no offers to expire, so
+        it would otherwise stay pending unseen. Such jobs are retried once
+        per offer timeout (providers may have come online meanwhile) until
+        the dispatch window passes, when dispatch_job closes them. Each
+        retry is claimed by bumping updated_at with a conditional UPDATE.
+
+        Returns:
+            int: Number of jobs retried
+        """
+        now = now or datetime.utcnow()
+        retry_before = now - timedelta(seconds=current_app.config['DISPATCH_OFFER_TIMEOUT'])
+        live_offer = db.session.query(JobOffer.id).filter(
+            JobOffer.job_id == Job.id,
+            JobOffer.status == 'offered'
+        ).exists()
+        job_ids = [job_id for (job_id,) in db.session.query(Job.id).filter(
+            Job.status == 'pending',
+            Job.provider_id.is_(None),
+            Job.updated_at <= retry_before,
+            ~live_offer
+        ).order_by(Job.created_at, Job.id).limit(SWEEP_BATCH_SIZE)]
+
+        retried = 0
+        for job_id in job_ids:
+            claimed = Job.query.filter(
+                Job.id == job_id,
+                Job.status == 'pending',
+                Job.updated_at <= retry_before
+            ).update({'updated_at': now}, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                self.dispatch_job(job_id)
+                retried += 1
+        return retried
+
+    def _availability_score(self, free):
+        """1 if the schedule covers the job, 0 if it rules it out, 0.5 without a schedule"""
+        if free is None:
+            return 0.5
+        return 1.0 if free else 0
+
+    def _price_score(self, budget, price):
+        """How well the provider's price fits the client's estimate"""
+        if not budget or not price:
+            return 0.5
+        return min(1.0, budget / price)
+
+
+def start_dispatcher(app):
+    """Advance expired job offers every DISPATCH_INTERVAL seconds"""
+    run_periodically(app, 'job-dispatcher', app.config.get('DISPATCH_INTERVAL'),
+                     DispatchService().advance_expired_offers)
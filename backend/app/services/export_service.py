@@ -0,0 +1,180 @@
+"""
+Export Service - streaming CSV/NDJSON statements of payments and jobs
+"""
+import csv
+import io
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.job import Job
+from app.models.payment import Payment
+from app.models.service import Service
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+FETCH_SIZE = 1000  # rows per server-side cursor fetch, and per response chunk
+SIDES = ('client', 'provider')
+
+PAYMENT_COLUMNS = [
+    ('id', Payment.id),
+    ('created_at', Payment.created_at),
+    ('processed_at', Payment.processed_at),
+    ('job_id', Payment.job_id),
+    ('payer_id', Payment.payer_id),
+    ('payee_id', Payment.payee_id),
+    ('amount', Payment.amount),
+    ('currency', Payment.currency),
+    ('status', Payment.status),
+    ('payment_provider', Payment.payment_provider),
+    ('transaction_id', Payment.transaction_id)
+]
+JOB_COLUMNS = [
+    ('id', Job.id),
+    ('created_at', Job.created_at),
+    ('status', Job.status),
+    ('title', Job.title),
+    ('service', Service.name),
+    ('client_id', Job.client_id),
+    ('provider_id', Job.provider_id),
+    ('address', Job.address),
+    ('scheduled_date', Job.scheduled_date),
+    ('estimated_price', Job.estimated_price),
+    ('final_price', Job.final_price),
+    ('completed_at', Job.completed_at),
+    ('cancelled_at', Job.cancelled_at)
+]
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    # Keep spreadsheet apps from evaluating user-entered text as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+class ExportService:
+    """
+    Stream a user's payments or jobs for a period as CSV or NDJSON.
+
+    Rows are read through a server-side cursor FETCH_SIZE at a time and
+    each batch is encoded and handed to the response before the next is
+    fetched, so memory stays flat however many rows a statement has.
+    Arguments are validated up front; the returned generator only streams.
+    """
+
+    def export_payments(self, user_id, side='client', fmt='csv', start=None, end=None, month=None):
+        """
+        Payments the user made (side='client') or received (side='provider')
+
+        Args:
+            start, end (str): Inclusive YYYY-MM-DD bounds on created_at
+            month (str): YYYY-MM, instead of start and end
+
+        Returns:
+            tuple: (generator of text chunks, mimetype, download filename)
+        """
+        self._check(side, fmt)
+        period, label = self._period(start, end, month)
+        owner = Payment.payer_id if side == 'client' else Payment.payee_id
+        statement = select(*[column for _, column in PAYMENT_COLUMNS]).where(
+            owner == user_id, *self._between(Payment.created_at, period)
+        ).order_by(Payment.created_at, Payment.id)
+        return self._stream(statement, PAYMENT_COLUMNS, fmt), EXPORT_FORMATS[fmt], \
+            f'payments-{side}-{label}.{fmt}'
+
+    def export_jobs(self, user_id, side='client', fmt='csv', start=None, end=None, month=None):
+        """
+        Jobs the user requested (side='client') or worked (side='provider')
+
+        Same arguments and return value as export_payments.
+        """
+        self._check(side, fmt)
+        period, label = self._period(start, end, month)
+        owner = Job.client_id if side == 'client' else Job.provider_id
+        statement = select(*[column for _, column in JOB_COLUMNS]).select_from(Job).join(
+            Service, Service.id == Job.service_id
+        ).where(
+            owner == user_id, *self._between(Job.created_at, period)
+        ).order_by(Job.created_at, Job.id)
+        return self._stream(statement, JOB_COLUMNS, fmt), EXPORT_FORMATS[fmt], \
+            f'jobs-{side}-{label}.{fmt}'
+
+    def _stream(self, statement, columns, fmt):
+        names = [name for name, _ in columns]
+        encode = self._csv_encoder(names) if fmt == 'csv' else self._ndjson_encoder(names)
+
+        def generate():
+            result = db.session.execute(statement.execution_options(yield_per=FETCH_SIZE))
+            try:
+                yield encode(None)
+                for rows in result.partitions():
+                    yield encode(rows)
+            finally:
+                result.close()
+
+        return generate()
+
+    def _csv_encoder(self, names):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def encode(rows):
+            if rows is None:
+                writer.writerow(names)
+            else:
+                writer.writerows([_csv_cell(value) for value in row] for row in rows)
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        return encode
+
+    def _ndjson_encoder(self, names):
+        dumps = current_app.json.dumps
+
+        def encode(rows):
+            if rows is None:
+                return ''
+            return ''.join(dumps(dict(zip(names, map(_plain, row)))) + '\n' for row in rows)
+
+        return encode
+
+    def _check(self, side, fmt):
+        if side not in SIDES:
+            raise ValueError(f'Unknown side: {side} (use client or provider)')
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f'Unknown export format: {fmt} (use csv or ndjson)')
+
+    def _period(self, start, end, month):
+        """(start, end) datetimes, end exclusive, and a label for the file name"""
+        try:
+            if month:
+                first = datetime.strptime(month, '%Y-%m')
+                following = datetime(first.year + first.month // 12, first.month % 12 + 1, 1)
+                return (first, following), month
+            first = datetime.strptime(start, '%Y-%m-%d') if start else None
+            last = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+        except ValueError:
+            raise ValueError('month must be YYYY-MM and from/to YYYY-MM-DD')
+        if first and last and last <= first:
+            raise ValueError('to must not be before from')
+        label = f"{start or 'start'}-to-{end or 'now'}" if (start or end) else 'all'
+        return (first, last), label
+
+    def _between(self, column, period):
+        start, end = period
+        clauses = []
+        if start is not None:
+            clauses.append(column >= start)
+        if end is not None:
+            clauses.append(column < end)
+        return clauses
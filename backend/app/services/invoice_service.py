@@ -0,0 +1,385 @@
+"""
+Invoice Service - job invoices rendered once per version and served from disk
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import current_app
+from jinja2 import Environment
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.job import Job
+from app.models.payment import Invoice, Payment
+from app.models.service import Service
+from app.models.user import User
+from app.services.payment_service import DEFAULT_CURRENCY
+
+RENDER_VERSION = 1  # bump when the document or layouts change
+FORMATS = {
+    'json': 'application/json',
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf'
+}
+
+HTML_TEMPLATE = Environment(autoescape=True).from_string('''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Invoice {{ number }}</title>
+<style>
+body { font-family: sans-serif; color: #222; max-width: 720px; margin: 2em auto; }
+table { width: 100%; border-collapse: collapse; margin: 1em 0; }
+th, td { text-align: left; padding: .4em; border-bottom: 1px solid #ddd; }
+td.amount, th.amount { text-align: right; }
+</style>
+</head>
+<body>
+<h1>WiraSasa invoice {{ number }}</h1>
+<p>Issued {{ createdAt[:10] }} &middot; Status: {{ status }}</p>
+<p><strong>Billed to:</strong> {{ client.name }} ({{ client.email }})<br>
+<strong>Service provider:</strong> {{ provider.name if provider else '-' }}</p>
+<table>
+<tr><th>Description</th><th class="amount">Amount ({{ currency }})</th></tr>
+{% for line in lines %}<tr><td>{{ line.description }}</td><td class="amount">{{ '%.2f'|format(line.amount) }}</td></tr>
+{% endfor %}<tr><td>Tax</td><td class="amount">{{ '%.2f'|format(tax) }}</td></tr>
+<tr><th>Total</th><th class="amount">{{ '%.2f'|format(total) }}</th></tr>
+<tr><td>Paid</td><td class="amount">{{ '%.2f'|format(amountPaid) }}</td></tr>
+<tr><th>Balance due</th><th class="amount">{{ '%.2f'|format(balanceDue) }}</th></tr>
+</table>
+{% if payments %}<h2>Payments</h2>
+<table>
+<tr><th>Date</th><th>Method</th><th>Reference</th><th>Status</th><th class="amount">Amount</th></tr>
+{% for payment in payments %}<tr><td>{{ (payment.processedAt or payment.createdAt or '')[:10] }}</td><td>{{ payment.method or '-' }}</td><td>{{ payment.reference or '-' }}</td><td>{{ payment.status }}</td><td class="amount">{{ '%.2f'|format(payment.amount) }}</td></tr>
+{% endfor %}</table>{% endif %}
+</body>
+</html>
+''')
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+class InvoiceStore:
+    """
+    Rendered invoices on disk, addressed by content hash.
+
+    A file is written once (atomically) and never changed, so any worker
+    sharing the directory can serve it and a changed invoice simply gets a
+    new hash.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, content_hash, fmt):
+        return os.path.join(self.directory, content_hash[:2], f'{content_hash}.{fmt}')
+
+    def read(self, content_hash, fmt):
+        """The stored bytes, or None if this version was never rendered here"""
+        try:
+            with open(self.path(content_hash, fmt), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, content_hash, fmt, data):
+        path = self.path(content_hash, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _invoice_executor(workers):
+    # Created on first use so that forking servers start it per worker
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='invoices')
+    return _executor
+
+
+class InvoiceService:
+    """
+    Build job invoices from jobs, payments and services.
+
+    The invoice document is hashed (with RENDER_VERSION) and every rendering
+    of it is stored under that hash, so fetching an unchanged invoice again
+    only reads a file. Each fetch first compares a cheap version key of the
+    job and its payments (one indexed query) with the one the invoice was
+    built from, and generates the invoice again when a payment settled or
+    the job changed since, whichever path changed it.
+    """
+
+    def generate_invoice(self, job_id, user_id=None):
+        """
+        Create or refresh the invoice for a job
+
+        Args:
+            user_id (int): When given, must be the job's client or provider
+
+        Returns:
+            dict: The invoice document
+        """
+        job = Job.query.get(job_id)
+        if not job or (user_id is not None and user_id not in (job.client_id, job.provider_id)):
+            raise ValueError('Job not found')
+
+        invoice = Invoice.query.filter_by(job_id=job.id).first()
+        if invoice is None:
+            try:
+                invoice = Invoice(job_id=job.id, content_hash='', total=0.0)
+                db.session.add(invoice)
+                db.session.flush()
+            except IntegrityError:
+                # Generated concurrently; use the other request's row
+                db.session.rollback()
+                invoice = Invoice.query.filter_by(job_id=job.id).one()
+                job = Job.query.get(job_id)
+
+        # Taken before building, so a change in between only causes a spare refresh
+        source_version = self._source_version(job.id, job.updated_at)
+        document = self._build(job, invoice)
+        content_hash = self._hash(document)
+        store = self._store()
+        if store.read(content_hash, 'json') is None:
+            store.write(content_hash, 'json', self._render(document, 'json'))
+        if invoice.content_hash != content_hash:
+            invoice.content_hash = content_hash
+            invoice.total = document['total']
+        invoice.source_version = source_version
+        db.session.commit()
+        return document
+
+    def get_invoice(self, invoice_id, user_id=None):
+        """The invoice document by id or number (INV-000123), or None"""
+        data = self.get_rendered_invoice(invoice_id, user_id, 'json')
+        return json.loads(data[0]) if data else None
+
+    def get_rendered_invoice(self, invoice_id, user_id=None, fmt='json'):
+        """
+        An invoice in one of FORMATS, rendered at most once per version
+
+        Returns:
+            tuple: (bytes, mimetype), or None when there is no such invoice
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown invoice format: {fmt}')
+        row = self._find(invoice_id)
+        if row is None or (user_id is not None and user_id not in (row.client_id, row.provider_id)):
+            return None
+
+        store = self._store()
+        content_hash = row.content_hash
+        document = None
+        if self._source_version(row.job_id, row.job_updated_at) != row.source_version:
+            # A payment or the job changed since the invoice was generated
+            document = self.generate_invoice(row.job_id)
+            content_hash = self._hash(document)
+
+        data = store.read(content_hash, fmt)
+        if data is None:
+            if document is None:
+                source = store.read(content_hash, 'json')
+                if source is not None:
+                    document = json.loads(source)
+                else:
+                    # Rendered on another host or cleaned up: rebuild from the DB
+                    document = self.generate_invoice(row.job_id)
+                    content_hash = self._hash(document)
+            data = store.read(content_hash, fmt)
+            if data is None:
+                data = self._render(document, fmt)
+                store.write(content_hash, fmt, data)
+        return data, FORMATS[fmt]
+
+    def generate_invoices(self, job_ids):
+        """
+        Generate many invoices on the INVOICE_WORKERS background pool
+
+        Returns:
+            list: One future per job id, resolving to the document (or raising)
+        """
+        app = current_app._get_current_object()
+        workers = app.config['INVOICE_WORKERS']
+
+        def generate(job_id):
+            with app.app_context():
+                return InvoiceService().generate_invoice(job_id)
+
+        if not workers:
+            return [_run_now(generate, job_id) for job_id in job_ids]
+        executor = _invoice_executor(workers)
+        return [executor.submit(generate, job_id) for job_id in job_ids]
+
+    def _find(self, invoice_id):
+        text = str(invoice_id).strip().upper()
+        if text.startswith('INV-'):
+            text = text[4:]
+        if not text.isdigit():
+            return None
+        return db.session.query(
+            Invoice.id, Invoice.job_id, Invoice.content_hash, Invoice.source_version,
+            Job.client_id, Job.provider_id, Job.updated_at.label('job_updated_at')
+        ).join(Job, Job.id == Invoice.job_id).filter(Invoice.id == int(text)).first()
+
+    def _source_version(self, job_id, job_updated_at):
+        """Digest of the job and payment fields an invoice changes with"""
+        payments = db.session.query(
+            Payment.id, Payment.status, Payment.amount, Payment.processed_at
+        ).filter(Payment.job_id == job_id).order_by(Payment.id).all()
+        key = [_iso(job_updated_at), [[p.id, p.status, p.amount, _iso(p.processed_at)] for p in payments]]
+        return hashlib.sha256(json.dumps(key, separators=(',', ':')).encode()).hexdigest()
+
+    def _build(self, job, invoice):
+        """The invoice document; everything rendered is derived from this"""
+        service = db.session.query(Service.id, Service.name, Service.category, Service.base_price).filter(
+            Service.id == job.service_id
+        ).first()
+        people = {user.id: user for user in db.session.query(
+            User.id, User.first_name, User.last_name, User.email, User.phone
+        ).filter(User.id.in_([uid for uid in (job.client_id, job.provider_id) if uid]))}
+        payments = db.session.query(
+            Payment.id, Payment.amount, Payment.currency, Payment.status, Payment.payment_provider,
+            Payment.transaction_id, Payment.created_at, Payment.processed_at
+        ).filter(Payment.job_id == job.id).order_by(Payment.created_at, Payment.id).all()
+
+        amount = job.final_price if job.final_price is not None else \
+            job.estimated_price if job.estimated_price is not None else (service.base_price if service else 0.0)
+        amount = round(float(amount or 0), 2)
+        tax = round(amount * current_app.config['INVOICE_TAX_RATE'], 2)
+        total = round(amount + tax, 2)
+        completed = [p for p in payments if p.status == 'completed']
+        paid = round(sum(p.amount for p in completed), 2)
+
+        if completed and paid >= total:
+            status = 'paid'
+        elif not completed and payments and payments[-1].status in ('failed', 'refunded'):
+            status = payments[-1].status
+        else:
+            status = 'pending'
+        method = (completed or payments)[-1].payment_provider if payments else None
+
+        def person(user_id):
+            user = people.get(user_id)
+            if user is None:
+                return None
+            return {
+                'id': user.id,
+                'name': f'{user.first_name} {user.last_name}',
+                'email': user.email,
+                'phone': user.phone
+            }
+
+        return {
+            'id': invoice.id,
+            'number': invoice.number,
+            'jobId': job.id,
+            'currency': next((p.currency for p in payments if p.currency), DEFAULT_CURRENCY),
+            'amount': amount,
+            'tax': tax,
+            'total': total,
+            'amountPaid': paid,
+            'balanceDue': round(max(total - paid, 0), 2),
+            'paymentMethod': method,
+            'status': status,
+            'createdAt': _iso(invoice.created_at),
+            'paidAt': _iso(max(p.processed_at or p.created_at for p in completed)) if status == 'paid' else None,
+            'client': person(job.client_id),
+            'provider': person(job.provider_id),
+            'service': {'id': service.id, 'name': service.name, 'category': service.category} if service else None,
+            'job': {
+                'id': job.id,
+                'title': job.title,
+                'status': job.status,
+                'address': job.address,
+                'scheduledDate': _iso(job.scheduled_date),
+                'completedAt': _iso(job.completed_at)
+            },
+            'lines': [{'description': f'{service.name}: {job.title}' if service else job.title, 'amount': amount}],
+            'payments': [{
+                'id': p.id,
+                'amount': p.amount,
+                'status': p.status,
+                'method': p.payment_provider,
+                'reference': p.transaction_id,
+                'createdAt': _iso(p.created_at),
+                'processedAt': _iso(p.processed_at)
+            } for p in payments]
+        }
+
+    def _hash(self, document):
+        canonical = json.dumps([RENDER_VERSION, document], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _render(self, document, fmt):
+        if fmt == 'json':
+            return json.dumps(document, separators=(',', ':')).encode()
+        if fmt == 'html':
+            return HTML_TEMPLATE.render(**document).encode()
+        return self._render_pdf(document)
+
+    def _render_pdf(self, document):
+        try:
+            from reportlab.lib.pagesizes import A4
+            from reportlab.pdfgen import canvas
+        except ImportError:
+            raise ValueError('PDF invoices require the reportlab package (pip install reportlab)')
+
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - 60
+
+        def line(text, size=10, bold=False, right=None):
+            nonlocal y
+            pdf.setFont('Helvetica-Bold' if bold else 'Helvetica', size)
+            pdf.drawString(50, y, text)
+            if right is not None:
+                pdf.drawRightString(width - 50, y, right)
+            y -= size + 8
+
+        currency = document['currency']
+        line(f"WiraSasa invoice {document['number']}", size=16, bold=True)
+        line(f"Issued {(document['createdAt'] or '')[:10]}  -  Status: {document['status']}")
+        line(f"Billed to: {document['client']['name']} ({document['client']['email']})")
+        if document['provider']:
+            line(f"Service provider: {document['provider']['name']}")
+        y -= 10
+        for item in document['lines']:
+            line(item['description'], right=f"{currency} {item['amount']:.2f}")
+        line('Tax', right=f"{currency} {document['tax']:.2f}")
+        line('Total', bold=True, right=f"{currency} {document['total']:.2f}")
+        line('Paid', right=f"{currency} {document['amountPaid']:.2f}")
+        line('Balance due', bold=True, right=f"{currency} {document['balanceDue']:.2f}")
+        pdf.showPage()
+        pdf.save()
+        return buffer.getvalue()
+
+    def _store(self):
+        return InvoiceStore(current_app.config['INVOICE_DIR'])
+
+
+def _run_now(fn, *args):
+    """Run fn inline and wrap the outcome in a Future (INVOICE_WORKERS = 0)"""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
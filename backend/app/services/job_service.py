@@ -1,14 +1,27 @@
 """
 Job Service
 """
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models.job import Job, Review
+from app.models.job import Job, JobOffer, Review
+from app.models.user import ProviderProfile
+from app.services.dispatch_service import DispatchService
+from app.services.rating_service import RatingService
+from app.services.stats_service import StatsService
+from app.utils import serializers
+from app.utils.pagination import paginate
 from datetime import datetime
 
 
 class JobService:
     """Handle job-related business logic"""
     
+    def __init__(self):
+        self.dispatch_service = DispatchService()
+        self.rating_service = RatingService()
+        self.stats_service = StatsService()
+    
     def create_job(self, user_id, data):
         """Create a new job"""
         job = Job(
@@ -19,7 +32,7 @@ class JobService:
             address=data.get('address'),
             latitude=data.get('latitude'),
             longitude=data.get('longitude'),
-            scheduled_date=data.get('scheduled_date'),
+            scheduled_date=self._parse_scheduled_date(data.get('scheduled_date')),
             estimated_duration=data.get('estimated_duration'),
             estimated_price=data.get('estimated_price'),
             status='pending'
@@ -28,11 +41,21 @@ class JobService:
         db.session.add(job)
         db.session.commit()
         
-        return self._serialize_job(job)
+        # Offer the job to the first wave of matched providers
+        try:
+            self.dispatch_service.dispatch_job(job.id)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Dispatch failed for job %s', job.id)
+        
+        return serializers.job.dump(job)
     
-    def get_job_by_id(self, job_id, user_id):
-        """Get job by ID"""
-        job = Job.query.get(job_id)
+    def get_job_by_id(self, job_id, user_id, fields=None, view=None):
+        """Get job by ID, selecting only the requested fields"""
+        serializer = serializers.job.projection(fields, view)
+        job = serializer.select(
+            Job.query.filter(Job.id == job_id), Job.client_id, Job.provider_id
+        ).first()
         if not job:
             raise ValueError('Job not found')
         
@@ -40,7 +63,7 @@ class JobService:
         if job.client_id != user_id and job.provider_id != user_id:
             raise ValueError('Unauthorized access')
         
-        return self._serialize_job(job)
+        return serializer.dump(job)
     
     def update_job(self, job_id, user_id, data):
         """Update job"""
@@ -52,71 +75,86 @@ class JobService:
         allowed_fields = ['title', 'description', 'scheduled_date', 'estimated_duration']
         for field in allowed_fields:
             if field in data:
-                setattr(job, field, data[field])
+                value = data[field]
+                if field == 'scheduled_date':
+                    value = self._parse_scheduled_date(value)
+                setattr(job, field, value)
         
         db.session.commit()
-        return self._serialize_job(job)
+        return serializers.job.dump(job)
     
     def cancel_job(self, job_id, user_id):
         """Cancel a job"""
         job = Job.query.get(job_id)
         if not job or job.client_id != user_id:
             raise ValueError('Job not found or unauthorized')
+        if job.status in ('completed', 'cancelled'):
+            raise ValueError(f'Job already {job.status}')
         
         job.status = 'cancelled'
         job.cancelled_at = datetime.utcnow()
+        self.dispatch_service.close_offers(job.id, commit=False)
+        if job.provider_id:
+            self.stats_service.record_job_cancelled(job.provider_id, job.cancelled_at)
         db.session.commit()
         
-        return self._serialize_job(job)
+        return serializers.job.dump(job)
     
-    def get_upcoming_jobs(self, user_id):
-        """Get upcoming jobs for user"""
-        jobs = Job.query.filter(
+    def get_upcoming_jobs(self, user_id, cursor=None, limit=None, fields=None, view=None):
+        """Get upcoming jobs for user, oldest request first"""
+        query = Job.query.filter(
             db.or_(Job.client_id == user_id, Job.provider_id == user_id),
             Job.status.in_(['pending', 'accepted', 'in_progress'])
-        ).all()
-        
-        return [self._serialize_job(job) for job in jobs]
+        )
+        return self._page(query, cursor, limit, fields, view, descending=False)
     
-    def get_job_history(self, user_id):
-        """Get job history for user"""
-        jobs = Job.query.filter(
+    def get_job_history(self, user_id, cursor=None, limit=None, fields=None, view=None):
+        """Get job history for user, newest first"""
+        query = Job.query.filter(
             db.or_(Job.client_id == user_id, Job.provider_id == user_id),
             Job.status.in_(['completed', 'cancelled'])
-        ).all()
-        
-        return [self._serialize_job(job) for job in jobs]
+        )
+        return self._page(query, cursor, limit, fields, view)
     
-    def get_available_jobs(self, user_id):
-        """Get available jobs for providers"""
-        # TODO: Filter by provider's services and location
-        jobs = Job.query.filter_by(status='pending', provider_id=None).all()
-        return [self._serialize_job(job) for job in jobs]
+    def get_available_jobs(self, user_id, cursor=None, limit=None, fields=None, view=None):
+        """Get jobs currently offered to this provider by dispatch, newest first"""
+        query = Job.query.join(JobOffer, JobOffer.job_id == Job.id).filter(
+            JobOffer.provider_id == user_id,
+            JobOffer.status == 'offered',
+            JobOffer.expires_at > datetime.utcnow(),
+            Job.status == 'pending'
+        )
+        return self._page(query, cursor, limit, fields, view)
     
     def accept_job(self, job_id, user_id):
         """Accept a job (for providers)"""
-        job = Job.query.get(job_id)
-        if not job or job.status != 'pending':
-            raise ValueError('Job not available')
+        self.dispatch_service.claim_job(job_id, user_id)
         
-        job.provider_id = user_id
-        job.status = 'accepted'
-        job.accepted_at = datetime.utcnow()
-        db.session.commit()
-        
-        return self._serialize_job(job)
+        job = Job.query.get(job_id)
+        return serializers.job.dump(job)
+    
+    def decline_job(self, job_id, user_id):
+        """Decline a job offered to this provider"""
+        self.dispatch_service.decline_offer(job_id, user_id)
     
     def complete_job(self, job_id, user_id):
         """Mark job as completed"""
         job = Job.query.get(job_id)
         if not job or job.provider_id != user_id:
             raise ValueError('Job not found or unauthorized')
+        if job.status not in ('accepted', 'in_progress'):
+            raise ValueError('Job cannot be completed')
         
         job.status = 'completed'
         job.completed_at = datetime.utcnow()
+        ProviderProfile.query.filter(ProviderProfile.user_id == user_id).update({
+            ProviderProfile.total_jobs_completed: db.func.coalesce(ProviderProfile.total_jobs_completed, 0) + 1,
+            ProviderProfile.updated_at: job.completed_at
+        }, synchronize_session=False)
+        self.stats_service.record_job_completed(user_id, job.completed_at)
         db.session.commit()
         
-        return self._serialize_job(job)
+        return serializers.job.dump(job)
     
     def create_review(self, job_id, user_id, data):
         """Create a review for a job"""
@@ -132,48 +170,59 @@ class JobService:
         else:
             raise ValueError('Unauthorized')
         
+        try:
+            rating = int(data['rating'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Rating is required')
+        if not 1 <= rating <= 5:
+            raise ValueError('Rating must be between 1 and 5')
+        
+        # Each review is counted into the aggregates once, so refuse repeats
+        if Review.query.filter_by(job_id=job_id, reviewer_id=user_id).first():
+            raise ValueError('Job already reviewed')
+        
         review = Review(
             job_id=job_id,
             reviewer_id=user_id,
             reviewee_id=reviewee_id,
-            rating=data['rating'],
+            rating=rating,
             comment=data.get('comment')
         )
         
         db.session.add(review)
+        try:
+            # Insert first: the unique constraint, not the check above, is what
+            # stops a concurrent duplicate before the aggregates change
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            raise ValueError('Job already reviewed')
+        if self.rating_service.record_review(reviewee_id, rating):
+            self.stats_service.record_review(reviewee_id, rating)
         db.session.commit()
         
-        return self._serialize_review(review)
+        return serializers.review.dump(review)
     
-    def _serialize_job(self, job):
-        """Serialize job object"""
+    def _page(self, query, cursor, limit, fields=None, view=None, descending=True):
+        """Fetch one page of jobs, selecting only the requested fields"""
+        serializer = serializers.job.projection(fields, view)
+        sort_keys = [Job.created_at, Job.id]
+        jobs, next_cursor = paginate(
+            serializer.select(query, *sort_keys), sort_keys, cursor, limit, descending
+        )
         return {
-            'id': job.id,
-            'client_id': job.client_id,
-            'provider_id': job.provider_id,
-            'service_id': job.service_id,
-            'title': job.title,
-            'description': job.description,
-            'status': job.status,
-            'address': job.address,
-            'latitude': job.latitude,
-            'longitude': job.longitude,
-            'scheduled_date': job.scheduled_date.isoformat() if job.scheduled_date else None,
-            'estimated_duration': job.estimated_duration,
-            'estimated_price': job.estimated_price,
-            'final_price': job.final_price,
-            'created_at': job.created_at.isoformat(),
-            'updated_at': job.updated_at.isoformat()
+            'items': serializer.dump_many(jobs),
+            'next_cursor': next_cursor
         }
     
-    def _serialize_review(self, review):
-        """Serialize review object"""
-        return {
-            'id': review.id,
-            'job_id': review.job_id,
-            'reviewer_id': review.reviewer_id,
-            'reviewee_id': review.reviewee_id,
-            'rating': review.rating,
-            'comment': review.comment,
-            'created_at': review.created_at.isoformat()
-        }
+    def _parse_scheduled_date(self, value):
+        """ISO datetime from a request as naive local time, which schedules use"""
+        if value in (None, ''):
+            return None
+        if isinstance(value, datetime):
+            return value
+        try:
+            moment = datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError('scheduled_date must be an ISO datetime')
+        return self.dispatch_service.availability_service.local_time(moment)
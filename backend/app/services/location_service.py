@@ -0,0 +1,381 @@
+"""
+Location Service - provider positions and proximity matching
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import bindparam, insert, update
+from app import db
+from app.models.user import ProviderProfile
+from app.models.service import Service, ProviderService
+from app.models.location import ProviderLocation
+from app.utils import serializers
+from app.utils.background import run_periodically
+from app.utils.geo_index import GeoIndex, haversine_km
+from app.utils.upsert import upsert_insert
+
+# Latest provider positions, shared by every request handled in this process.
+# Keyed by user id and indexed under each service id, name and category the
+# provider offers, so /providers/nearby never scans the provider table.
+provider_index = GeoIndex()
+
+AVERAGE_SPEED_KMH = 40  # matches the mobile app's fallback ETA estimate
+FLUSH_CHUNK_SIZE = 500
+# Rows are re-read this far behind the newest updated_at already synced, so a
+# flush that committed after a later-stamped one is not missed
+SYNC_OVERLAP = timedelta(seconds=30)
+NEARBY_PROVIDER = serializers.provider.only([
+    'id', 'user_id', 'bio', 'experience_years', 'rating', 'total_reviews',
+    'is_available', 'verification_status'
+])
+
+
+class LocationBuffer:
+    """
+    Coalesces provider fixes in memory between bulk flushes.
+
+    Only the newest fix per provider is kept, so a provider reporting every
+    second costs one row write per flush interval instead of one per report.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # provider_id -> (latitude, longitude, recorded_at)
+        self.received = 0
+        self.written = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, provider_id, latitude, longitude, recorded_at):
+        """Buffer a fix, replacing any older pending fix for the provider"""
+        with self._lock:
+            self.received += 1
+            current = self._pending.get(provider_id)
+            if current is None or recorded_at >= current[2]:
+                self._pending[provider_id] = (latitude, longitude, recorded_at)
+
+    def drain(self):
+        """Take every pending fix, leaving the buffer empty"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending):
+        """Put back fixes from a failed flush unless newer ones arrived meanwhile"""
+        for provider_id, (latitude, longitude, recorded_at) in pending.items():
+            with self._lock:
+                current = self._pending.get(provider_id)
+                if current is None or recorded_at > current[2]:
+                    self._pending[provider_id] = (latitude, longitude, recorded_at)
+
+    def flush(self):
+        """
+        Write pending fixes to provider_locations in bulk; returns fixes flushed
+
+        Each row is upserted and only replaces a stored fix with an older
+        recorded_at, so workers flushing the same provider in any order keep
+        the newest fix and never collide on the first insert.
+        """
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        now = datetime.utcnow()
+        rows = [{
+            'provider_id': provider_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'recorded_at': datetime.utcfromtimestamp(recorded_at),
+            'updated_at': now
+        } for provider_id, (latitude, longitude, recorded_at) in pending.items()]
+        try:
+            for start in range(0, len(rows), FLUSH_CHUNK_SIZE):
+                self._write(rows[start:start + FLUSH_CHUNK_SIZE])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.restore(pending)
+            raise
+
+        self.written += len(pending)
+        return len(pending)
+
+    def _write(self, rows):
+        upsert = upsert_insert()
+        if upsert is not None:
+            statement = upsert(ProviderLocation)
+            statement = statement.on_conflict_do_update(
+                index_elements=['provider_id'],
+                set_={c: statement.excluded[c] for c in ('latitude', 'longitude', 'recorded_at', 'updated_at')},
+                where=statement.excluded.recorded_at > ProviderLocation.recorded_at
+            )
+            db.session.execute(statement, rows)
+            return
+
+        table = ProviderLocation.__table__
+        existing = {row[0] for row in db.session.query(ProviderLocation.provider_id).filter(
+            ProviderLocation.provider_id.in_([row['provider_id'] for row in rows])
+        )}
+        updates = [{'b_' + k: v for k, v in row.items()} for row in rows if row['provider_id'] in existing]
+        inserts = [row for row in rows if row['provider_id'] not in existing]
+        if updates:
+            db.session.execute(update(table).where(
+                table.c.provider_id == bindparam('b_provider_id'),
+                table.c.recorded_at < bindparam('b_recorded_at')
+            ).values(
+                latitude=bindparam('b_latitude'),
+                longitude=bindparam('b_longitude'),
+                recorded_at=bindparam('b_recorded_at'),
+                updated_at=bindparam('b_updated_at')
+            ), updates)
+        if inserts:
+            db.session.execute(insert(table), inserts)
+
+
+location_buffer = LocationBuffer()
+
+
+class ProviderIndexSync:
+    """
+    Loads provider_locations into this process's provider_index.
+
+    Fixes reach only the worker that received them, so every worker reads
+    the rows other workers flushed: all fresh rows on first use (a cold
+    index after a restart), then only rows whose updated_at moved since
+    the previous sync. A fix is applied only if it is newer than the one
+    already indexed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermark = None  # newest updated_at seen in provider_locations
+        self.synced_at = None
+
+    def is_stale(self, max_age):
+        """True when never synced or last synced more than max_age seconds ago"""
+        return self.synced_at is None or time.monotonic() - self.synced_at >= max_age
+
+    def refresh(self, max_age):
+        """Sync unless another thread did within max_age seconds; returns fixes applied"""
+        if not self.is_stale(max_age):
+            return 0
+        with self._lock:
+            if not self.is_stale(max_age):
+                return 0
+            return self.sync()
+
+    def sync(self):
+        query = db.session.query(
+            ProviderLocation.provider_id, ProviderLocation.latitude, ProviderLocation.longitude,
+            ProviderLocation.recorded_at, ProviderLocation.updated_at
+        )
+        if provider_index.ttl_seconds:
+            # Older positions would be treated as offline anyway
+            query = query.filter(ProviderLocation.recorded_at >=
+                                 datetime.utcnow() - timedelta(seconds=provider_index.ttl_seconds))
+        if self.watermark is not None:
+            query = query.filter(ProviderLocation.updated_at >= self.watermark - SYNC_OVERLAP)
+        rows = query.all()
+        self.synced_at = time.monotonic()
+
+        fixes = []
+        for provider_id, latitude, longitude, recorded_at, updated_at in rows:
+            if updated_at and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+            recorded_at = recorded_at.replace(tzinfo=timezone.utc).timestamp()
+            current = provider_index.get(provider_id)
+            if current is None or recorded_at > current[2]:
+                fixes.append((provider_id, latitude, longitude, recorded_at))
+        if not fixes:
+            return 0
+
+        keys = LocationService()._service_keys([f[0] for f in fixes if f[0] not in provider_index])
+        for provider_id, latitude, longitude, recorded_at in fixes:
+            provider_index.upsert(provider_id, latitude, longitude, keys=keys.get(provider_id),
+                                  updated_at=recorded_at)
+        return len(fixes)
+
+
+index_sync = ProviderIndexSync()
+
+
+def sync_provider_index():
+    """Bring provider_index up to date with other workers, at most every LOCATION_SYNC_INTERVAL seconds"""
+    return index_sync.refresh(current_app.config['LOCATION_SYNC_INTERVAL'])
+
+
+def start_location_flusher(app):
+    """Flush buffered provider locations every LOCATION_FLUSH_INTERVAL seconds"""
+    run_periodically(app, 'location-flusher', app.config.get('LOCATION_FLUSH_INTERVAL'),
+                     location_buffer.flush, run_at_exit=True)
+
+
+def _to_epoch_seconds(timestamp):
+    """Normalize a device timestamp (epoch seconds or milliseconds) to seconds"""
+    now = time.time()
+    if timestamp is None:
+        return now
+    timestamp = float(timestamp)
+    if timestamp > 1e11:
+        timestamp /= 1000.0
+    # Never trust a device clock that runs ahead of ours
+    return min(timestamp, now)
+
+
+class LocationService:
+    """Handle provider location tracking and proximity search"""
+
+    def update_provider_location(self, provider_id, latitude, longitude, timestamp=None):
+        """Record a provider's latest position in the spatial index and write buffer"""
+        provider_id = int(provider_id)
+        recorded_at = _to_epoch_seconds(timestamp)
+
+        current = provider_index.get(provider_id)
+        if current and current[2] > recorded_at:
+            return False  # an out-of-order fix older than what we already have
+
+        keys = None if provider_id in provider_index else self._service_keys([provider_id])[provider_id]
+        provider_index.upsert(provider_id, float(latitude), float(longitude), keys=keys,
+                              updated_at=recorded_at)
+        location_buffer.add(provider_id, float(latitude), float(longitude), recorded_at)
+        return True
+
+    def update_provider_locations(self, provider_id, fixes):
+        """
+        Record a batch of fixes buffered on the device
+
+        Only the newest fix is applied; the rest are superseded before they
+        reach the index or the database.
+
+        Returns:
+            int: Number of fixes accepted, leaving out invalid ones and any
+                older than the position already recorded
+        """
+        previous = provider_index.get(int(provider_id))
+        valid = []
+        for fix in fixes:
+            try:
+                latitude, longitude = float(fix['latitude']), float(fix['longitude'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                valid.append((latitude, longitude, _to_epoch_seconds(fix.get('timestamp'))))
+        if not valid:
+            return 0
+
+        latest = valid[0]
+        for fix in valid:
+            if fix[2] >= latest[2]:
+                latest = fix
+        if not self.update_provider_location(provider_id, *latest):
+            return 0
+        return sum(1 for fix in valid if previous is None or fix[2] >= previous[2])
+
+    def refresh_provider_services(self, provider_id):
+        """Re-index a provider after their offered services change"""
+        provider_id = int(provider_id)
+        if provider_id in provider_index:
+            provider_index.set_keys(provider_id, self._service_keys([provider_id])[provider_id])
+
+    def find_nearby_providers(self, latitude, longitude, service_type, radius=10, limit=None):
+        """
+        Find available providers offering a service near a location
+
+        Args:
+            service_type: Service id, name or category
+            radius (float): Search radius in kilometres
+            limit (int): Return only the k nearest providers
+        """
+        key = str(service_type).strip().lower()
+        latitude, longitude, radius = float(latitude), float(longitude), float(radius)
+        sync_provider_index()
+
+        if limit:
+            matches = provider_index.nearest(key, latitude, longitude, int(limit), max_km=radius)
+        else:
+            matches = provider_index.within_radius(key, latitude, longitude, radius)
+
+        if not matches:
+            return []
+
+        profiles = NEARBY_PROVIDER.select(ProviderProfile.query.filter(
+            ProviderProfile.user_id.in_([user_id for _, user_id in matches]),
+            ProviderProfile.is_available == True
+        )).all()
+        profiles_by_user = {p.user_id: p for p in profiles}
+
+        providers = []
+        for distance, user_id in matches:
+            profile = profiles_by_user.get(user_id)
+            point = provider_index.get(user_id)
+            if not profile or not point:
+                continue
+            providers.append({
+                **NEARBY_PROVIDER.dump(profile),
+                'location': {'latitude': point[0], 'longitude': point[1]},
+                'distance': round(distance, 2)
+            })
+
+        return providers
+
+    def calculate_distance_and_eta(self, origin_lat, origin_lng, dest_lat, dest_lng):
+        """Calculate straight-line distance and an ETA estimate"""
+        distance = haversine_km(float(origin_lat), float(origin_lng), float(dest_lat), float(dest_lng))
+        return {
+            'distance': round(distance, 1),
+            'duration': max(1, round(distance / AVERAGE_SPEED_KMH * 60))
+        }
+
+    def geocode_address(self, address):
+        """Convert address to coordinates"""
+        # TODO: Integrate with geocoding provider
+        return None
+
+    def reverse_geocode(self, latitude, longitude):
+        """Convert coordinates to address"""
+        # TODO: Integrate with geocoding provider
+        return None
+
+    def get_provider_location(self, provider_id):
+        """Get provider's latest known position"""
+        provider_id = int(provider_id)
+        sync_provider_index()
+        point = provider_index.get(provider_id)
+        if point:
+            return {
+                'provider_id': provider_id,
+                'latitude': point[0],
+                'longitude': point[1],
+                'updated_at': datetime.utcfromtimestamp(point[2]).isoformat()
+            }
+
+        # Offline providers drop out of the index; report their last known position
+        location = ProviderLocation.query.get(provider_id)
+        if not location:
+            return None
+        return {
+            'provider_id': provider_id,
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'updated_at': location.recorded_at.isoformat()
+        }
+
+    def _service_keys(self, user_ids):
+        """Index keys (service id, name, category) of each provider's active services"""
+        keys = {user_id: set() for user_id in user_ids}
+        if not keys:
+            return keys
+        rows = Service.query.join(
+            ProviderService, ProviderService.service_id == Service.id
+        ).join(
+            ProviderProfile, ProviderProfile.id == ProviderService.provider_id
+        ).filter(
+            ProviderProfile.user_id.in_(list(keys)),
+            ProviderService.is_active == True
+        ).with_entities(ProviderProfile.user_id, Service.id, Service.name, Service.category).all()
+
+        for user_id, service_id, name, category in rows:
+            keys[user_id].update((str(service_id), name.strip().lower(), category.strip().lower()))
+        return keys
@@ -0,0 +1,285 @@
+"""
+M-Pesa Callback Service - durable inbox for STK push results
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.payment import MpesaCallback, Payment
+from app.services.payment_service import PaymentService
+from app.utils.background import run_periodically
+from app.utils.payment_gateway import GatewayRejected, get_payment_gateway
+
+# Set after a callback is stored so this process's workers pick it up at once;
+# callbacks received by other processes wait for MPESA_CALLBACK_POLL_INTERVAL
+callbacks_received = threading.Event()
+
+
+def parse_stk_callback(data):
+    """
+    Fields of a Daraja STK push callback body
+
+    Returns:
+        dict: checkout_request_id, result_code, result_desc, amount,
+            receipt_number and phone_number (the last three only on success)
+    """
+    try:
+        callback = data['Body']['stkCallback']
+        checkout_request_id = str(callback['CheckoutRequestID'])
+        result_code = int(callback['ResultCode'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Malformed STK callback')
+
+    items = (callback.get('CallbackMetadata') or {}).get('Item') or []
+    metadata = {item.get('Name'): item.get('Value') for item in items if isinstance(item, dict)}
+    return {
+        'checkout_request_id': checkout_request_id,
+        'result_code': result_code,
+        'result_desc': callback.get('ResultDesc'),
+        'amount': metadata.get('Amount'),
+        'receipt_number': metadata.get('MpesaReceiptNumber'),
+        'phone_number': metadata.get('PhoneNumber')
+    }
+
+
+class MpesaCallbackService:
+    """
+    Accept M-Pesa callbacks immediately and apply them in batches.
+
+    receive() only stores the raw body, keyed by CheckoutRequestID, so the
+    acknowledgement never waits on payment processing and a retried callback
+    is stored once. Worker threads claim stored callbacks in batches and
+    settle their payments (matched on Payment.transaction_id) in one
+    transaction per batch; settling skips payments that are no longer
+    pending, so nothing is applied twice.
+
+    The endpoint is unauthenticated and CheckoutRequestIDs are shown to
+    clients, so a callback body is never trusted on its own: each one is
+    confirmed with the payment gateway's STK query before its payment
+    changes. Callbacks the gateway does not confirm are marked unverified
+    (the reconciler settles their payments later), and a later callback
+    with the same CheckoutRequestID replaces anything not yet processed.
+    """
+
+    def __init__(self):
+        self.payment_service = PaymentService()
+
+    def receive(self, payload):
+        """
+        Store a callback body for processing
+
+        Returns:
+            bool: False when a callback for the same payment was already processed
+        """
+        try:
+            result = parse_stk_callback(json.loads(payload))
+        except ValueError:
+            raise ValueError('Malformed STK callback')
+
+        db.session.add(MpesaCallback(checkout_request_id=result['checkout_request_id'], payload=payload))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # A retry, or the real callback after a forged one: queue it again
+            # unless the payment was already settled from a verified callback
+            requeued = MpesaCallback.query.filter(
+                MpesaCallback.checkout_request_id == result['checkout_request_id'],
+                MpesaCallback.status != 'processed'
+            ).update({
+                'payload': payload,
+                'status': 'received',
+                'error': None,
+                'received_at': datetime.utcnow(),
+                'processed_at': None
+            }, synchronize_session=False)
+            db.session.commit()
+            if not requeued:
+                return False
+
+        if current_app.config['MPESA_CALLBACK_WORKERS']:
+            callbacks_received.set()
+        else:
+            # No workers (tests): settle before answering; the callback is
+            # already stored, so a failure here must not fail the request
+            try:
+                self.process_pending()
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('M-Pesa callback processing failed')
+        return True
+
+    def process_pending(self, batch_size=None):
+        """
+        Settle the oldest batch of stored callbacks
+
+        Returns:
+            int: Callbacks claimed
+        """
+        batch_size = batch_size or current_app.config['MPESA_CALLBACK_BATCH_SIZE']
+        # SKIP LOCKED lets concurrent workers claim disjoint batches
+        callbacks = MpesaCallback.query.filter(
+            MpesaCallback.status == 'received'
+        ).order_by(MpesaCallback.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not callbacks:
+            return 0
+
+        callback_ids = [callback.id for callback in callbacks]
+        try:
+            settled = self._settle(callbacks)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('M-Pesa callback batch failed, retrying one at a time')
+            for callback_id in callback_ids:
+                self._settle_one(callback_id)
+            return len(callback_ids)
+        self._publish(settled)
+        return len(callback_ids)
+
+    def drain(self):
+        """Process batches until no stored callbacks are left"""
+        batch_size = current_app.config['MPESA_CALLBACK_BATCH_SIZE']
+        while self.process_pending(batch_size) >= batch_size:
+            pass
+
+    def _settle(self, callbacks):
+        """
+        Verify claimed callbacks and apply them to their payments, without committing
+
+        The claim (row locks on the callbacks only) is held while the
+        gateway is asked, at most PAYMENT_RECONCILE_CONCURRENCY at a time.
+
+        Returns:
+            list: Status snapshots of the payments that changed
+        """
+        now = datetime.utcnow()
+        results = {}
+        settled = []
+        for callback in callbacks:
+            try:
+                results[callback.id] = parse_stk_callback(json.loads(callback.payload))
+            except ValueError as e:
+                self._fail(callback, e, now)
+
+        claimed = {callback.id: callback for callback in callbacks}
+        for callback_id, outcome in self._verify(results).items():
+            if isinstance(outcome, str):
+                self._fail(claimed[callback_id], outcome, now, status='unverified')
+                del results[callback_id]
+            else:
+                results[callback_id] = outcome
+
+        transaction_ids = {result['checkout_request_id'] for result in results.values()}
+        payments = {}
+        if transaction_ids:
+            payments = {payment.transaction_id: payment for payment in Payment.query.filter(
+                Payment.transaction_id.in_(transaction_ids)
+            ).with_for_update()}
+
+        for callback in callbacks:
+            result = results.get(callback.id)
+            if result is None:
+                continue
+            payment = payments.get(result['checkout_request_id'])
+            if payment is None:
+                self._fail(callback, 'No payment for this CheckoutRequestID', now)
+                continue
+            try:
+                if self.payment_service.apply_mpesa_result(payment, result, now):
+                    settled.append(self.payment_service.snapshot_status(payment))
+            except ValueError as e:
+                self._fail(callback, e, now)
+                continue
+            callback.status = 'processed'
+            callback.processed_at = now
+        # Changed payments and callbacks go out as one flush per batch
+        return settled
+
+    def _verify(self, results):
+        """
+        Confirm parsed callbacks with the payment gateway
+
+        Returns:
+            dict: For each callback id, the result to apply (the callback's
+                own fields with the gateway's result code) or, when the
+                gateway does not confirm it, the reason as a string
+        """
+        if not results:
+            return {}
+        gateway = get_payment_gateway()
+        concurrency = min(len(results), current_app.config['PAYMENT_RECONCILE_CONCURRENCY'])
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='mpesa-verify') as pool:
+            outcomes = dict(zip(results, pool.map(
+                lambda result: self._query(gateway, result['checkout_request_id']), results.values()
+            )))
+
+        verified = {}
+        for callback_id, outcome in outcomes.items():
+            result = results[callback_id]
+            if isinstance(outcome, GatewayRejected):
+                verified[callback_id] = f'Gateway rejected the query: {outcome}'
+            elif isinstance(outcome, Exception):
+                verified[callback_id] = f'Gateway query failed: {outcome}'
+            elif outcome is None:
+                verified[callback_id] = 'Gateway has no outcome yet'
+            elif (outcome['result_code'] == 0) != (result['result_code'] == 0):
+                verified[callback_id] = f"Gateway reports result {outcome['result_code']}, " \
+                                        f"callback {result['result_code']}"
+            else:
+                verified[callback_id] = {
+                    **result,
+                    'result_code': outcome['result_code'],
+                    'result_desc': outcome.get('result_desc') or result['result_desc']
+                }
+        return verified
+
+    def _query(self, gateway, transaction_id):
+        try:
+            return gateway.query_status(transaction_id)
+        except Exception as e:
+            return e
+
+    def _settle_one(self, callback_id):
+        callback = MpesaCallback.query.filter_by(
+            id=callback_id, status='received'
+        ).with_for_update(skip_locked=True).first()
+        if callback is None:
+            return
+        try:
+            settled = self._settle([callback])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception('M-Pesa callback %s failed', callback_id)
+            MpesaCallback.query.filter_by(id=callback_id).update({
+                'status': 'failed',
+                'error': str(e)[:255],
+                'processed_at': datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+            return
+        self._publish(settled)
+
+    def _publish(self, settled):
+        """Tell status waiters about payments that just committed"""
+        for snapshot in settled:
+            try:
+                self.payment_service.publish_status(snapshot)
+            except Exception:
+                current_app.logger.exception('Publishing payment status failed')
+
+    def _fail(self, callback, error, now, status='failed'):
+        callback.status = status
+        callback.error = str(error)[:255]
+        callback.processed_at = now
+
+
+def start_callback_workers(app):
+    """Run MPESA_CALLBACK_WORKERS threads that settle stored M-Pesa callbacks"""
+    for number in range(app.config.get('MPESA_CALLBACK_WORKERS') or 0):
+        run_periodically(app, f'mpesa-callbacks-{number}', app.config.get('MPESA_CALLBACK_POLL_INTERVAL'),
+                         MpesaCallbackService().drain, wake=callbacks_received)
@@ -3,19 +3,29 @@ Notification Service
 """
 from app import db
 from app.models.notification import Notification
+from app.services.badge_service import BadgeService
+from app.utils import serializers
+from app.utils.pagination import paginate
 from datetime import datetime
 
 
 class NotificationService:
     """Handle notification-related business logic"""
     
-    def get_notifications(self, user_id):
-        """Get user notifications"""
-        notifications = Notification.query.filter_by(user_id=user_id).order_by(
-            Notification.created_at.desc()
-        ).all()
+    def __init__(self):
+        self.badge_service = BadgeService()
+    
+    def get_notifications(self, user_id, cursor=None, limit=None, fields=None, view=None):
+        """Get user notifications, newest first"""
+        serializer = serializers.notification.projection(fields, view)
+        sort_keys = [Notification.created_at, Notification.id]
+        query = serializer.select(Notification.query.filter_by(user_id=user_id), *sort_keys)
+        notifications, next_cursor = paginate(query, sort_keys, cursor, limit)
         
-        return [self._serialize_notification(n) for n in notifications]
+        return {
+            'items': serializer.dump_many(notifications),
+            'next_cursor': next_cursor
+        }
     
     def create_notification(self, user_id, data):
         """Create a new notification"""
@@ -28,12 +38,39 @@ class NotificationService:
         )
         
         db.session.add(notification)
+        self.badge_service.adjust_notifications([user_id], 1)
         db.session.commit()
         
-        return self._serialize_notification(notification)
+        return serializers.notification.dump(notification)
+    
+    def notify_users(self, user_ids, data):
+        """Create the same notification for several users in one commit"""
+        for user_id in user_ids:
+            db.session.add(Notification(
+                user_id=user_id,
+                type=data['type'],
+                title=data['title'],
+                message=data.get('message'),
+                data=data.get('data')
+            ))
+        self.badge_service.adjust_notifications(user_ids, 1)
+        db.session.commit()
     
     def mark_as_read(self, user_id, notification_id):
         """Mark notification as read"""
+        # Conditional update so concurrent reads decrement the badge only once
+        marked = Notification.query.filter_by(
+            id=notification_id,
+            user_id=user_id,
+            is_read=False
+        ).update({
+            'is_read': True,
+            'read_at': datetime.utcnow()
+        }, synchronize_session=False)
+        if marked:
+            self.badge_service.adjust_notifications([user_id], -1)
+        db.session.commit()
+        
         notification = Notification.query.filter_by(
             id=notification_id, 
             user_id=user_id
@@ -42,18 +79,17 @@ class NotificationService:
         if not notification:
             raise ValueError('Notification not found')
         
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-        db.session.commit()
-        
-        return self._serialize_notification(notification)
+        return serializers.notification.dump(notification)
     
     def mark_all_as_read(self, user_id):
         """Mark all notifications as read"""
-        Notification.query.filter_by(user_id=user_id, is_read=False).update({
+        # Subtract what was marked rather than zeroing, so notifications that
+        # arrive concurrently stay counted
+        marked = Notification.query.filter_by(user_id=user_id, is_read=False).update({
             'is_read': True,
             'read_at': datetime.utcnow()
-        })
+        }, synchronize_session=False)
+        self.badge_service.adjust_notifications([user_id], -marked)
         db.session.commit()
     
     def delete_notification(self, user_id, notification_id):
@@ -66,18 +102,7 @@ class NotificationService:
         if not notification:
             raise ValueError('Notification not found')
         
+        if not notification.is_read:
+            self.badge_service.adjust_notifications([user_id], -1)
         db.session.delete(notification)
         db.session.commit()
-    
-    def _serialize_notification(self, notification):
-        """Serialize notification object"""
-        return {
-            'id': notification.id,
-            'type': notification.type,
-            'title': notification.title,
-            'message': notification.message,
-            'data': notification.data,
-            'is_read': notification.is_read,
-            'created_at': notification.created_at.isoformat(),
-            'read_at': notification.read_at.isoformat() if notification.read_at else None
-        }
@@ -1,17 +1,55 @@
 """
 Payment Service
 """
+import json
+import time
+from datetime import datetime
+from flask import current_app
 from app import db
+from app.models.job import Job
 from app.models.payment import PaymentMethod, Payment
+from app.services.stats_service import StatsService
+from app.utils import serializers
+from app.utils.pagination import paginate
+from app.utils.pubsub import get_broker
+from app.utils.ttl_cache import TTLCache
+
+DEFAULT_CURRENCY = 'KES'
+# Payment.status as reported to the app while it waits for an STK push
+CLIENT_STATUSES = {'pending': 'pending', 'processing': 'pending', 'completed': 'success'}
+STATUS_STREAM_SECONDS = 180  # STK pushes expire well before this
+
+# (payer_id, payee_id, status) by transaction id, so repeated status checks
+# skip the DB for PAYMENT_STATUS_CACHE_SECONDS; settling a payment in this
+# process replaces its entry at once
+status_cache = TTLCache(max_entries=10000)
+
+
+def _status_payload(payment):
+    """Client-facing status of a payment (ORM object or column row)"""
+    status = CLIENT_STATUSES.get(payment.status, 'failed')
+    payload = {
+        'transactionId': payment.transaction_id,
+        'status': status,
+        'paymentStatus': payment.status,
+        'amount': payment.amount,
+        'processedAt': payment.processed_at.isoformat() if payment.processed_at else None
+    }
+    if status == 'failed':
+        payload['message'] = 'Payment was not completed'
+    return payload
 
 
 class PaymentService:
     """Handle payment-related business logic"""
     
+    def __init__(self):
+        self.stats_service = StatsService()
+    
     def get_payment_methods(self, user_id):
         """Get user's payment methods"""
         methods = PaymentMethod.query.filter_by(user_id=user_id, is_active=True).all()
-        return [self._serialize_payment_method(m) for m in methods]
+        return serializers.payment_method.dump_many(methods)
     
     def add_payment_method(self, user_id, data):
         """Add new payment method"""
@@ -28,7 +66,7 @@ class PaymentService:
         db.session.add(method)
         db.session.commit()
         
-        return self._serialize_payment_method(method)
+        return serializers.payment_method.dump(method)
     
     def delete_payment_method(self, user_id, method_id):
         """Delete payment method"""
@@ -44,29 +82,191 @@ class PaymentService:
         # TODO: Integrate with payment provider (Stripe, M-Pesa, etc.)
         return {}
     
-    def get_payment_history(self, user_id):
-        """Get payment history"""
-        payments = Payment.query.filter_by(payer_id=user_id).all()
-        return [self._serialize_payment(p) for p in payments]
+    def confirm_cash_payment(self, job_id, amount, user_id):
+        """Record cash the provider has received for a job"""
+        job = Job.query.get(job_id)
+        if not job or job.provider_id != user_id:
+            return {'success': False, 'error': 'Job not found or unauthorized'}
+        if job.status not in ('accepted', 'in_progress', 'completed'):
+            return {'success': False, 'error': 'Job has not been accepted'}
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return {'success': False, 'error': 'Invalid amount'}
+        if amount <= 0:
+            return {'success': False, 'error': 'Invalid amount'}
+        
+        payment = Payment(
+            job_id=job.id,
+            payer_id=job.client_id,
+            payee_id=user_id,
+            amount=amount,
+            currency=DEFAULT_CURRENCY,
+            status='pending',
+            payment_provider='cash'
+        )
+        db.session.add(payment)
+        self._mark_completed(payment)
+        db.session.commit()
+        
+        return {'success': True, 'payment': serializers.payment.dump(payment)}
     
-    def _serialize_payment_method(self, method):
-        """Serialize payment method object"""
-        return {
-            'id': method.id,
-            'type': method.type,
-            'card_last_four': method.card_last_four,
-            'card_brand': method.card_brand,
-            'phone_number': method.phone_number,
-            'is_default': method.is_default
-        }
+    def check_mpesa_payment_status(self, transaction_id, user_id, wait=0):
+        """
+        Status of an STK push payment, optionally waiting for it to settle
+        
+        Args:
+            wait (float): Seconds to hold the request while the payment is
+                pending, capped at PAYMENT_STATUS_MAX_WAIT; the answer goes out
+                as soon as the callback is applied
+        """
+        wait = min(max(float(wait or 0), 0.0), current_app.config['PAYMENT_STATUS_MAX_WAIT'])
+        if not wait:
+            return self._get_status(transaction_id, user_id)
+        
+        # Subscribe before reading so a settlement in between is not missed
+        subscription = get_broker().subscribe(self.channel(transaction_id))
+        try:
+            status = self._get_status(transaction_id, user_id)
+            if status['status'] != 'pending':
+                return status
+            db.session.close()
+            for settled in self._watch_status(transaction_id, user_id, subscription, wait):
+                if settled is not None:
+                    return settled
+            return status
+        finally:
+            subscription.close()
+    
+    def stream_mpesa_payment_status(self, transaction_id, user_id, heartbeat=15):
+        """
+        Server-Sent Events stream of an STK push payment's status
+        
+        Sends the current status, then the settled one, and ends.
+        
+        Returns:
+            generator: SSE-formatted chunks
+        """
+        subscription = get_broker().subscribe(self.channel(transaction_id))
+        try:
+            status = self._get_status(transaction_id, user_id)
+        except Exception:
+            subscription.close()
+            raise
+        # Release the pooled connection while the stream idles
+        db.session.close()
+        
+        def generate():
+            try:
+                yield self._format_event(status)
+                if status['status'] != 'pending':
+                    return
+                idle = 0.0
+                recheck = current_app.config['PAYMENT_STATUS_RECHECK_SECONDS']
+                for settled in self._watch_status(transaction_id, user_id, subscription, STATUS_STREAM_SECONDS):
+                    if settled is not None:
+                        yield self._format_event(settled)
+                        return
+                    idle += recheck
+                    if idle >= heartbeat:
+                        idle = 0.0
+                        yield ': keep-alive\n\n'
+            finally:
+                subscription.close()
+        
+        return generate()
+    
+    def channel(self, transaction_id):
+        return f'payment:{transaction_id}'
+    
+    def snapshot_status(self, payment):
+        """Status cache entry for a payment; take it before committing expires the object"""
+        return payment.payer_id, payment.payee_id, _status_payload(payment)
+    
+    def publish_status(self, snapshot):
+        """Cache a committed status change and wake everyone waiting on it"""
+        status = snapshot[2]
+        status_cache.set(status['transactionId'], snapshot, current_app.config['PAYMENT_STATUS_CACHE_SECONDS'])
+        get_broker().publish(self.channel(status['transactionId']), status)
+    
+    def apply_mpesa_result(self, payment, result, processed_at=None):
+        """
+        Settle a payment from a parsed STK push callback, without committing
+        
+        Only pending and processing payments change, so a replayed callback
+        is a no-op. Returns False when the payment was already settled.
+        """
+        if payment.status not in ('pending', 'processing'):
+            return False
+        if result['result_code'] != 0:
+            payment.status = 'failed'
+            payment.processed_at = processed_at or datetime.utcnow()
+            return True
+        if result['amount'] is not None and abs(float(result['amount']) - payment.amount) >= 0.01:
+            raise ValueError(f"Paid amount {result['amount']} does not match {payment.amount}")
+        self._mark_completed(payment, processed_at)
+        return True
     
-    def _serialize_payment(self, payment):
-        """Serialize payment object"""
+    def _get_status(self, transaction_id, user_id):
+        snapshot = status_cache.get(transaction_id)
+        if snapshot is None:
+            payment = db.session.query(
+                Payment.transaction_id, Payment.payer_id, Payment.payee_id,
+                Payment.status, Payment.amount, Payment.processed_at
+            ).filter(Payment.transaction_id == transaction_id).first()
+            if payment is None:
+                raise ValueError('Payment not found')
+            snapshot = self.snapshot_status(payment)
+            status_cache.set(transaction_id, snapshot, current_app.config['PAYMENT_STATUS_CACHE_SECONDS'])
+        
+        payer_id, payee_id, status = snapshot
+        if user_id not in (payer_id, payee_id):
+            raise ValueError('Payment not found')
+        return status
+    
+    def _watch_status(self, transaction_id, user_id, subscription, timeout):
+        """
+        Wait up to timeout seconds for a pending payment to settle
+        
+        Yields None every PAYMENT_STATUS_RECHECK_SECONDS while it is still
+        pending, then the settled status.
+        """
+        deadline = time.monotonic() + timeout
+        recheck = current_app.config['PAYMENT_STATUS_RECHECK_SECONDS']
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            status = subscription.get(timeout=min(remaining, recheck))
+            if status is None:
+                # Payments settled by another worker only show up in the DB
+                # when the broker is in-process
+                status = self._get_status(transaction_id, user_id)
+                db.session.close()
+            if status['status'] != 'pending':
+                yield status
+                return
+            yield None
+    
+    def _format_event(self, status):
+        """Format a status as a Server-Sent Event"""
+        return f"event: status\ndata: {json.dumps(status)}\n\n"
+    
+    def _mark_completed(self, payment, processed_at=None):
+        """Complete a payment and credit the payee's earnings, without committing"""
+        if payment.status == 'completed':
+            return
+        payment.status = 'completed'
+        payment.processed_at = processed_at or datetime.utcnow()
+        self.stats_service.record_payment(payment.payee_id, payment.amount, payment.processed_at)
+    
+    def get_payment_history(self, user_id, cursor=None, limit=None):
+        """Get payment history, newest first"""
+        query = Payment.query.filter_by(payer_id=user_id)
+        payments, next_cursor = paginate(
+            serializers.payment.select(query), [Payment.created_at, Payment.id], cursor, limit
+        )
         return {
-            'id': payment.id,
-            'job_id': payment.job_id,
-            'amount': payment.amount,
-            'currency': payment.currency,
-            'status': payment.status,
-            'created_at': payment.created_at.isoformat()
+            'items': serializers.payment.dump_many(payments),
+            'next_cursor': next_cursor
         }
@@ -1,75 +1,305 @@
 """
 Provider Service
 """
+import heapq
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
 from app import db
 from app.models.user import ProviderProfile
-from app.models.service import ProviderService, Availability
+from app.models.service import Service, ProviderService as ProviderOffering
+from app.services.availability_service import AvailabilityService
+from app.services.location_service import LocationService, provider_index, sync_provider_index
+from app.services.stats_service import StatsService
+from app.utils import serializers
+from app.utils.geo_index import haversine_km
+from app.utils.http_cache import ResponseCache, invalidate_on_commit
+from app.utils.pagination import clamp_limit
+from app.utils.search_index import ProviderSearchIndex
+
+
+def _profile_fingerprint():
+    """Changes whenever a provider profile is added, removed or updated"""
+    return db.session.query(
+        db.func.count(ProviderProfile.id),
+        db.func.max(ProviderProfile.id),
+        db.func.max(ProviderProfile.updated_at)
+    ).one()
+
+
+# Encoded /providers/<id> responses, shared by every request in this process
+profile_cache = ResponseCache(_profile_fingerprint, max_entries=2048)
+invalidate_on_commit(profile_cache, ProviderProfile)
+
+# Providers by offered service, with the attributes /providers filters and
+# ranks on. Commits in this process are applied as they happen; changes made
+# by other workers show up when the index is rebuilt (SEARCH_INDEX_MAX_AGE).
+search_index = ProviderSearchIndex()
+
+SORT_ORDERS = ('rating', 'distance', 'price')
+
+
+def _index_change(obj, deleted=False):
+    """Snapshot of an ORM change as a search_index method call, or None"""
+    if isinstance(obj, ProviderProfile):
+        if deleted:
+            return ('remove_provider', obj.id)
+        return ('update_provider', obj.id, obj.user_id, obj.rating, obj.rating_score,
+                obj.total_reviews, obj.is_available, obj.verification_status)
+    if isinstance(obj, ProviderOffering):
+        if deleted:
+            return ('remove_offer', obj.provider_id, obj.service_id)
+        return ('update_offer', obj.provider_id, obj.service_id, obj.custom_price, obj.is_active)
+    if isinstance(obj, Service):
+        if deleted:
+            return ('remove_service', obj.id)
+        return ('update_service', obj.id, obj.category, obj.base_price, obj.is_active)
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_search_changes(session, flush_context):
+    # Values are captured here because SQL can no longer be emitted after commit
+    changes = [_index_change(obj) for obj in (*session.new, *session.dirty)]
+    changes += [_index_change(obj, deleted=True) for obj in session.deleted]
+    changes = [change for change in changes if change]
+    if changes:
+        session.info.setdefault('search_index_changes', []).extend(changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    changes = session.info.pop('search_index_changes', None)
+    if changes and search_index.built_at is not None:
+        for method, *args in changes:
+            getattr(search_index, method)(*args)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop('search_index_changes', None)
+
+
+def _parse_float(value, name):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {name}')
 
 
 class ProviderService:
     """Handle provider-related business logic"""
-    
+
     def get_providers(self, filters):
-        """Get all providers with optional filters"""
-        query = ProviderProfile.query.filter_by(is_available=True)
-        
-        # TODO: Add more filters (location, service, rating, etc.)
-        
-        providers = query.all()
-        return [self._serialize_provider(p) for p in providers]
-    
-    def get_provider_by_id(self, provider_id):
+        """
+        Search available providers
+
+        Args:
+            filters (dict): Query parameters, all optional:
+                service_id, category: offer this service / any service in the category
+                min_rating, verification_status: profile filters
+                available_from, available_to: ISO datetimes the weekly schedule
+                    must cover
+                latitude, longitude, radius: distance from a point, radius in km
+                sort: 'rating' (smoothed rating_score; the default), 'distance'
+                    (default with a location) or 'price'
+                limit: number of results (default 20, max 100)
+                fields, view: response projection
+
+        Returns:
+            list: Serialized providers, best first, with 'distance' when a
+                location is given and 'price' when a service is
+        """
+        service_id = filters.get('service_id')
+        category = filters.get('category')
+        latitude, longitude = filters.get('latitude'), filters.get('longitude')
+        has_location = latitude not in (None, '') and longitude not in (None, '')
+        sort = filters.get('sort') or ('distance' if has_location else 'rating')
+        if sort not in SORT_ORDERS:
+            raise ValueError(f'Unknown sort: {sort}')
+        if sort == 'distance' and not has_location:
+            raise ValueError('Sorting by distance requires latitude and longitude')
+        if sort == 'price' and not (service_id or category):
+            raise ValueError('Sorting by price requires service_id or category')
+        serializer = serializers.provider.projection(filters.get('fields'), filters.get('view'))
+
+        self._ensure_search_index()
+        service_ids = None
+        if service_id or category:
+            service_ids = search_index.service_ids(
+                int(service_id) if service_id else None, category or None
+            )
+        min_rating = filters.get('min_rating')
+        hits = search_index.search(
+            service_ids,
+            min_rating=_parse_float(min_rating, 'min_rating') if min_rating else None,
+            verification_status=filters.get('verification_status') or None
+        )
+
+        distances = {}
+        if has_location:
+            latitude = _parse_float(latitude, 'latitude')
+            longitude = _parse_float(longitude, 'longitude')
+            radius = filters.get('radius')
+            radius = _parse_float(radius, 'radius') if radius else None
+            sync_provider_index()
+            located = []
+            for hit in hits:
+                point = provider_index.get(hit[1])
+                distance = haversine_km(latitude, longitude, point[0], point[1]) if point else None
+                if radius is not None and (distance is None or distance > radius):
+                    continue
+                distances[hit[0]] = distance
+                located.append(hit)
+            hits = located
+
+        if filters.get('available_from') or filters.get('available_to'):
+            hits = self._filter_available(hits, filters.get('available_from'), filters.get('available_to'))
+
+        if sort == 'distance':
+            key = lambda hit: (distances[hit[0]] is None, distances[hit[0]] or 0, -hit[2], hit[0])
+        elif sort == 'price':
+            key = lambda hit: (hit[4] is None, hit[4] or 0, -hit[2], hit[0])
+        else:
+            key = lambda hit: (-hit[2], -hit[3], hit[0])
+        top = heapq.nsmallest(clamp_limit(filters.get('limit')), hits, key=key)
+        if not top:
+            return []
+
+        rows = serializer.select(
+            ProviderProfile.query.filter(ProviderProfile.id.in_([hit[0] for hit in top])),
+            ProviderProfile.id
+        ).all()
+        rows_by_id = {row.id: row for row in rows}
+
+        providers = []
+        for provider_id, _, _, _, price in top:
+            row = rows_by_id.get(provider_id)
+            if row is None:
+                continue
+            provider = serializer.dump(row)
+            if has_location:
+                distance = distances[provider_id]
+                provider['distance'] = round(distance, 2) if distance is not None else None
+            if service_ids is not None:
+                provider['price'] = price
+            providers.append(provider)
+        return providers
+
+    def get_provider_by_id(self, provider_id, fields=None, view=None):
         """Get provider by ID"""
-        provider = ProviderProfile.query.get(provider_id)
+        serializer = serializers.provider.projection(fields, view)
+        provider = serializer.select(ProviderProfile.query.filter(ProviderProfile.id == provider_id)).first()
         if not provider:
             raise ValueError('Provider not found')
-        return self._serialize_provider(provider)
-    
-    def get_dashboard_stats(self, user_id):
-        """Get provider dashboard statistics"""
-        # TODO: Implement actual statistics calculation
-        return {
-            'total_jobs': 0,
-            'active_jobs': 0,
-            'total_earnings': 0,
-            'rating': 0.0
-        }
-    
+        return serializer.dump(provider)
+
+    def get_dashboard_stats(self, user_id, days=None):
+        """Get provider dashboard statistics for the last `days` days"""
+        self._get_profile(user_id)
+        return StatsService().get_dashboard(user_id, days)
+
     def get_availability(self, user_id):
-        """Get provider availability"""
-        # TODO: Implement availability retrieval
-        return []
-    
+        """Get provider's weekly availability"""
+        return AvailabilityService().get_schedule(self._get_profile(user_id).id)
+
     def set_availability(self, user_id, data):
-        """Set provider availability"""
-        # TODO: Implement availability setting
-        return {}
-    
+        """Replace provider's weekly availability with data['slots']"""
+        slots = data.get('slots') if isinstance(data, dict) else data
+        return AvailabilityService().replace_week(self._get_profile(user_id).id, slots)
+
     def get_provider_services(self, user_id):
-        """Get provider services"""
-        # TODO: Implement service retrieval
-        return []
-    
+        """Get the services a provider offers, with their prices"""
+        profile = self._get_profile(user_id)
+        offerings = ProviderOffering.query.options(joinedload(ProviderOffering.service)).filter(
+            ProviderOffering.provider_id == profile.id,
+            ProviderOffering.is_active == True
+        ).order_by(ProviderOffering.id).all()
+        return [self._serialize_offering(offering) for offering in offerings]
+
     def add_service(self, user_id, data):
         """Add service to provider"""
-        # TODO: Implement service addition
-        return {}
-    
+        profile = self._get_profile(user_id)
+        if not data or not data.get('service_id'):
+            raise ValueError('service_id is required')
+
+        service = Service.query.filter_by(id=int(data['service_id']), is_active=True).first()
+        if not service:
+            raise ValueError('Service not found')
+        custom_price = data.get('custom_price')
+        if custom_price is not None:
+            custom_price = _parse_float(custom_price, 'custom_price')
+            if custom_price < 0:
+                raise ValueError('Invalid custom_price')
+
+        offering = ProviderOffering.query.filter_by(provider_id=profile.id, service_id=service.id).first()
+        if offering and offering.is_active:
+            raise ValueError('Service already added')
+        if offering is None:
+            offering = ProviderOffering(provider_id=profile.id, service_id=service.id)
+            db.session.add(offering)
+        offering.custom_price = custom_price
+        offering.is_active = True
+        db.session.commit()
+
+        LocationService().refresh_provider_services(user_id)
+        return self._serialize_offering(offering)
+
     def remove_service(self, user_id, service_id):
         """Remove service from provider"""
-        # TODO: Implement service removal
-        pass
-    
-    def _serialize_provider(self, provider):
-        """Serialize provider object"""
+        profile = self._get_profile(user_id)
+        offering = ProviderOffering.query.filter_by(
+            provider_id=profile.id, service_id=service_id, is_active=True
+        ).first()
+        if not offering:
+            raise ValueError('Service not found')
+
+        # Deactivated rather than deleted so re-adding keeps the row
+        offering.is_active = False
+        db.session.commit()
+        LocationService().refresh_provider_services(user_id)
+
+    def _get_profile(self, user_id):
+        profile = ProviderProfile.query.filter_by(user_id=user_id).first()
+        if not profile:
+            raise ValueError('Provider profile not found')
+        return profile
+
+    def _serialize_offering(self, offering):
         return {
-            'id': provider.id,
-            'user_id': provider.user_id,
-            'bio': provider.bio,
-            'experience_years': provider.experience_years,
-            'rating': provider.rating,
-            'total_reviews': provider.total_reviews,
-            'total_jobs_completed': provider.total_jobs_completed,
-            'is_available': provider.is_available,
-            'verification_status': provider.verification_status
+            'id': offering.id,
+            'service_id': offering.service_id,
+            'custom_price': offering.custom_price,
+            'price': offering.custom_price if offering.custom_price is not None else offering.service.base_price,
+            'service': serializers.service.summary.dump(offering.service)
         }
+
+    def _ensure_search_index(self):
+        """Build the search index on first use and whenever it is older than SEARCH_INDEX_MAX_AGE"""
+        if not search_index.is_stale(current_app.config['SEARCH_INDEX_MAX_AGE']):
+            return
+        search_index.rebuild(
+            db.session.query(
+                ProviderProfile.id, ProviderProfile.user_id, ProviderProfile.rating,
+                ProviderProfile.rating_score, ProviderProfile.total_reviews, ProviderProfile.is_available,
+                ProviderProfile.verification_status
+            ).all(),
+            db.session.query(
+                ProviderOffering.provider_id, ProviderOffering.service_id, ProviderOffering.custom_price
+            ).filter(ProviderOffering.is_active == True).all(),
+            db.session.query(Service.id, Service.category, Service.base_price, Service.is_active).all()
+        )
+
+    def _filter_available(self, hits, available_from, available_to):
+        """Keep providers whose weekly schedule covers the whole window"""
+        try:
+            start = datetime.fromisoformat(available_from)
+            end = datetime.fromisoformat(available_to)
+        except (TypeError, ValueError):
+            raise ValueError('available_from and available_to must be ISO datetimes')
+        if end <= start:
+            raise ValueError('available_to must be after available_from')
+
+        available = set(AvailabilityService().free_providers([hit[0] for hit in hits], start, end))
+        return [hit for hit in hits if hit[0] in available]
@@ -0,0 +1,99 @@
+"""
+Rating Service - running review aggregates on provider profiles
+"""
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models.job import Review
+from app.models.user import ProviderProfile
+
+
+class RatingService:
+    """
+    Keep ProviderProfile.rating, total_reviews, rating_sum and rating_score current.
+
+    record_review() adjusts one profile inside the caller's transaction, so
+    the aggregates commit (or roll back) with the review itself and reading
+    a rating never needs an AVG over reviews. rating_score is the Bayesian
+    average (RATING_PRIOR_WEIGHT reviews of RATING_PRIOR_MEAN added to the
+    real ones), which ranks a single 5-star review below a long 4.8 record.
+    """
+
+    def score(self, rating_sum, count):
+        """(average rating, smoothed score) for a review sum and count"""
+        prior_mean = current_app.config['RATING_PRIOR_MEAN']
+        prior_weight = current_app.config['RATING_PRIOR_WEIGHT']
+        average = round(rating_sum / count, 2) if count else 0.0
+        smoothed = round((prior_mean * prior_weight + rating_sum) / (prior_weight + count), 4) \
+            if prior_weight + count else 0.0
+        return average, smoothed
+
+    def record_review(self, reviewee_id, rating):
+        """
+        Add a review to the reviewee's aggregates without committing
+
+        Returns False when the reviewee has no provider profile (clients are
+        reviewed too, but only providers carry a rating).
+        """
+        # The row lock serializes concurrent reviews of the same provider
+        profile = ProviderProfile.query.filter_by(user_id=reviewee_id).with_for_update().first()
+        if profile is None:
+            return False
+
+        profile.rating_sum = (profile.rating_sum or 0) + rating
+        profile.total_reviews = (profile.total_reviews or 0) + 1
+        profile.rating, profile.rating_score = self.score(profile.rating_sum, profile.total_reviews)
+        return True
+
+    def reconcile(self, batch_size=1000, log=None):
+        """
+        Recompute every provider's aggregates from the reviews table
+
+        Profiles are walked in id order, one batch per transaction; each batch
+        is one grouped query over reviews and one bulk UPDATE of the profiles
+        that drifted. Also fills rating_score after the prior changes.
+
+        Returns:
+            tuple: (profiles checked, profiles corrected)
+        """
+        checked = corrected = 0
+        last_id = 0
+        while True:
+            profiles = db.session.query(
+                ProviderProfile.id, ProviderProfile.user_id, ProviderProfile.rating,
+                ProviderProfile.total_reviews, ProviderProfile.rating_sum, ProviderProfile.rating_score
+            ).filter(ProviderProfile.id > last_id).order_by(ProviderProfile.id).limit(batch_size).all()
+            if not profiles:
+                break
+            last_id = profiles[-1].id
+
+            totals = {reviewee_id: (total, count) for reviewee_id, total, count in db.session.query(
+                Review.reviewee_id, db.func.sum(Review.rating), db.func.count(Review.id)
+            ).filter(
+                Review.reviewee_id.in_([p.user_id for p in profiles])
+            ).group_by(Review.reviewee_id)}
+
+            updates = []
+            for profile in profiles:
+                rating_sum, count = totals.get(profile.user_id, (0, 0))
+                rating_sum, count = int(rating_sum or 0), int(count)
+                rating, rating_score = self.score(rating_sum, count)
+                if (profile.rating_sum, profile.total_reviews, profile.rating, profile.rating_score) != \
+                        (rating_sum, count, rating, rating_score):
+                    updates.append({
+                        'id': profile.id,
+                        'rating_sum': rating_sum,
+                        'total_reviews': count,
+                        'rating': rating,
+                        'rating_score': rating_score
+                    })
+
+            if updates:
+                db.session.execute(update(ProviderProfile), updates)
+            db.session.commit()
+
+            checked += len(profiles)
+            corrected += len(updates)
+            if log:
+                log(f'{checked} profiles checked, {corrected} corrected')
+        return checked, corrected
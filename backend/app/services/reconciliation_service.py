@@ -0,0 +1,153 @@
+"""
+Reconciliation Service - settles payments whose callback never arrived
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.payment import Payment
+from app.services.payment_service import PaymentService
+from app.utils.background import run_periodically
+from app.utils.payment_gateway import GatewayRejected, get_payment_gateway
+
+UNSETTLED_STATUSES = ('pending', 'processing')
+METRICS = ('scanned', 'completed', 'failed', 'rejected', 'expired', 'pending', 'skipped', 'errors')
+
+
+class ReconciliationService:
+    """
+    Ask the payment gateway about M-Pesa payments stuck unsettled.
+
+    Payments are walked oldest first through a partial index on unsettled
+    payments, one batch at a time. The gateway is queried for a whole batch
+    by a bounded thread pool with no transaction open; the outcomes are then
+    applied in one short transaction that only locks payments still
+    unsettled (SKIP LOCKED, so it never waits on the callback workers).
+    """
+
+    def __init__(self):
+        self.payment_service = PaymentService()
+
+    def reconcile(self, min_age=None, batch_size=None, concurrency=None, log=None):
+        """
+        Settle every M-Pesa payment left unsettled for at least min_age seconds
+
+        Payments the gateway rejects outright (GatewayRejected) are marked
+        failed at once. Those it still knows nothing about, or keeps failing
+        to answer for, after PAYMENT_RECONCILE_EXPIRE_AFTER seconds are
+        marked failed too, so they stop being queried every run.
+
+        Returns:
+            dict: Counts per outcome (see METRICS), batches and seconds taken
+        """
+        config = current_app.config
+        min_age = config['PAYMENT_RECONCILE_MIN_AGE'] if min_age is None else min_age
+        batch_size = batch_size or config['PAYMENT_RECONCILE_BATCH_SIZE']
+        concurrency = concurrency or config['PAYMENT_RECONCILE_CONCURRENCY']
+        gateway = get_payment_gateway()
+
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=min_age)
+        expire_before = now - timedelta(seconds=config['PAYMENT_RECONCILE_EXPIRE_AFTER'])
+        metrics = dict.fromkeys(METRICS, 0)
+        metrics['batches'] = 0
+        started = time.monotonic()
+        last = None
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as pool:
+            while True:
+                after_last = db.true() if last is None else db.or_(
+                    Payment.created_at > last[0],
+                    db.and_(Payment.created_at == last[0], Payment.id > last[1])
+                )
+                rows = db.session.query(Payment.id, Payment.transaction_id, Payment.created_at).filter(
+                    Payment.status.in_(UNSETTLED_STATUSES),
+                    Payment.created_at < cutoff,
+                    Payment.payment_provider == 'mpesa',
+                    Payment.transaction_id.isnot(None),
+                    after_last
+                ).order_by(Payment.created_at, Payment.id).limit(batch_size).all()
+                # End the read transaction before waiting on the gateway
+                db.session.commit()
+                if not rows:
+                    break
+                last = (rows[-1].created_at, rows[-1].id)
+
+                outcomes = list(pool.map(lambda row: self._query(gateway, row.transaction_id), rows))
+                self._apply(rows, outcomes, expire_before, metrics)
+
+                metrics['batches'] += 1
+                if log:
+                    elapsed = time.monotonic() - started
+                    log(', '.join(f'{metrics[m]} {m}' for m in METRICS) +
+                        f' ({metrics["scanned"] / elapsed if elapsed else 0:.0f} payments/s)')
+
+        metrics['seconds'] = round(time.monotonic() - started, 3)
+        return metrics
+
+    def _query(self, gateway, transaction_id):
+        try:
+            return gateway.query_status(transaction_id)
+        except Exception as e:
+            return e
+
+    def _apply(self, rows, outcomes, expire_before, metrics):
+        """Write one batch of gateway outcomes in a single transaction"""
+        metrics['scanned'] += len(rows)
+        decided = {}
+        for row, outcome in zip(rows, outcomes):
+            expired = row.created_at < expire_before
+            if isinstance(outcome, GatewayRejected):
+                current_app.logger.warning('Gateway rejected %s: %s', row.transaction_id, outcome)
+                decided[row.id] = outcome
+            elif isinstance(outcome, Exception):
+                metrics['errors'] += 1
+                current_app.logger.warning('Gateway query for %s failed: %s', row.transaction_id, outcome)
+                if expired:
+                    decided[row.id] = None
+            elif outcome is not None or expired:
+                decided[row.id] = outcome
+            else:
+                metrics['pending'] += 1
+        if not decided:
+            return
+
+        now = datetime.utcnow()
+        settled = []
+        payments = Payment.query.filter(
+            Payment.id.in_(decided),
+            Payment.status.in_(UNSETTLED_STATUSES)
+        ).with_for_update(skip_locked=True).all()
+        # Settled meanwhile (usually by a late callback) or being settled right now
+        metrics['skipped'] += len(decided) - len(payments)
+
+        for payment in payments:
+            outcome = decided[payment.id]
+            if outcome is None or isinstance(outcome, GatewayRejected):
+                payment.status = 'failed'
+                payment.processed_at = now
+                metrics['expired' if outcome is None else 'rejected'] += 1
+            else:
+                try:
+                    self.payment_service.apply_mpesa_result(payment, outcome, now)
+                except ValueError as e:
+                    metrics['errors'] += 1
+                    current_app.logger.warning('Payment %s not reconciled: %s', payment.id, e)
+                    continue
+                metrics['completed' if payment.status == 'completed' else 'failed'] += 1
+            settled.append(self.payment_service.snapshot_status(payment))
+        db.session.commit()
+
+        for snapshot in settled:
+            self.payment_service.publish_status(snapshot)
+
+
+def start_payment_reconciler(app):
+    """Reconcile unsettled payments every PAYMENT_RECONCILE_INTERVAL seconds"""
+    def reconcile():
+        metrics = ReconciliationService().reconcile()
+        if metrics['scanned']:
+            app.logger.info('Payment reconciliation: %s', metrics)
+
+    run_periodically(app, 'payment-reconciler', app.config.get('PAYMENT_RECONCILE_INTERVAL'), reconcile)
@@ -1,36 +1,42 @@
 """
 Service Service (handles service catalog operations)
 """
+from app import db
 from app.models.service import Service
+from app.utils import serializers
+from app.utils.http_cache import ResponseCache, invalidate_on_commit
+
+
+def _catalog_fingerprint():
+    """Changes whenever a service is added, removed or updated"""
+    return db.session.query(
+        db.func.count(Service.id), db.func.max(Service.id), db.func.max(Service.updated_at)
+    ).one()
+
+
+# Encoded /services responses, shared by every request in this process
+catalog_cache = ResponseCache(_catalog_fingerprint)
+invalidate_on_commit(catalog_cache, Service)
 
 
 class ServiceService:
     """Handle service catalog operations"""
     
-    def get_all_services(self):
+    def get_all_services(self, fields=None, view=None):
         """Get all available services"""
-        services = Service.query.filter_by(is_active=True).all()
-        return [self._serialize_service(s) for s in services]
+        serializer = serializers.service.projection(fields, view)
+        services = serializer.select(Service.query.filter_by(is_active=True)).all()
+        return serializer.dump_many(services)
     
-    def get_service_by_id(self, service_id):
+    def get_service_by_id(self, service_id, fields=None, view=None):
         """Get service by ID"""
-        service = Service.query.get(service_id)
+        serializer = serializers.service.projection(fields, view)
+        service = serializer.select(Service.query.filter(Service.id == service_id)).first()
         if not service:
             raise ValueError('Service not found')
-        return self._serialize_service(service)
+        return serializer.dump(service)
     
     def get_categories(self):
         """Get all service categories"""
         categories = Service.query.with_entities(Service.category).distinct().all()
         return [cat[0] for cat in categories]
-    
-    def _serialize_service(self, service):
-        """Serialize service object"""
-        return {
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'category': service.category,
-            'icon': service.icon,
-            'base_price': service.base_price
-        }
@@ -0,0 +1,226 @@
+"""
+Stats Service - daily provider rollups behind the provider dashboard
+"""
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models.job import Job, Review
+from app.models.payment import Payment
+from app.models.stats import ProviderDailyStats
+from app.models.user import ProviderProfile
+from app.utils.upsert import upsert_insert
+
+COUNTERS = ('jobs_completed', 'jobs_cancelled', 'earnings', 'payments', 'rating_sum', 'reviews')
+ACTIVE_JOB_STATUSES = ('accepted', 'in_progress')
+DEFAULT_DASHBOARD_DAYS = 30
+MAX_DASHBOARD_DAYS = 365
+# Day of each provider's cumulative row, kept by the same upserts as the daily rows
+LIFETIME_DAY = date(1, 1, 1)
+
+
+class StatsService:
+    """
+    Maintain and read ProviderDailyStats.
+
+    The record_* methods only stage an upsert in the caller's transaction, so
+    a rollup changes exactly when the job, payment or review that caused it
+    commits. Days are local days (DASHBOARD_UTC_OFFSET_HOURS) and providers
+    are identified by user id, as on jobs and payments. Each provider also
+    has a LIFETIME_DAY row holding running totals, so lifetime figures are
+    a primary-key lookup rather than a sum over every day of history.
+    """
+
+    def local_day(self, timestamp=None):
+        """Calendar day a UTC timestamp falls on for dashboard purposes"""
+        offset = timedelta(hours=current_app.config['DASHBOARD_UTC_OFFSET_HOURS'])
+        return ((timestamp or datetime.utcnow()) + offset).date()
+
+    def record_job_completed(self, provider_id, at=None):
+        """Count a completed job"""
+        self._increment(provider_id, at, jobs_completed=1)
+
+    def record_job_cancelled(self, provider_id, at=None):
+        """Count a cancelled job that had been assigned to the provider"""
+        self._increment(provider_id, at, jobs_cancelled=1)
+
+    def record_payment(self, provider_id, amount, at=None):
+        """Add a completed payment to the provider's earnings"""
+        self._increment(provider_id, at, earnings=float(amount), payments=1)
+
+    def record_review(self, provider_id, rating, at=None):
+        """Add a review to the provider's daily rating"""
+        self._increment(provider_id, at, rating_sum=int(rating), reviews=1)
+
+    def _increment(self, provider_id, at, **deltas):
+        if not provider_id:
+            return
+        keys = [{'provider_id': provider_id, 'day': self.local_day(at)},
+                {'provider_id': provider_id, 'day': LIFETIME_DAY}]
+        upsert = upsert_insert()
+
+        if upsert is not None:
+            statement = upsert(ProviderDailyStats).values([
+                {**key, **{c: 0 for c in COUNTERS}, **deltas} for key in keys
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=['provider_id', 'day'],
+                set_={c: getattr(ProviderDailyStats, c) + getattr(statement.excluded, c) for c in deltas}
+            )
+            db.session.execute(statement)
+            return
+
+        for key in keys:
+            updated = ProviderDailyStats.query.filter_by(**key).update(
+                {getattr(ProviderDailyStats, c): getattr(ProviderDailyStats, c) + d for c, d in deltas.items()},
+                synchronize_session=False
+            )
+            if not updated:
+                db.session.execute(insert(ProviderDailyStats).values(**{**key, **{c: 0 for c in COUNTERS}, **deltas}))
+
+    def get_dashboard(self, provider_id, days=None):
+        """
+        Dashboard totals for a provider from the rollups
+
+        Reads the provider's lifetime row and one row per day of the period,
+        plus the profile, never the jobs or payments themselves (active jobs
+        come from a partial index).
+
+        Args:
+            days (int): Length of the recent period broken down per day
+        """
+        days = max(1, min(int(days or DEFAULT_DASHBOARD_DAYS), MAX_DASHBOARD_DAYS))
+        today = self.local_day()
+        start = today - timedelta(days=days - 1)
+
+        lifetime = db.session.get(ProviderDailyStats, (provider_id, LIFETIME_DAY))
+
+        rows = {row.day: row for row in ProviderDailyStats.query.filter(
+            ProviderDailyStats.provider_id == provider_id,
+            ProviderDailyStats.day >= start
+        )}
+
+        active_jobs = Job.query.filter(
+            Job.provider_id == provider_id,
+            Job.status.in_(ACTIVE_JOB_STATUSES)
+        ).count()
+
+        profile = db.session.query(ProviderProfile.rating, ProviderProfile.total_reviews).filter(
+            ProviderProfile.user_id == provider_id
+        ).first()
+
+        daily = []
+        period = dict.fromkeys(COUNTERS, 0)
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = rows.get(day)
+            counts = {c: getattr(row, c) if row else 0 for c in COUNTERS}
+            for c in COUNTERS:
+                period[c] += counts[c]
+            daily.append({
+                'date': day.isoformat(),
+                'jobs_completed': counts['jobs_completed'],
+                'jobs_cancelled': counts['jobs_cancelled'],
+                'earnings': round(float(counts['earnings']), 2),
+                'reviews': counts['reviews'],
+                'rating': self._average(counts['rating_sum'], counts['reviews'])
+            })
+
+        total_completed = lifetime.jobs_completed if lifetime else 0
+        total_cancelled = lifetime.jobs_cancelled if lifetime else 0
+        total_earnings = lifetime.earnings if lifetime else 0
+        return {
+            'total_jobs': int(total_completed),
+            'active_jobs': active_jobs,
+            'total_earnings': round(float(total_earnings), 2),
+            'rating': profile.rating if profile else 0.0,
+            'total_reviews': profile.total_reviews if profile else 0,
+            'completion_rate': self._rate(total_completed, total_cancelled),
+            'period': {
+                'days': days,
+                'jobs_completed': period['jobs_completed'],
+                'jobs_cancelled': period['jobs_cancelled'],
+                'earnings': round(float(period['earnings']), 2),
+                'completion_rate': self._rate(period['jobs_completed'], period['jobs_cancelled']),
+                'reviews': period['reviews'],
+                'rating': self._average(period['rating_sum'], period['reviews'])
+            },
+            'daily': daily
+        }
+
+    def rebuild(self, batch_size=500, log=None):
+        """
+        Recompute every provider's rollups from jobs, payments and reviews
+
+        Providers are processed in batches, one transaction each: their rows
+        are deleted and re-inserted from three indexed scans, along with a
+        lifetime row summing each provider's days.
+
+        Returns:
+            tuple: (providers processed, rollup rows written)
+        """
+        processed = written = 0
+        last_id = 0
+        while True:
+            provider_ids = [user_id for (user_id,) in db.session.query(ProviderProfile.user_id).filter(
+                ProviderProfile.user_id > last_id
+            ).order_by(ProviderProfile.user_id).limit(batch_size)]
+            if not provider_ids:
+                break
+            last_id = provider_ids[-1]
+
+            totals = {}
+
+            def add(provider_id, at, **deltas):
+                counts = totals.setdefault((provider_id, self.local_day(at)), dict.fromkeys(COUNTERS, 0))
+                lifetime = totals.setdefault((provider_id, LIFETIME_DAY), dict.fromkeys(COUNTERS, 0))
+                for c, d in deltas.items():
+                    counts[c] += d
+                    lifetime[c] += d
+
+            for provider_id, status, completed_at, cancelled_at, updated_at in db.session.query(
+                Job.provider_id, Job.status, Job.completed_at, Job.cancelled_at, Job.updated_at
+            ).filter(
+                Job.provider_id.in_(provider_ids),
+                Job.status.in_(['completed', 'cancelled'])
+            ).yield_per(5000):
+                if status == 'completed':
+                    add(provider_id, completed_at or updated_at, jobs_completed=1)
+                else:
+                    add(provider_id, cancelled_at or updated_at, jobs_cancelled=1)
+
+            for payee_id, amount, processed_at, created_at in db.session.query(
+                Payment.payee_id, Payment.amount, Payment.processed_at, Payment.created_at
+            ).filter(
+                Payment.payee_id.in_(provider_ids),
+                Payment.status == 'completed'
+            ).yield_per(5000):
+                add(payee_id, processed_at or created_at, earnings=amount or 0, payments=1)
+
+            for reviewee_id, rating, created_at in db.session.query(
+                Review.reviewee_id, Review.rating, Review.created_at
+            ).filter(Review.reviewee_id.in_(provider_ids)).yield_per(5000):
+                add(reviewee_id, created_at, rating_sum=rating, reviews=1)
+
+            ProviderDailyStats.query.filter(
+                ProviderDailyStats.provider_id.in_(provider_ids)
+            ).delete(synchronize_session=False)
+            if totals:
+                db.session.execute(insert(ProviderDailyStats), [
+                    {'provider_id': provider_id, 'day': day, **counts}
+                    for (provider_id, day), counts in totals.items()
+                ])
+            db.session.commit()
+
+            processed += len(provider_ids)
+            written += len(totals)
+            if log:
+                log(f'{processed} providers processed, {written} rollup rows written')
+        return processed, written
+
+    def _rate(self, completed, cancelled):
+        finished = completed + cancelled
+        return round(completed / finished, 4) if finished else None
+
+    def _average(self, rating_sum, count):
+        return round(rating_sum / count, 2) if count else None
@@ -0,0 +1,128 @@
+"""
+Availability Index - weekly schedules as bitsets of 15-minute slots
+"""
+import threading
+import time
+from datetime import timedelta
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+FULL_WEEK = (1 << SLOTS_PER_WEEK) - 1
+
+
+def _minutes(value):
+    minutes = value.hour * 60 + value.minute + (1 if value.second or value.microsecond else 0)
+    # 23:59 is how "until midnight" is usually entered
+    return 24 * 60 if minutes >= 24 * 60 - 1 else minutes
+
+
+def interval_mask(day_of_week, start_time, end_time):
+    """
+    Bits for the slots that lie entirely inside [start_time, end_time) on a weekday
+
+    Partial slots at either end are left out, so a schedule never claims
+    more time than the provider entered.
+    """
+    first = -(-_minutes(start_time) // SLOT_MINUTES)   # round up
+    last = _minutes(end_time) // SLOT_MINUTES          # round down
+    if last <= first:
+        return 0
+    offset = day_of_week * SLOTS_PER_DAY
+    return ((1 << (last - first)) - 1) << (offset + first)
+
+
+def window_mask(start, end):
+    """
+    Bits for every slot a [start, end) datetime window touches, wrapping the week
+
+    Slot 0 is Monday 00:00-00:15, matching Availability.day_of_week.
+    """
+    if end <= start:
+        return 0
+    if end - start >= timedelta(days=7):
+        return FULL_WEEK
+    start_minute = start.weekday() * 24 * 60 + start.hour * 60 + start.minute + start.second / 60
+    end_minute = start_minute + (end - start).total_seconds() / 60
+    first = int(start_minute // SLOT_MINUTES)
+    last = int(-(-end_minute // SLOT_MINUTES))   # round up
+    mask = ((1 << min(last - first, SLOTS_PER_WEEK)) - 1) << first
+    # Fold anything past Sunday midnight back onto Monday
+    return (mask | (mask >> SLOTS_PER_WEEK)) & FULL_WEEK
+
+
+def schedule_mask(slots):
+    """
+    Week bitset for (day_of_week, start_time, end_time, is_available) rows
+
+    Unavailable rows block time out of the available ones.
+    """
+    available = blocked = 0
+    for day_of_week, start_time, end_time, is_available in slots:
+        mask = interval_mask(day_of_week, start_time, end_time)
+        if is_available:
+            available |= mask
+        else:
+            blocked |= mask
+    return available & ~blocked
+
+
+class AvailabilityIndex:
+    """
+    Weekly schedule bitset per provider.
+
+    Checking whether a provider is free for a window is one AND of two
+    integers. Providers without any schedule rows are absent, which callers
+    treat as unknown rather than unavailable.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._masks = {}   # provider id -> week bitset
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._masks)
+
+    def is_stale(self, max_age):
+        """True when never built or older than max_age seconds"""
+        return self.built_at is None or time.monotonic() - self.built_at >= max_age
+
+    def rebuild(self, rows):
+        """
+        Replace every schedule
+
+        Args:
+            rows: (provider_id, day_of_week, start_time, end_time, is_available) rows
+        """
+        by_provider = {}
+        for provider_id, *slot in rows:
+            by_provider.setdefault(provider_id, []).append(slot)
+        masks = {provider_id: schedule_mask(slots) for provider_id, slots in by_provider.items()}
+        with self._lock:
+            self._masks = masks
+            self.built_at = time.monotonic()
+
+    def set(self, provider_id, mask):
+        """Replace one provider's schedule; None forgets it"""
+        with self._lock:
+            if mask is None:
+                self._masks.pop(provider_id, None)
+            else:
+                self._masks[provider_id] = mask
+
+    def get(self, provider_id):
+        """A provider's week bitset, or None without a schedule"""
+        return self._masks.get(provider_id)
+
+    def is_free(self, provider_id, window):
+        """True/False when the provider's schedule covers the window, None if unknown"""
+        mask = self._masks.get(provider_id)
+        if mask is None:
+            return None
+        return mask & window == window
+
+    def free(self, provider_ids, window):
+        """The providers whose schedule covers the whole window"""
+        masks = self._masks
+        return [pid for pid in provider_ids if (masks.get(pid, 0) & window) == window]
@@ -0,0 +1,44 @@
+"""
+Background Tasks - periodic work that runs alongside request handling
+"""
+import atexit
+import threading
+import time
+
+
+def run_periodically(app, name, interval, task, run_at_exit=False, wake=None):
+    """
+    Run a task every `interval` seconds on a daemon thread inside an app context
+
+    Args:
+        app: Flask application
+        name (str): Thread name, also used in failure logs
+        interval (float): Seconds between runs; falsy disables the task
+        task (callable): Work to run, called with no arguments
+        run_at_exit (bool): Also run once when the process exits
+        wake (threading.Event): Setting it runs the task early
+    """
+    if not interval:
+        return None
+
+    def run_once():
+        with app.app_context():
+            try:
+                task()
+            except Exception:
+                app.logger.exception('%s failed', name)
+
+    def loop():
+        while True:
+            if wake is None:
+                time.sleep(interval)
+            else:
+                wake.wait(interval)
+                wake.clear()
+            run_once()
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    if run_at_exit:
+        atexit.register(run_once)
+    return thread
@@ -0,0 +1,244 @@
+"""
+Geospatial Index - in-memory grid index for proximity queries
+"""
+import heapq
+import math
+import threading
+import time
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates in kilometres"""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (math.sin(d_lat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(d_lng / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """
+    Uniform lat/lng grid of moving points, partitioned by key.
+
+    A member (e.g. a provider) is linked into one grid per key it belongs to
+    (e.g. each service it offers), so a query only visits the cells of the
+    requested key around the query point instead of every member.
+    """
+
+    def __init__(self, cell_degrees=0.02, ttl_seconds=300):
+        """
+        Args:
+            cell_degrees (float): Cell edge in degrees (0.02 is ~2.2km at the equator)
+            ttl_seconds (int): Age after which a position is treated as offline
+        """
+        self.cell_degrees = cell_degrees
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._grids = {}      # key -> {(row, col): set(member_id)}
+        self._points = {}     # member_id -> (latitude, longitude, updated_at)
+        self._cells = {}      # member_id -> (row, col)
+        self._keys = {}       # member_id -> frozenset(keys)
+        self._last_prune = time.time()
+
+    def __contains__(self, member_id):
+        return member_id in self._points
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, latitude, longitude):
+        return (int(math.floor(latitude / self.cell_degrees)),
+                int(math.floor(longitude / self.cell_degrees)))
+
+    def _link(self, member_id, cell, keys):
+        for key in keys:
+            self._grids.setdefault(key, {}).setdefault(cell, set()).add(member_id)
+
+    def _unlink(self, member_id, cell, keys):
+        for key in keys:
+            grid = self._grids.get(key)
+            if not grid or cell not in grid:
+                continue
+            grid[cell].discard(member_id)
+            if not grid[cell]:
+                del grid[cell]
+            if not grid:
+                del self._grids[key]
+
+    def _is_fresh(self, updated_at, now):
+        return self.ttl_seconds is None or now - updated_at <= self.ttl_seconds
+
+    def upsert(self, member_id, latitude, longitude, keys=None, updated_at=None):
+        """Insert or move a member; keys default to the member's current keys"""
+        now = time.time()
+        cell = self._cell(latitude, longitude)
+        with self._lock:
+            old_cell = self._cells.get(member_id)
+            old_keys = self._keys.get(member_id, frozenset())
+            new_keys = frozenset(keys) if keys is not None else old_keys
+
+            if old_cell != cell or old_keys != new_keys:
+                if old_cell is not None:
+                    self._unlink(member_id, old_cell, old_keys)
+                self._link(member_id, cell, new_keys)
+
+            self._points[member_id] = (latitude, longitude, updated_at or now)
+            self._cells[member_id] = cell
+            self._keys[member_id] = new_keys
+
+            if self.ttl_seconds and now - self._last_prune > self.ttl_seconds:
+                self.prune(now)
+
+    def set_keys(self, member_id, keys):
+        """Replace the keys of an indexed member"""
+        with self._lock:
+            point = self._points.get(member_id)
+            if point is None:
+                return
+            self.upsert(member_id, point[0], point[1], keys=keys, updated_at=point[2])
+
+    def keys_for(self, member_id):
+        """Get the keys a member is indexed under"""
+        return self._keys.get(member_id, frozenset())
+
+    def remove(self, member_id):
+        """Drop a member from the index"""
+        with self._lock:
+            cell = self._cells.pop(member_id, None)
+            keys = self._keys.pop(member_id, frozenset())
+            self._points.pop(member_id, None)
+            if cell is not None:
+                self._unlink(member_id, cell, keys)
+
+    def prune(self, now=None):
+        """Remove members whose position is older than the TTL"""
+        now = now or time.time()
+        with self._lock:
+            stale = [m for m, p in self._points.items() if not self._is_fresh(p[2], now)]
+            for member_id in stale:
+                self.remove(member_id)
+            self._last_prune = now
+        return len(stale)
+
+    def get(self, member_id):
+        """Get (latitude, longitude, updated_at) for a member, or None if unknown or stale"""
+        point = self._points.get(member_id)
+        if point is None or not self._is_fresh(point[2], time.time()):
+            return None
+        return point
+
+    def within_radius(self, key, latitude, longitude, radius_km, limit=None):
+        """
+        Find members of a key within a radius, nearest first
+
+        Returns:
+            list: (distance_km, member_id) tuples
+        """
+        now = time.time()
+        d_lat = radius_km / KM_PER_DEGREE
+        d_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        row_min, col_min = self._cell(latitude - d_lat, longitude - d_lng)
+        row_max, col_max = self._cell(latitude + d_lat, longitude + d_lng)
+
+        results = []
+        with self._lock:
+            grid = self._grids.get(key)
+            if not grid:
+                return []
+
+            # Large radii over a sparse grid: walk occupied cells instead of the box
+            box_size = (row_max - row_min + 1) * (col_max - col_min + 1)
+            if box_size > len(grid):
+                cells = [c for c in grid
+                         if row_min <= c[0] <= row_max and col_min <= c[1] <= col_max]
+            else:
+                cells = [(r, c) for r in range(row_min, row_max + 1)
+                         for c in range(col_min, col_max + 1) if (r, c) in grid]
+
+            for cell in cells:
+                for member_id in grid[cell]:
+                    lat, lng, updated_at = self._points[member_id]
+                    if not self._is_fresh(updated_at, now):
+                        continue
+                    distance = haversine_km(latitude, longitude, lat, lng)
+                    if distance <= radius_km:
+                        results.append((distance, member_id))
+
+        results.sort()
+        return results[:limit] if limit else results
+
+    def _ring(self, center, ring):
+        """Cells at Chebyshev distance `ring` from a center cell"""
+        row0, col0 = center
+        if ring == 0:
+            return [center]
+        cells = []
+        for col in range(col0 - ring, col0 + ring + 1):
+            cells.append((row0 - ring, col))
+            cells.append((row0 + ring, col))
+        for row in range(row0 - ring + 1, row0 + ring):
+            cells.append((row, col0 - ring))
+            cells.append((row, col0 + ring))
+        return cells
+
+    def nearest(self, key, latitude, longitude, k, max_km=None):
+        """
+        Find the k nearest members of a key by expanding rings of cells
+
+        Returns:
+            list: (distance_km, member_id) tuples, nearest first
+        """
+        now = time.time()
+        center = self._cell(latitude, longitude)
+        heap = []  # max-heap of (-distance, member_id)
+
+        def consider(members):
+            for member_id in members:
+                lat, lng, updated_at = self._points[member_id]
+                if not self._is_fresh(updated_at, now):
+                    continue
+                distance = haversine_km(latitude, longitude, lat, lng)
+                if max_km is not None and distance > max_km:
+                    continue
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, member_id))
+                elif distance < -heap[0][0]:
+                    heapq.heapreplace(heap, (-distance, member_id))
+
+        with self._lock:
+            grid = self._grids.get(key)
+            if not grid or k <= 0:
+                return []
+
+            visited = 0
+            ring = 0
+            while visited < len(grid):
+                # Every point in this ring is at least this far from the query
+                edge_lat = min(abs(latitude) + (ring + 1) * self.cell_degrees, 89.9)
+                ring_km = max(ring - 1, 0) * self.cell_degrees * KM_PER_DEGREE * \
+                    math.cos(math.radians(edge_lat))
+                if max_km is not None and ring_km > max_km:
+                    break
+                if len(heap) == k and ring_km > -heap[0][0]:
+                    break
+
+                cells = self._ring(center, ring)
+                if len(cells) > len(grid):
+                    # Rings now outgrow the occupied cells: finish with one pass
+                    for cell, members in grid.items():
+                        if max(abs(cell[0] - center[0]), abs(cell[1] - center[1])) >= ring:
+                            consider(members)
+                    break
+
+                for cell in cells:
+                    members = grid.get(cell)
+                    if members:
+                        visited += 1
+                        consider(members)
+                ring += 1
+
+        return sorted((-d, m) for d, m in heap)
@@ -0,0 +1,124 @@
+"""
+HTTP Cache - pre-encoded JSON responses versioned by a data revision
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class CachedBody:
+    """One encoded response body, its validator and its compressed variants"""
+
+    __slots__ = ('body', 'etag', 'variants')
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self.variants = {}  # content-coding -> encoded bytes, filled lazily
+
+
+class ResponseCache:
+    """
+    Cache of encoded JSON bodies that is dropped whenever the data changes.
+
+    The revision is a digest of fingerprint(), a cheap aggregate query over
+    the underlying table, so every worker derives the same revision (and
+    therefore the same ETag) from the same data. It is re-read at most every
+    CACHE_REVALIDATE_SECONDS, or on the next request after invalidate() -
+    which should be called once a write to the table commits in this process.
+    """
+
+    def __init__(self, fingerprint, max_entries=256):
+        self._fingerprint = fingerprint
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._revision = None
+        self._checked_at = 0.0
+        self._entries = OrderedDict()
+
+    def revision(self):
+        """Current data revision, re-fingerprinting when stale"""
+        now = time.monotonic()
+        ttl = current_app.config.get('CACHE_REVALIDATE_SECONDS', 30)
+        if self._revision is None or now - self._checked_at >= ttl:
+            digest = hashlib.sha1(repr(self._fingerprint()).encode()).hexdigest()[:16]
+            with self._lock:
+                if digest != self._revision:
+                    self._revision = digest
+                    self._entries.clear()
+                self._checked_at = now
+        return self._revision
+
+    def invalidate(self):
+        """Force the next request to re-read the revision"""
+        with self._lock:
+            self._checked_at = 0.0
+            self._revision = None
+
+    def get(self, key, build):
+        """
+        Cached body for key, building and encoding it on a miss
+
+        Args:
+            key: Hashable identity of the response (route and parameters)
+            build (callable): Returns the JSON-serializable payload; exceptions
+                propagate and nothing is cached
+        """
+        revision = self.revision()
+        entry = self._entries.get(key)
+        if entry is not None:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            return entry
+
+        body = (current_app.json.dumps(build()) + '\n').encode()
+        entry = CachedBody(body, f'{revision}-{hashlib.sha1(body).hexdigest()[:8]}')
+        with self._lock:
+            if revision == self._revision:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+
+def cached_json_response(cache, key, build, max_age):
+    """
+    Serve a cached JSON body with ETag and Cache-Control, or 304 if the client has it
+    """
+    entry = cache.get(key, build)
+    response = current_app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    # Lets the compression middleware reuse the entry's compressed variants
+    response.cached_body = entry
+    return response.make_conditional(request)
+
+
+def invalidate_on_commit(cache, *models):
+    """
+    Invalidate cache whenever a session commits changes to one of models
+
+    Only ORM unit-of-work changes are seen; bulk UPDATE statements are picked
+    up by the periodic revision check instead.
+    """
+    flag = f'response_cache_{id(cache)}'
+
+    @event.listens_for(Session, 'after_flush')
+    def _track_changes(session, flush_context):
+        if any(isinstance(obj, models) for obj in (*session.new, *session.dirty, *session.deleted)):
+            session.info[flag] = True
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate(session):
+        if session.info.pop(flag, False):
+            cache.invalidate()
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_changes(session):
+        session.info.pop(flag, None)
@@ -0,0 +1,315 @@
+"""
+Index Coverage Check - fails when a service query filters on unindexed columns
+"""
+import ast
+import os
+from sqlalchemy import Column, UniqueConstraint
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, Null
+from app import db
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services')
+NULL, NOT_NULL = 'null', 'not null'
+
+
+def indexed_columns(table):
+    """
+    Columns that can drive an index lookup on a table: the leading column of
+    the primary key, of every unique constraint and of every full index.
+    Partial indexes only help queries whose predicate implies theirs (see
+    partial_indexes()), so they do not count here.
+    """
+    columns = {list(table.primary_key.columns)[0].name}
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and len(constraint.columns):
+            columns.add(list(constraint.columns)[0].name)
+    for index in table.indexes:
+        if _index_where(index) is None:
+            columns.add(list(index.columns)[0].name)
+    return columns
+
+
+def _index_where(index):
+    for dialect in ('postgresql', 'sqlite'):
+        where = index.dialect_options[dialect].get('where')
+        if where is not None:
+            return where
+    return None
+
+
+def _condition(expression):
+    """(column, condition) for a simple index predicate term, else None"""
+    if not isinstance(expression, BinaryExpression) or not isinstance(expression.left, Column):
+        return None
+    column, operator, right = expression.left.name, expression.operator, expression.right
+    if operator in (operators.is_, operators.eq) and isinstance(right, Null):
+        return column, NULL
+    if operator in (operators.is_not, operators.ne) and isinstance(right, Null):
+        return column, NOT_NULL
+    if operator is operators.eq and isinstance(right, BindParameter):
+        return column, frozenset([right.value])
+    if operator is operators.in_op and isinstance(right, BindParameter):
+        return column, frozenset(right.value)
+    return None
+
+
+def partial_indexes(table):
+    """
+    Predicates of the table's partial indexes
+
+    Returns:
+        list: (index name, {column: condition}) where a condition is NULL,
+            NOT_NULL or the frozenset of values the column is restricted to;
+            indexes with a predicate too complex to reason about are left out
+    """
+    indexes = []
+    for index in table.indexes:
+        where = _index_where(index)
+        if where is None:
+            continue
+        terms = where.clauses if isinstance(where, BooleanClauseList) and \
+            where.operator is operators.and_ else [where]
+        conditions = [_condition(term) for term in terms]
+        if all(conditions):
+            indexes.append((index.name, dict(conditions)))
+    return indexes
+
+
+def _implies(fact, condition):
+    """Whether a query's restriction on a column guarantees the index's"""
+    if fact is None:
+        return False
+    if condition in (NULL, NOT_NULL):
+        return fact == condition or (condition == NOT_NULL and isinstance(fact, frozenset) and
+                                     None not in fact)
+    return isinstance(fact, frozenset) and fact <= condition
+
+
+def _model_tables():
+    """Map model class names to their tables"""
+    return {mapper.class_.__name__: mapper.local_table for mapper in db.Model.registry.mappers}
+
+
+def _column_ref(node, models):
+    """(model, column) for an expression like `Job.client_id`, else None"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in models:
+        return node.value.id, node.attr
+    return None
+
+
+def _is_flag(node):
+    """Constant True/False/None comparisons are low-selectivity flags"""
+    return isinstance(node, ast.Constant) and node.value in (True, False, None)
+
+
+def _literal(node, constants):
+    """Python value of a literal or of a module-level constant, else raises ValueError"""
+    if isinstance(node, ast.Name) and node.id in constants:
+        return constants[node.id]
+    return ast.literal_eval(node)
+
+
+def _module_constants(tree):
+    """Module-level NAME = <literal> assignments"""
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                constants[node.targets[0].id] = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+    return constants
+
+
+class _Predicates:
+    """Equality predicates of one query, grouped by model"""
+
+    def __init__(self):
+        self.required = {}   # model -> set(column); any one indexed is enough
+        self.any_of = []     # [(model, set(column))] from or_(); all must be indexed
+        self.facts = {}      # model -> {column: condition} that every matching row meets
+
+    def add(self, model, column):
+        self.required.setdefault(model, set()).add(column)
+
+    def restrict(self, model, column, condition):
+        self.facts.setdefault(model, {})[column] = condition
+
+    def partial_index_for(self, model, table):
+        """Name of a partial index whose predicate this query implies, if any"""
+        facts = self.facts.get(model, {})
+        for name, conditions in partial_indexes(table):
+            if all(_implies(facts.get(column), condition) for column, condition in conditions.items()):
+                return name
+        return None
+
+
+def _collect(node, models, predicates, constants, in_or=None):
+    """Collect equality/IN predicates, and the restrictions they imply, from a filter() argument"""
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        name = node.func.attr
+        if name in ('or_', 'and_'):
+            if name == 'or_':
+                group = []
+                for arg in node.args:
+                    _collect(arg, models, predicates, constants, in_or=group)
+                for model in {m for m, _ in group}:
+                    predicates.any_of.append((model, {c for m, c in group if m == model}))
+            else:
+                for arg in node.args:
+                    _collect(arg, models, predicates, constants, in_or)
+            return
+        if name in ('in_', 'is_', 'isnot', 'is_not'):
+            ref = _column_ref(node.func.value, models)
+            if not ref or not node.args:
+                return
+            if name != 'in_' and _is_flag(node.args[0]):
+                if in_or is None and node.args[0].value is None:
+                    predicates.restrict(*ref, NULL if name == 'is_' else NOT_NULL)
+                return
+            if name in ('isnot', 'is_not'):
+                return
+            (in_or.append(ref) if in_or is not None else predicates.add(*ref))
+            if in_or is None and name == 'in_':
+                try:
+                    predicates.restrict(*ref, frozenset(_literal(node.args[0], constants)))
+                except (ValueError, TypeError):
+                    pass
+            return
+
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], (ast.Eq, ast.NotEq)):
+        ref = _column_ref(node.left, models)
+        if not ref:
+            return
+        value = node.comparators[0]
+        if isinstance(node.ops[0], ast.NotEq):
+            if in_or is None and isinstance(value, ast.Constant) and value.value is None:
+                predicates.restrict(*ref, NOT_NULL)
+            return
+        if not _is_flag(value):
+            (in_or.append(ref) if in_or is not None else predicates.add(*ref))
+        if in_or is None:
+            try:
+                literal = _literal(value, constants)
+            except (ValueError, TypeError):
+                return
+            predicates.restrict(*ref, NULL if literal is None else frozenset([literal]))
+
+
+def _chain_root_model(node, models):
+    """Model of a `Model.query...` chain, if that is how it starts"""
+    while True:
+        if isinstance(node, ast.Call):
+            node = node.func
+        elif isinstance(node, ast.Attribute):
+            if node.attr == 'query' and isinstance(node.value, ast.Name) and node.value.id in models:
+                return node.value.id
+            node = node.value
+        else:
+            return None
+
+
+def _query_chains(tree):
+    """Outermost call chains that contain filter()/filter_by() calls"""
+    inner = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Call):
+            inner.add(id(node.value))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and id(node) not in inner:
+            calls = []
+            current = node
+            while isinstance(current, (ast.Call, ast.Attribute)):
+                if isinstance(current, ast.Call):
+                    if isinstance(current.func, ast.Attribute) and current.func.attr in ('filter', 'filter_by'):
+                        calls.append(current)
+                    current = current.func
+                else:
+                    current = current.value
+            if calls:
+                yield node, calls
+
+
+def _has_join(chain):
+    node = chain
+    while isinstance(node, (ast.Call, ast.Attribute)):
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Attribute) and node.func.attr in ('join', 'outerjoin'):
+                return True
+            node = node.func
+        else:
+            node = node.value
+    return False
+
+
+def _unsupported(predicates, model, table):
+    """Why no index supports a query's predicates on one model, or None if one does"""
+    indexed = indexed_columns(table)
+    if predicates.partial_index_for(model, table):
+        return None
+    groups = [columns for m, columns in predicates.any_of if m == model]
+    if predicates.required.get(model, set()) & indexed:
+        return None
+    if groups and all(columns <= indexed for columns in groups):
+        return None
+    if groups and not predicates.required.get(model):
+        missing = set().union(*groups) - indexed
+        return f'or_() branch on {sorted(missing)} has no supporting index'
+    return f'filtered on {sorted(predicates.required[model])} with no supporting index'
+
+
+def check_file(path, tables):
+    """Return unsupported query descriptions for one service module"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    constants = _module_constants(tree)
+    problems = []
+    for chain, calls in _query_chains(tree):
+        root_model = _chain_root_model(chain, tables)
+        predicates = _Predicates()
+        for call in calls:
+            if call.func.attr == 'filter_by':
+                if root_model:
+                    for keyword in call.keywords:
+                        if not keyword.arg:
+                            continue
+                        if not _is_flag(keyword.value):
+                            predicates.add(root_model, keyword.arg)
+                        try:
+                            literal = _literal(keyword.value, constants)
+                        except (ValueError, TypeError):
+                            continue
+                        predicates.restrict(root_model, keyword.arg,
+                                            NULL if literal is None else frozenset([literal]))
+            else:
+                for arg in call.args:
+                    _collect(arg, tables, predicates, constants)
+
+        location = f'{os.path.relpath(path)}:{chain.lineno}'
+        unsupported = {}
+        for model in set(predicates.required) | {m for m, _ in predicates.any_of}:
+            problem = _unsupported(predicates, model, tables[model])
+            if problem:
+                unsupported[model] = problem
+        # In a join, rows of the other models are reached by key from the one an index drives
+        filtered = len(set(predicates.required) | {m for m, _ in predicates.any_of})
+        if _has_join(chain) and len(unsupported) < filtered:
+            continue
+        problems.extend(f'{location}: {model} {problem}' for model, problem in sorted(unsupported.items()))
+    return problems
+
+
+def check_service_indexes(services_dir=SERVICES_DIR):
+    """
+    Statically check every query in app/services against the model indexes
+
+    Returns:
+        list: Human-readable problems; empty when every query is covered
+    """
+    tables = _model_tables()
+    problems = []
+    for name in sorted(os.listdir(services_dir)):
+        if name.endswith('.py'):
+            problems.extend(check_file(os.path.join(services_dir, name), tables))
+    return problems
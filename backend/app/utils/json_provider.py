@@ -0,0 +1,45 @@
+"""
+JSON Provider - orjson-backed encoding for jsonify and request bodies
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Drop-in replacement for Flask's provider that encodes with orjson.
+
+    Keys are sorted and dates go through the same default hook as
+    DefaultJSONProvider, so payloads decode to the same values, but the
+    bytes differ in two ways:
+
+    - Non-ASCII text is written as UTF-8 rather than \\uXXXX escapes
+      (ensure_ascii is off, also for the standard-library paths below).
+    - Non-string keys are sorted after conversion to strings
+      ({"10": .., "2": ..}) rather than by their original values.
+
+    Calls with extra json.dumps keyword arguments and pretty-printed debug
+    responses use the standard implementation.
+    """
+
+    ensure_ascii = False
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if pretty:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
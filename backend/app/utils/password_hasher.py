@@ -0,0 +1,96 @@
+"""
+Password Hasher - bounded process pool for password hashing and verification
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(RuntimeError):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+
+class PasswordHasher:
+    """
+    Run password hashing off the request thread with admission control.
+
+    Key derivation is deliberately slow and holds the GIL, so done inline a
+    burst of logins stalls every other request on the worker. Jobs go to a
+    process pool instead; at most max_pending may be queued or running, and
+    a request that cannot get a slot within queue_timeout is rejected with
+    HasherBusy rather than piling up. workers=0 hashes inline (tests).
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=32, queue_timeout=2.0):
+        self.method = method
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._prefix = None
+
+    def hash(self, password):
+        """Hash a password with the configured method and work factors"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with other parameters than configured"""
+        if self._prefix is None:
+            # werkzeug hashes are '<method:params>$salt$digest' with defaults filled in
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy('Too many concurrent logins, please retry shortly')
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        # Created on first use so that forking servers start it per worker.
+        # Hash processes come from a forkserver (spawn where there is none):
+        # forking this process would copy locks held by its background
+        # threads and could deadlock
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(
+                            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                        )
+                    )
+        return self._pool
+
+
+def init_password_hasher(app):
+    """Attach a password hasher configured from PASSWORD_HASH_* settings"""
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 32),
+        queue_timeout=app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0)
+    )
+
+
+def get_password_hasher():
+    """The current application's password hasher"""
+    return current_app.extensions['password_hasher']
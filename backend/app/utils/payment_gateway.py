@@ -0,0 +1,175 @@
+"""
+Payment Gateway - clients for asking a provider how a payment ended
+"""
+import base64
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from flask import current_app
+
+# Daraja answers this while the customer has not yet responded to the push
+DARAJA_STILL_PROCESSING = '500.001.1001'
+# HTTP statuses worth asking again about; other 4xx answers will never change
+RETRYABLE_HTTP_STATUSES = (401, 403, 408, 429)
+
+
+class GatewayRejected(Exception):
+    """The gateway refused the query for good, e.g. it has no such transaction"""
+
+
+class PaymentGateway:
+    """
+    Interface used by payment reconciliation.
+
+    query_status() returns a result shaped like a parsed STK callback
+    ({'result_code', 'result_desc', 'amount', ...}), or None while the
+    gateway does not know the outcome yet. It raises GatewayRejected when
+    asking again can never succeed; anything else it raises (transport
+    errors, outages) is worth retrying.
+    """
+
+    name = 'base'
+
+    def query_status(self, transaction_id):
+        raise NotImplementedError
+
+
+class FakeGateway(PaymentGateway):
+    """
+    In-memory gateway for development and tests.
+
+    Outcomes are set with settle(); anything else is still pending.
+    """
+
+    name = 'fake'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = {}
+        self.queries = 0
+
+    def settle(self, transaction_id, result_code=0, amount=None, result_desc=None):
+        """Make the gateway report an outcome for a transaction"""
+        with self._lock:
+            self._results[transaction_id] = {
+                'checkout_request_id': transaction_id,
+                'result_code': result_code,
+                'result_desc': result_desc,
+                'amount': amount,
+                'receipt_number': None,
+                'phone_number': None
+            }
+
+    def query_status(self, transaction_id):
+        with self._lock:
+            self.queries += 1
+            return self._results.get(transaction_id)
+
+
+class DarajaGateway(PaymentGateway):
+    """Safaricom Daraja STK push query API"""
+
+    name = 'daraja'
+
+    def __init__(self, base_url, consumer_key, consumer_secret, shortcode, passkey, timeout=10):
+        if not all([consumer_key, consumer_secret, shortcode, passkey]):
+            raise RuntimeError('DarajaGateway requires MPESA_CONSUMER_KEY, MPESA_CONSUMER_SECRET, '
+                               'MPESA_SHORTCODE and MPESA_PASSKEY')
+        self.base_url = base_url.rstrip('/')
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.shortcode = str(shortcode)
+        self.passkey = passkey
+        self.timeout = timeout
+        self._token_lock = threading.Lock()
+        self._token = None
+        self._token_expires = 0.0
+
+    def query_status(self, transaction_id):
+        # Daraja expects Nairobi time (UTC+3)
+        timestamp = (datetime.utcnow() + timedelta(hours=3)).strftime('%Y%m%d%H%M%S')
+        password = base64.b64encode(f'{self.shortcode}{self.passkey}{timestamp}'.encode()).decode()
+        try:
+            body = self._post('/mpesa/stkpushquery/v1/query', {
+                'BusinessShortCode': self.shortcode,
+                'Password': password,
+                'Timestamp': timestamp,
+                'CheckoutRequestID': transaction_id
+            })
+        except urllib.error.HTTPError as e:
+            try:
+                body = json.loads(e.read() or b'{}')
+            except ValueError:
+                body = {}
+            if body.get('errorCode') == DARAJA_STILL_PROCESSING:
+                return None
+            message = f"Daraja query failed: {body.get('errorMessage') or e}"
+            if e.code == 401:
+                self._token = None  # expired early or revoked; fetch a new one next time
+            if 400 <= e.code < 500 and e.code not in RETRYABLE_HTTP_STATUSES:
+                raise GatewayRejected(message)
+            raise RuntimeError(message)
+
+        if body.get('ResultCode') in (None, ''):
+            return None
+        return {
+            'checkout_request_id': transaction_id,
+            'result_code': int(body['ResultCode']),
+            'result_desc': body.get('ResultDesc'),
+            'amount': None,
+            'receipt_number': None,
+            'phone_number': None
+        }
+
+    def _post(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode(),
+            headers={'Authorization': f'Bearer {self._access_token()}', 'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def _access_token(self):
+        # Tokens last an hour; refresh a minute early and share one across threads
+        with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                credentials = base64.b64encode(f'{self.consumer_key}:{self.consumer_secret}'.encode()).decode()
+                request = urllib.request.Request(
+                    f'{self.base_url}/oauth/v1/generate?grant_type=client_credentials',
+                    headers={'Authorization': f'Basic {credentials}'}
+                )
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    body = json.loads(response.read())
+                self._token = body['access_token']
+                self._token_expires = time.monotonic() + int(body.get('expires_in', 3599)) - 60
+            return self._token
+
+
+def create_gateway(config):
+    """Build the gateway named by PAYMENT_GATEWAY: fake or daraja"""
+    name = config.get('PAYMENT_GATEWAY') or 'fake'
+    if name == 'fake':
+        return FakeGateway()
+    if name == 'daraja':
+        return DarajaGateway(
+            config.get('MPESA_API_URL'),
+            config.get('MPESA_CONSUMER_KEY'),
+            config.get('MPESA_CONSUMER_SECRET'),
+            config.get('MPESA_SHORTCODE'),
+            config.get('MPESA_PASSKEY')
+        )
+    raise ValueError(f'Unsupported payment gateway: {name}')
+
+
+def init_payment_gateway(app):
+    """Attach the configured payment gateway to the application"""
+    app.extensions['payment_gateway'] = create_gateway(app.config)
+
+
+def get_payment_gateway():
+    """The current application's payment gateway"""
+    return current_app.extensions['payment_gateway']
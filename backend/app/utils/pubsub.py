@@ -0,0 +1,173 @@
+"""
+Pub/Sub Broker - fan-out of real-time events to streaming subscribers
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from flask import current_app
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+RECONNECT_DELAY_SECONDS = 1
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A single subscriber's view of a channel"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout=None):
+        """Next published message, or None if nothing arrived within the timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Stop receiving messages"""
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Broker that fans out within this process only.
+
+    The default for development and tests; with several workers each one only
+    sees messages published by its own requests, so production should use a
+    shared backend such as RedisBroker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> set(Subscription)
+
+    def publish(self, channel, message):
+        """Deliver a message to every current subscriber of a channel"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            self._deliver(subscription, message)
+        return len(subscribers)
+
+    def subscribe(self, channel):
+        """Start receiving messages published to a channel"""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def _deliver(self, subscription, message):
+        # A subscriber that stopped reading loses messages rather than
+        # blocking publishers; clients resync with a since_id query.
+        try:
+            subscription.queue.put_nowait(message)
+        except queue.Full:
+            pass
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Broker backed by Redis pub/sub so every worker sees every message.
+
+    One listener thread per process relays Redis messages to the local
+    subscribers, so a worker holds a single Redis connection however many
+    streams it serves. PubSub.listen() returns once the last channel is
+    unsubscribed (or raises when the connection drops), so the thread exits
+    and is started again by the next subscribe, or at once if channels
+    remain. Local subscriber changes and the matching Redis (un)subscribe
+    happen under one lock so they cannot interleave.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RedisBroker requires the redis package (pip install redis)')
+
+        super().__init__()
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._subscription_lock = threading.RLock()
+        self._listener = None
+
+    def publish(self, channel, message):
+        return self._redis.publish(channel, json.dumps(message))
+
+    def subscribe(self, channel):
+        with self._subscription_lock:
+            with self._lock:
+                first = channel not in self._subscribers
+            subscription = super().subscribe(channel)
+            if first:
+                self._pubsub.subscribe(channel)
+            if self._listener is None:
+                self._start_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._subscription_lock:
+            super().unsubscribe(subscription)
+            with self._lock:
+                idle = subscription.channel not in self._subscribers
+            if idle:
+                self._pubsub.unsubscribe(subscription.channel)
+
+    def _start_listener(self):
+        self._listener = threading.Thread(target=self._listen, name='redis-broker', daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        try:
+            for item in self._pubsub.listen():
+                if item.get('type') != 'message':
+                    continue
+                channel = item['channel'].decode() if isinstance(item['channel'], bytes) else item['channel']
+                message = json.loads(item['data'])
+                with self._lock:
+                    subscribers = list(self._subscribers.get(channel, ()))
+                for subscription in subscribers:
+                    self._deliver(subscription, message)
+        except Exception:
+            # PubSub resubscribes its channels when it reconnects; just don't spin while Redis is down
+            logger.exception('Redis broker listener failed; reconnecting')
+            time.sleep(RECONNECT_DELAY_SECONDS)
+        finally:
+            with self._subscription_lock:
+                self._listener = None
+                with self._lock:
+                    active = bool(self._subscribers)
+                if active:
+                    self._start_listener()
+
+
+def create_broker(url):
+    """Build a broker from a URL: memory:// or redis://..."""
+    if not url or url.startswith('memory://'):
+        return InProcessBroker()
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisBroker(url)
+    raise ValueError(f'Unsupported broker URL: {url}')
+
+
+def init_broker(app):
+    """Attach the configured broker to the application"""
+    app.extensions['broker'] = create_broker(app.config.get('BROKER_URL'))
+
+
+def get_broker():
+    """The current application's broker"""
+    return current_app.extensions['broker']
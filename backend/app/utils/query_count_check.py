@@ -0,0 +1,78 @@
+"""
+Query Count Check - fails when a listing issues more queries as it grows
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+
+LISTING_SIZES = (3, 30)
+
+
+@contextmanager
+def count_queries():
+    """Count statements sent to the database inside the block; yields a list holding the count"""
+    engine = db.engine
+    count = [0]
+
+    def before_cursor_execute(*args):
+        count[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield count
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _seed_conversations(user, others, size):
+    from app.models.chat import Conversation, ConversationParticipant, Message
+
+    for i in range(size):
+        other = others[i % len(others)]
+        conversation = Conversation()
+        db.session.add(conversation)
+        db.session.flush()
+        db.session.add_all([
+            ConversationParticipant(conversation_id=conversation.id, user_id=user.id, unread_count=1),
+            ConversationParticipant(conversation_id=conversation.id, user_id=other.id),
+            Message(conversation_id=conversation.id, sender_id=user.id, content='Hello'),
+            Message(conversation_id=conversation.id, sender_id=other.id, content='Hi')
+        ])
+    db.session.commit()
+
+
+def check_conversation_queries(sizes=LISTING_SIZES):
+    """
+    List conversations for users with each number of conversations in sizes
+
+    Must run against an empty scratch database.
+
+    Returns:
+        tuple: ({size: query count}, list of problems; empty when every size
+            took the same number of queries)
+    """
+    from app.models.user import User
+    from app.services.chat_service import ChatService
+
+    users = [User(email=f'user{i}@example.com', password_hash='-', first_name='Query', last_name=str(i),
+                  role='client') for i in range(len(sizes) + 3)]
+    db.session.add_all(users)
+    db.session.commit()
+    others = users[len(sizes):]
+
+    counts = {}
+    for user, size in zip(users, sizes):
+        _seed_conversations(user, others, size)
+        user_id = user.id
+        db.session.expire_all()
+        with count_queries() as count:
+            listed = ChatService().get_conversations(user_id)
+        if len(listed) != size:
+            return counts, [f'get_conversations returned {len(listed)} conversations, expected {size}']
+        counts[size] = count[0]
+
+    problems = []
+    if len(set(counts.values())) > 1:
+        problems.append('get_conversations query count grows with the number of conversations: ' +
+                        ', '.join(f'{size} conversations -> {n} queries' for size, n in counts.items()))
+    return counts, problems
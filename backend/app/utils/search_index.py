@@ -0,0 +1,174 @@
+"""
+Search Index - in-memory inverted index of providers by offered service
+"""
+import threading
+import time
+
+
+class _Provider:
+    __slots__ = ('user_id', 'rating', 'rating_score', 'total_reviews', 'is_available',
+                 'verification_status')
+
+    def __init__(self, user_id, rating, rating_score, total_reviews, is_available,
+                 verification_status):
+        self.user_id = user_id
+        self.rating = rating or 0.0
+        self.rating_score = rating_score or 0.0
+        self.total_reviews = total_reviews or 0
+        self.is_available = bool(is_available)
+        self.verification_status = verification_status
+
+
+class ProviderSearchIndex:
+    """
+    Postings lists from service id to the providers offering it.
+
+    Besides the postings (provider id -> custom price) the index keeps the
+    few profile attributes searches filter and rank on, so a search touches
+    only the providers offering the requested services and the database is
+    read just to hydrate the page of results. Changes are applied with the
+    update/remove methods as they commit; rebuild() replaces everything.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._providers = {}   # provider id -> _Provider
+        self._postings = {}    # service id -> {provider id: custom price}
+        self._offers = {}      # provider id -> set(service id)
+        self._services = {}    # service id -> (category, base price), active services only
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._providers)
+
+    def is_stale(self, max_age):
+        """True when never built or older than max_age seconds"""
+        return self.built_at is None or time.monotonic() - self.built_at >= max_age
+
+    def rebuild(self, providers, offers, services):
+        """
+        Replace the index contents
+
+        Args:
+            providers: (id, user_id, rating, rating_score, total_reviews, is_available,
+                verification_status) rows
+            offers: (provider_id, service_id, custom_price) rows for active offers
+            services: (id, category, base_price, is_active) rows
+        """
+        with self._lock:
+            self._providers = {}
+            self._postings = {}
+            self._offers = {}
+            self._services = {}
+            for row in services:
+                self.update_service(*row)
+            for row in providers:
+                self.update_provider(*row)
+            for provider_id, service_id, custom_price in offers:
+                self.update_offer(provider_id, service_id, custom_price, True)
+            self.built_at = time.monotonic()
+
+    def update_provider(self, provider_id, user_id, rating, rating_score, total_reviews,
+                        is_available, verification_status):
+        """Insert or replace a provider's searchable attributes"""
+        with self._lock:
+            self._providers[provider_id] = _Provider(user_id, rating, rating_score, total_reviews,
+                                                     is_available, verification_status)
+
+    def remove_provider(self, provider_id):
+        """Drop a provider and its postings"""
+        with self._lock:
+            self._providers.pop(provider_id, None)
+            for service_id in self._offers.pop(provider_id, ()):
+                self._discard_posting(service_id, provider_id)
+
+    def update_offer(self, provider_id, service_id, custom_price, is_active):
+        """Record that a provider offers (or no longer offers) a service"""
+        with self._lock:
+            if not is_active:
+                self.remove_offer(provider_id, service_id)
+                return
+            self._postings.setdefault(service_id, {})[provider_id] = custom_price
+            self._offers.setdefault(provider_id, set()).add(service_id)
+
+    def remove_offer(self, provider_id, service_id):
+        """Drop one provider's posting for a service"""
+        with self._lock:
+            offered = self._offers.get(provider_id)
+            if offered is not None:
+                offered.discard(service_id)
+            self._discard_posting(service_id, provider_id)
+
+    def update_service(self, service_id, category, base_price, is_active):
+        """Insert or replace a catalog service; inactive services match no search"""
+        with self._lock:
+            if is_active:
+                self._services[service_id] = ((category or '').strip().lower(), base_price)
+            else:
+                self._services.pop(service_id, None)
+
+    def remove_service(self, service_id):
+        """Drop a catalog service"""
+        with self._lock:
+            self._services.pop(service_id, None)
+
+    def _discard_posting(self, service_id, provider_id):
+        posting = self._postings.get(service_id)
+        if posting is not None:
+            posting.pop(provider_id, None)
+            if not posting:
+                del self._postings[service_id]
+
+    def service_ids(self, service_id=None, category=None):
+        """Active service ids matching a service id and/or category"""
+        with self._lock:
+            if service_id is not None:
+                service = self._services.get(service_id)
+                if service is None or (category and service[0] != category.strip().lower()):
+                    return []
+                return [service_id]
+            category = category.strip().lower()
+            return [sid for sid, (cat, _) in self._services.items() if cat == category]
+
+    def search(self, service_ids=None, min_rating=None, verification_status=None,
+               available_only=True):
+        """
+        Providers matching the filters
+
+        Args:
+            service_ids (list): Offer any of these services; None for every provider
+            min_rating (float): Lowest acceptable rating
+            verification_status (str): Exact verification status
+
+        Returns:
+            list: (provider_id, user_id, rating_score, total_reviews, price) tuples, where
+                price is the lowest price for the requested services (custom price,
+                else the service's base price) or None without a service filter
+        """
+        with self._lock:
+            if service_ids is None:
+                candidates = dict.fromkeys(self._providers)
+            else:
+                candidates = {}
+                for service_id in service_ids:
+                    base_price = self._services[service_id][1] if service_id in self._services else None
+                    for provider_id, custom_price in self._postings.get(service_id, {}).items():
+                        price = custom_price if custom_price is not None else base_price
+                        current = candidates.get(provider_id)
+                        if current is None or (price is not None and price < current):
+                            candidates[provider_id] = price
+
+            results = []
+            for provider_id, price in candidates.items():
+                provider = self._providers.get(provider_id)
+                if provider is None:
+                    continue
+                if available_only and not provider.is_available:
+                    continue
+                if min_rating is not None and provider.rating < min_rating:
+                    continue
+                if verification_status and provider.verification_status != verification_status:
+                    continue
+                results.append((provider_id, provider.user_id, provider.rating_score,
+                                provider.total_reviews, price))
+        return results
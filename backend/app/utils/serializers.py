@@ -0,0 +1,168 @@
+"""
+Serializers - precompiled model-to-dict converters shared by every service
+"""
+from datetime import date, datetime, time
+from operator import attrgetter
+from app.models.user import User, ProviderProfile
+from app.models.service import Service, Availability
+from app.models.job import Job, Review
+from app.models.chat import Conversation, Message
+from app.models.notification import Notification
+from app.models.payment import Payment, PaymentMethod
+
+# name -> Serializer, for code that picks a representation at runtime
+registry = {}
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+class Serializer:
+    """
+    Turns model instances or result rows into JSON-ready dicts.
+
+    The attribute getter and the per-field converters (ISO 8601 for date and
+    time columns) are built once, so dumping a row is one C-level attrgetter
+    call plus a dict build. Anything with the field names as attributes can
+    be dumped, including the Row objects returned by
+    query.with_entities(*serializer.columns), which skips ORM hydration.
+    """
+
+    def __init__(self, model, fields, summary=None):
+        if not fields:
+            raise ValueError('No fields requested')
+        self.model = model
+        self.fields = tuple(fields)
+        self.summary_fields = tuple(summary or fields)
+        self.columns = [getattr(model, name) for name in self.fields]
+        self._get = attrgetter(*self.fields)
+        self._converters = [
+            (index, _isoformat) for index, column in enumerate(self.columns)
+            if _python_type(column) in (datetime, date, time)
+        ]
+        self._projections = {}
+
+    def dump(self, obj):
+        """Serialize one object or row"""
+        values = self._get(obj)
+        if len(self.fields) == 1:
+            values = (values,)
+        if self._converters:
+            values = list(values)
+            for index, convert in self._converters:
+                values[index] = convert(values[index])
+        return dict(zip(self.fields, values))
+
+    def dump_many(self, objs):
+        """Serialize a sequence of objects or rows"""
+        dump = self.dump
+        return [dump(obj) for obj in objs]
+
+    def only(self, fields):
+        """Serializer restricted to a subset of fields, in this serializer's order"""
+        key = frozenset(fields)
+        projection = self._projections.get(key)
+        if projection is None:
+            unknown = key.difference(self.fields)
+            if unknown:
+                raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+            projection = Serializer(self.model, [f for f in self.fields if f in key],
+                                    [f for f in self.summary_fields if f in key])
+            self._projections[key] = projection
+        return projection
+
+    @property
+    def summary(self):
+        """Compact representation for list views"""
+        return self.only(self.summary_fields)
+
+    def projection(self, fields=None, view=None):
+        """
+        Serializer for a request's ?fields= and ?view= parameters
+
+        Args:
+            fields (str): Comma-separated field names; takes precedence over view
+            view (str): 'summary' for the compact list shape, 'full' (default) otherwise
+        """
+        if fields:
+            return self.only(name.strip() for name in fields.split(',') if name.strip())
+        if view == 'summary':
+            return self.summary
+        if view in (None, '', 'full'):
+            return self
+        raise ValueError(f'Unknown view: {view}')
+
+    def select(self, query, *extra):
+        """
+        Restrict a query to this serializer's columns, returning rows instead of objects
+
+        extra columns (sort keys for pagination, ownership checks) are
+        selected too but not serialized.
+        """
+        columns = list(self.columns)
+        columns.extend(c for c in extra if c.key not in self.fields)
+        return query.with_entities(*columns)
+
+
+def register(name, model, fields, summary=None):
+    serializer = Serializer(model, fields, summary)
+    registry[name] = serializer
+    return serializer
+
+
+user = register('user', User, [
+    'id', 'email', 'first_name', 'last_name', 'phone', 'profile_picture', 'role',
+    'is_active', 'is_verified', 'created_at', 'updated_at'
+])
+
+provider = register('provider', ProviderProfile, [
+    'id', 'user_id', 'bio', 'experience_years', 'rating', 'total_reviews',
+    'total_jobs_completed', 'is_available', 'verification_status'
+], summary=['id', 'user_id', 'rating', 'total_reviews', 'is_available', 'verification_status'])
+
+service = register('service', Service, [
+    'id', 'name', 'description', 'category', 'icon', 'base_price'
+], summary=['id', 'name', 'category', 'icon', 'base_price'])
+
+availability = register('availability', Availability, [
+    'id', 'day_of_week', 'start_time', 'end_time', 'is_available'
+])
+
+job = register('job', Job, [
+    'id', 'client_id', 'provider_id', 'service_id', 'title', 'description', 'status',
+    'address', 'latitude', 'longitude', 'scheduled_date', 'estimated_duration',
+    'estimated_price', 'final_price', 'created_at', 'updated_at'
+], summary=['id', 'service_id', 'title', 'status', 'scheduled_date', 'estimated_price', 'created_at'])
+
+review = register('review', Review, [
+    'id', 'job_id', 'reviewer_id', 'reviewee_id', 'rating', 'comment', 'created_at'
+])
+
+conversation = register('conversation', Conversation, [
+    'id', 'job_id', 'created_at', 'updated_at'
+])
+
+message = register('message', Message, [
+    'id', 'conversation_id', 'sender_id', 'content', 'message_type', 'attachment_url',
+    'is_read', 'created_at'
+])
+
+notification = register('notification', Notification, [
+    'id', 'type', 'title', 'message', 'data', 'is_read', 'created_at', 'read_at'
+], summary=['id', 'type', 'title', 'is_read', 'created_at'])
+
+payment_method = register('payment_method', PaymentMethod, [
+    'id', 'type', 'card_last_four', 'card_brand', 'phone_number', 'is_default'
+])
+
+payment = register('payment', Payment, [
+    'id', 'job_id', 'amount', 'currency', 'status', 'created_at'
+])
@@ -0,0 +1,12 @@
+"""
+Upserts - dialect INSERT ... ON CONFLICT constructs
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def upsert_insert():
+    """The session's dialect insert() supporting on_conflict_do_update, or None if it has none"""
+    return UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
@@ -0,0 +1,42 @@
+"""
+Benchmark Compare - diff two reports and fail on latency regressions
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --metric p95_ms --tolerance 0.1
+
+Exits with status 1 when any endpoint's metric grew by more than tolerance.
+"""
+import argparse
+import json
+import sys
+from benchmarks.report import compare_reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--metric', default='p95_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'])
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='allowed relative slowdown before failing (default 0.10)')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+
+    regressions = 0
+    print(f'{"endpoint":<52} {"before":>9} {"after":>9} {"change":>8}')
+    for label, before, after, change in compare_reports(baseline, current, args.metric):
+        flag = ''
+        if change > args.tolerance:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'{label:<52} {before:>9.2f} {after:>9.2f} {change:>+8.1%}{flag}')
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
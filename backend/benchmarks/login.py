@@ -0,0 +1,114 @@
+"""
+Login Benchmark - login throughput and latency per password hashing setting
+
+Usage:
+    python -m benchmarks.login --methods scrypt scrypt:16384:8:1 pbkdf2:sha256:600000 \\
+        --hash-workers 4 --concurrency 32 --logins 500
+
+Each method is measured against the same users and request load, so the
+report shows how much login capacity a given work factor costs. Rejected
+(503) logins show where admission control kicks in.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from sqlalchemy import insert
+from app import create_app, db
+from app.models.user import User
+from app.utils.password_hasher import init_password_hasher, get_password_hasher
+from benchmarks.report import summarize, write_report, format_table
+from benchmarks.traffic import Recorder
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), 'results', 'login.json')
+LOGIN_USERS = 100
+PASSWORD = 'benchmark-password'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark login throughput')
+    parser.add_argument('--methods', nargs='+', default=['scrypt'],
+                        help='werkzeug hash methods to compare, e.g. scrypt:16384:8:1')
+    parser.add_argument('--hash-workers', type=int, help='PASSWORD_HASH_WORKERS (default from config)')
+    parser.add_argument('--max-pending', type=int, help='PASSWORD_HASH_MAX_PENDING (default from config)')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--logins', type=int, default=200, help='logins per method')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON report path')
+    return parser.parse_args(argv)
+
+
+def seed_login_users(app):
+    """(Re)create the login users with a hash made by the configured method"""
+    with app.app_context():
+        db.create_all()
+        User.query.filter(User.email.like('login%@example.com')).delete(synchronize_session=False)
+        password_hash = get_password_hasher().hash(PASSWORD)
+        db.session.execute(insert(User), [{
+            'email': f'login{i}@example.com',
+            'password_hash': password_hash,
+            'first_name': 'Login',
+            'last_name': f'User{i}',
+            'role': 'client',
+            'is_active': True
+        } for i in range(LOGIN_USERS)])
+        db.session.commit()
+
+
+def run_logins(app, recorder, label, logins, concurrency):
+    counter = iter(range(logins))
+    lock = threading.Lock()
+
+    def worker():
+        http = app.test_client()
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            recorder.call(http, label, 'POST', '/auth/login',
+                          json={'email': f'login{n % LOGIN_USERS}@example.com', 'password': PASSWORD})
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app('benchmark')
+    if args.hash_workers is not None:
+        app.config['PASSWORD_HASH_WORKERS'] = args.hash_workers
+    if args.max_pending is not None:
+        app.config['PASSWORD_HASH_MAX_PENDING'] = args.max_pending
+
+    runs = []
+    for method in args.methods:
+        app.config['PASSWORD_HASH_METHOD'] = method
+        init_password_hasher(app)
+        seed_login_users(app)
+
+        recorder = Recorder()
+        label = f'POST /auth/login [{method}]'
+        elapsed = run_logins(app, recorder, label, args.logins, args.concurrency)
+        report = summarize(recorder, elapsed, {
+            'method': method,
+            'hash_workers': app.config['PASSWORD_HASH_WORKERS'],
+            'max_pending': app.config['PASSWORD_HASH_MAX_PENDING'],
+            'concurrency': args.concurrency,
+            'logins': args.logins
+        })
+        app.extensions['password_hasher'].shutdown()
+        runs.append(report)
+        print(format_table(report))
+
+    write_report({'runs': runs}, args.output)
+    print(f'\nreport written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark Report - latency percentiles, throughput and run comparison
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def summarize(recorder, elapsed, meta):
+    """
+    Build the machine-readable report for one run
+
+    Latencies are in milliseconds; errors counts 5xx responses, while 4xx
+    (lost accept races, etc.) are reported separately under statuses.
+    """
+    endpoints = {}
+    all_samples = []
+    for label, samples in sorted(recorder.samples.items()):
+        if label == 'warmup':
+            continue
+        ordered = sorted(samples)
+        all_samples.extend(ordered)
+        statuses = recorder.statuses[label]
+        endpoints[label] = {
+            'requests': len(ordered),
+            'errors': sum(n for status, n in statuses.items() if status >= 500),
+            'statuses': {str(status): n for status, n in sorted(statuses.items())},
+            'throughput_rps': round(len(ordered) / elapsed, 2),
+            **_latency(ordered)
+        }
+
+    all_samples.sort()
+    return {
+        'meta': {
+            **meta,
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'finished_at': datetime.utcnow().isoformat(),
+            'elapsed_seconds': round(elapsed, 3)
+        },
+        'total': {
+            'requests': len(all_samples),
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'throughput_rps': round(len(all_samples) / elapsed, 2),
+            **_latency(all_samples)
+        },
+        'endpoints': endpoints
+    }
+
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+
+
+def format_table(report):
+    """Human-readable summary of a report"""
+    lines = [f'{"endpoint":<52} {"reqs":>7} {"err":>5} {"rps":>8} {"p50":>8} {"p95":>8} {"p99":>8}']
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for label, stats in rows:
+        lines.append(
+            f'{label:<52} {stats["requests"]:>7} {stats["errors"]:>5} '
+            f'{stats["throughput_rps"]:>8.1f} {_ms(stats["p50_ms"])} {_ms(stats["p95_ms"])} '
+            f'{_ms(stats["p99_ms"])}'
+        )
+    return '\n'.join(lines)
+
+
+def compare_reports(baseline, current, metric='p95_ms'):
+    """
+    Relative change of a latency metric per endpoint
+
+    Returns:
+        list: (endpoint, baseline_ms, current_ms, change) tuples for every
+        endpoint present in both runs; change is a fraction (0.1 = 10% slower)
+    """
+    rows = []
+    for label, stats in current['endpoints'].items():
+        before = baseline['endpoints'].get(label)
+        if not before or not before.get(metric) or stats.get(metric) is None:
+            continue
+        change = (stats[metric] - before[metric]) / before[metric]
+        rows.append((label, before[metric], stats[metric], change))
+    return rows
+
+
+def _latency(ordered):
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'max_ms': ms(ordered[-1]) if ordered else None
+    }
+
+
+def _ms(value):
+    return f'{value:>8.2f}' if value is not None else f'{"-":>8}'
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,80 @@
+"""
+Benchmark Runner - seed, replay the traffic mix and write a JSON report
+
+Usage:
+    python -m benchmarks.run --scale 0.01 --duration 60 --concurrency 8
+    python -m benchmarks.run --reuse-data --sessions 5000 --output benchmarks/results/after.json
+
+The target database comes from BENCH_DATABASE_URL (SQLite file by default).
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+from app import create_app, db
+from app.middleware.query_profiler import REQUEST_LOGGER
+from app.services.location_service import location_buffer
+from benchmarks.report import summarize, write_report, format_table
+from benchmarks.seed import seed_database, describe_database
+from benchmarks.traffic import Recorder, TrafficMix, run_workers
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), 'results', 'latest.json')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Wirasasa API')
+    parser.add_argument('--scale', type=float, default=0.01,
+                        help='dataset size; 1 = 100k users, 1M jobs, 10M messages (default 0.01)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for data and traffic')
+    parser.add_argument('--reuse-data', action='store_true',
+                        help='skip seeding and replay against the existing database')
+    parser.add_argument('--duration', type=float, help='seconds to replay traffic for')
+    parser.add_argument('--sessions', type=int, help='number of user sessions to replay')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent workers')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON report path')
+    args = parser.parse_args(argv)
+    if args.duration is None and args.sessions is None:
+        args.sessions = 1000
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app('benchmark')
+    # The report has the latencies; keep only slow-query lines on stderr
+    logging.getLogger(REQUEST_LOGGER).setLevel(logging.WARNING)
+
+    with app.app_context():
+        if args.reuse_data:
+            dataset = describe_database(args.scale, args.seed)
+        else:
+            dataset = seed_database(args.scale, args.seed,
+                                    log=lambda line: print(f'seeded {line}', file=sys.stderr))
+        dialect = db.engine.dialect.name
+
+    recorder = Recorder()
+    mix = TrafficMix(app, dataset, recorder)
+    mix.warm_up(app.test_client(), random.Random(args.seed))
+    with app.app_context():
+        location_buffer.flush()
+
+    elapsed = run_workers(app, mix, duration=args.duration, sessions=args.sessions,
+                          concurrency=args.concurrency, seed=args.seed)
+
+    report = summarize(recorder, elapsed, {
+        'scale': args.scale,
+        'seed': args.seed,
+        'volumes': dataset['volumes'],
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'sessions': args.sessions,
+        'database': dialect
+    })
+    write_report(report, args.output)
+    print(format_table(report))
+    print(f'\nreport written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""
+Benchmark Seeding - bulk-loads a deterministic, production-shaped dataset
+"""
+import random
+from datetime import datetime, timedelta, time
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models.user import User, ProviderProfile
+from app.models.service import Service, ProviderService, Availability
+from app.models.job import Job, Review
+from app.models.chat import Conversation, ConversationParticipant, Message
+from app.models.notification import Notification
+from app.models.payment import Payment
+from app.services.rating_service import RatingService
+from app.services.stats_service import StatsService
+
+# Volumes at --scale 1
+FULL_SCALE = {
+    'users': 100_000,
+    'jobs': 1_000_000,
+    'messages': 10_000_000
+}
+PROVIDER_EVERY = 5            # every fifth user is a provider
+MESSAGES_PER_CONVERSATION = 25
+NOTIFICATIONS_PER_USER = 5
+INSERT_CHUNK = 10_000
+
+BENCH_PASSWORD = 'benchmark-password'
+CENTER = (-1.2864, 36.8172)   # Nairobi CBD
+SPREAD_DEGREES = 0.15         # roughly a 30km wide metro area
+
+CATALOG = {
+    'Home Repair': ['Plumbing', 'Electrical', 'Carpentry', 'Painting'],
+    'Cleaning': ['House Cleaning', 'Laundry', 'Carpet Cleaning'],
+    'Beauty': ['Hair Styling', 'Manicure', 'Massage'],
+    'Automotive': ['Car Wash', 'Mechanic', 'Tyre Change'],
+    'Moving': ['Movers', 'Furniture Assembly']
+}
+
+JOB_STATUSES = [
+    ('completed', 0.6),
+    ('cancelled', 0.1),
+    ('pending', 0.1),
+    ('accepted', 0.1),
+    ('in_progress', 0.1)
+]
+
+
+def scaled_volumes(scale):
+    """Row targets for a scale factor (1 = full production-sized volumes)"""
+    return {name: max(10, int(count * scale)) for name, count in FULL_SCALE.items()}
+
+
+def is_provider(user_id):
+    return user_id % PROVIDER_EVERY == 0
+
+
+def profile_id_for(user_id):
+    """ProviderProfile ids are assigned densely in provider order"""
+    return user_id // PROVIDER_EVERY
+
+
+def random_point(rng):
+    return (CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+            CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES))
+
+
+def seed_database(scale=0.01, seed=42, log=print):
+    """
+    Recreate the schema and fill it with synthetic data
+
+    Ids are assigned explicitly so the traffic replay can pick valid users,
+    jobs and conversations without querying for them.
+
+    Returns:
+        dict: Dataset description consumed by benchmarks.traffic
+    """
+    rng = random.Random(seed)
+    volumes = scaled_volumes(scale)
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+
+    # Services
+    services = []
+    for category, names in CATALOG.items():
+        for name in names:
+            services.append({
+                'id': len(services) + 1,
+                'name': name,
+                'category': category,
+                'description': f'{name} services',
+                'base_price': rng.choice([500, 800, 1000, 1500, 2500]),
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            })
+    _bulk(Service, services)
+    service_ids = [s['id'] for s in services]
+    log(f'services: {len(services)}')
+
+    # Users and provider profiles; one password hash shared by everybody
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    user_count = volumes['users']
+    _bulk(User, ({
+        'id': user_id,
+        'email': f'bench{user_id}@example.com',
+        'password_hash': password_hash,
+        'first_name': 'Bench',
+        'last_name': f'User{user_id}',
+        'phone': f'+2547{user_id:08d}',
+        'role': 'provider' if is_provider(user_id) else 'client',
+        'is_active': True,
+        'is_verified': True,
+        'created_at': now - timedelta(days=rng.randint(0, 730)),
+        'updated_at': now
+    } for user_id in range(1, user_count + 1)))
+    providers = [u for u in range(1, user_count + 1) if is_provider(u)]
+    clients = [u for u in range(1, user_count + 1) if not is_provider(u)]
+    log(f'users: {user_count} ({len(providers)} providers)')
+
+    _bulk(ProviderProfile, ({
+        'id': profile_id_for(user_id),
+        'user_id': user_id,
+        'bio': 'Benchmark provider',
+        'experience_years': rng.randint(0, 20),
+        'rating': round(rng.uniform(3.0, 5.0), 2),
+        'total_reviews': rng.randint(0, 200),
+        'total_jobs_completed': rng.randint(0, 500),
+        'is_available': rng.random() < 0.8,
+        'verification_status': 'verified' if rng.random() < 0.7 else 'pending',
+        'created_at': now,
+        'updated_at': now
+    } for user_id in providers))
+
+    provider_services = {}
+    rows = []
+    for user_id in providers:
+        offered = rng.sample(service_ids, rng.randint(1, 3))
+        provider_services[user_id] = offered
+        for service_id in offered:
+            rows.append({
+                'provider_id': profile_id_for(user_id),
+                'service_id': service_id,
+                'custom_price': rng.choice([None, 600, 900, 1200, 2000]),
+                'is_active': True,
+                'created_at': now
+            })
+    _bulk(ProviderService, rows)
+
+    _bulk(Availability, ({
+        'provider_id': profile_id_for(user_id),
+        'day_of_week': day,
+        'start_time': time(8, 0),
+        'end_time': time(18, 0),
+        'is_available': True,
+        'created_at': now
+    } for user_id in providers for day in range(6)))
+    log(f'provider services: {len(rows)}')
+
+    # Jobs; conversations and payments hang off the assigned ones
+    conversation_target = max(1, volumes['messages'] // MESSAGES_PER_CONVERSATION)
+    statuses, weights = zip(*JOB_STATUSES)
+    conversations = []
+    payments = []
+    reviews = []
+
+    def jobs():
+        for job_id in range(1, volumes['jobs'] + 1):
+            status = rng.choices(statuses, weights)[0]
+            service_id = rng.choice(service_ids)
+            client_id = rng.choice(clients)
+            provider_id = None if status == 'pending' else rng.choice(providers)
+            lat, lng = random_point(rng)
+            created_at = now - timedelta(minutes=rng.randint(0, 525_600))
+            price = float(rng.choice([500, 800, 1000, 1500, 2500]))
+            if provider_id and len(conversations) < conversation_target:
+                conversations.append((job_id, client_id, provider_id, created_at))
+            if status == 'completed':
+                payments.append({
+                    'job_id': job_id,
+                    'payer_id': client_id,
+                    'payee_id': provider_id,
+                    'amount': price,
+                    'currency': 'KES',
+                    'status': 'completed',
+                    'transaction_id': f'BENCH{job_id}',
+                    'payment_provider': 'mpesa',
+                    'created_at': created_at + timedelta(hours=3),
+                    'processed_at': created_at + timedelta(hours=3)
+                })
+                if rng.random() < 0.3:
+                    reviews.append({
+                        'job_id': job_id,
+                        'reviewer_id': client_id,
+                        'reviewee_id': provider_id,
+                        'rating': rng.randint(1, 5),
+                        'created_at': created_at + timedelta(hours=4)
+                    })
+            yield {
+                'id': job_id,
+                'client_id': client_id,
+                'provider_id': provider_id,
+                'service_id': service_id,
+                'title': f'Benchmark job {job_id}',
+                'description': 'Seeded for load testing',
+                'status': status,
+                'address': 'Nairobi',
+                'latitude': lat,
+                'longitude': lng,
+                'scheduled_date': created_at + timedelta(days=rng.randint(0, 14)),
+                'estimated_duration': rng.choice([60, 120, 180]),
+                'estimated_price': price,
+                'final_price': price if status == 'completed' else None,
+                'created_at': created_at,
+                'updated_at': created_at,
+                'accepted_at': created_at + timedelta(minutes=5) if provider_id else None,
+                'completed_at': created_at + timedelta(hours=3) if status == 'completed' else None
+            }
+
+    def flush_job_children():
+        # Runs after each chunk of jobs is inserted, keeping memory flat
+        # without ever referencing a job that is not in the table yet
+        for model, rows in ((Payment, payments), (Review, reviews)):
+            if rows:
+                db.session.execute(insert(model), rows)
+                rows.clear()
+
+    _bulk(Job, jobs(), after_chunk=flush_job_children)
+    log(f'jobs: {volumes["jobs"]}')
+
+    # Conversations, participants and messages
+    _bulk(Conversation, ({
+        'id': conversation_id,
+        'job_id': job_id,
+        'created_at': created_at,
+        'updated_at': created_at
+    } for conversation_id, (job_id, _, _, created_at) in enumerate(conversations, 1)))
+    _bulk(ConversationParticipant, ({
+        'conversation_id': conversation_id,
+        'user_id': user_id,
+        'joined_at': created_at,
+        'unread_count': 0
+    } for conversation_id, (_, client_id, provider_id, created_at) in enumerate(conversations, 1)
+        for user_id in (client_id, provider_id)))
+
+    def messages():
+        for message_id in range(1, volumes['messages'] + 1):
+            conversation_id = rng.randint(1, len(conversations))
+            _, client_id, provider_id, created_at = conversations[conversation_id - 1]
+            yield {
+                'id': message_id,
+                'conversation_id': conversation_id,
+                'sender_id': client_id if message_id % 2 else provider_id,
+                'content': 'Benchmark message',
+                'message_type': 'text',
+                'is_read': True,
+                'created_at': created_at + timedelta(seconds=message_id % 86_400)
+            }
+
+    _bulk(Message, messages())
+    log(f'messages: {volumes["messages"]} in {len(conversations)} conversations')
+
+    _bulk(Notification, ({
+        'user_id': user_id,
+        'type': 'job_update',
+        'title': 'Benchmark notification',
+        'message': 'Seeded for load testing',
+        'is_read': rng.random() < 0.7,
+        'created_at': now - timedelta(minutes=rng.randint(0, 43_200))
+    } for user_id in range(1, user_count + 1) for _ in range(NOTIFICATIONS_PER_USER)))
+    log(f'notifications: {user_count * NOTIFICATIONS_PER_USER}')
+
+    # Derive profile ratings from the seeded reviews, as production would have them
+    _, corrected = RatingService().reconcile(batch_size=INSERT_CHUNK)
+    log(f'ratings: {corrected} profiles reconciled')
+    _, written = StatsService().rebuild()
+    log(f'dashboard stats: {written} daily rollups')
+
+    _reset_sequences()
+
+    return {
+        'scale': scale,
+        'seed': seed,
+        'volumes': volumes,
+        'clients': clients,
+        'providers': providers,
+        'provider_services': provider_services,
+        'service_ids': service_ids,
+        'conversations': [(client_id, provider_id) for _, client_id, provider_id, _ in conversations]
+    }
+
+
+def describe_database(scale=0.01, seed=42):
+    """
+    Rebuild the dataset description for an already seeded database
+
+    Reads back the ids the replay needs, so a large dataset only has to be
+    loaded once.
+    """
+    volumes = scaled_volumes(scale)
+    user_count = volumes['users']
+    providers = [u for u in range(1, user_count + 1) if is_provider(u)]
+    clients = [u for u in range(1, user_count + 1) if not is_provider(u)]
+    service_ids = [s for s, _ in db.session.query(Service.id, Service.name).order_by(Service.id)]
+
+    provider_services = {
+        provider_id: [ps for (ps,) in db.session.query(ProviderService.service_id).filter(
+            ProviderService.provider_id == profile_id_for(provider_id)
+        )]
+        for provider_id in providers
+    }
+    participants = {}
+    for conversation_id, user_id in db.session.query(
+        ConversationParticipant.conversation_id, ConversationParticipant.user_id
+    ).order_by(ConversationParticipant.id):
+        participants.setdefault(conversation_id, []).append(user_id)
+
+    return {
+        'scale': scale,
+        'seed': seed,
+        'volumes': volumes,
+        'clients': clients,
+        'providers': providers,
+        'provider_services': provider_services,
+        'service_ids': service_ids,
+        'conversations': [tuple(users) for _, users in sorted(participants.items())]
+    }
+
+
+def _bulk(model, rows, after_chunk=None):
+    """executemany INSERTs in chunks, committed once at the end"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK:
+            db.session.execute(insert(model), chunk)
+            chunk = []
+            if after_chunk:
+                after_chunk()
+    if chunk:
+        db.session.execute(insert(model), chunk)
+    if after_chunk:
+        after_chunk()
+    db.session.commit()
+
+
+def _reset_sequences():
+    """Move PostgreSQL id sequences past the explicitly inserted ids"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in db.metadata.sorted_tables:
+        if 'id' in table.c and table.c.id.primary_key:
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            ))
+    db.session.commit()
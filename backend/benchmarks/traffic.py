@@ -0,0 +1,229 @@
+"""
+Benchmark Traffic - weighted client/provider request mix and latency recording
+"""
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.models.job import JobOffer
+from benchmarks.seed import random_point, is_provider
+
+API = '/api/v1'
+
+# Share of sessions spent in each flow; roughly what the mobile apps send
+FLOW_WEIGHTS = {
+    'location_updates': 30,
+    'nearby_search': 20,
+    'chat': 20,
+    'client_browse': 15,
+    'job_lifecycle': 10,
+    'payments': 5
+}
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency samples and status counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def call(self, http, label, method, url, token=None, json=None):
+        """Send one request and record how long it took under label"""
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        response = http.open(API + url, method=method, json=json, headers=headers)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[label].append(elapsed)
+            self.statuses[label][response.status_code] += 1
+        return response
+
+
+class TrafficMix:
+    """
+    Replays user sessions against a seeded dataset
+
+    Each session picks a flow by FLOW_WEIGHTS and runs its requests in order,
+    so multi-step flows (create, accept, complete, review) exercise the same
+    state transitions real users do.
+    """
+
+    def __init__(self, app, dataset, recorder):
+        self.app = app
+        self.dataset = dataset
+        self.recorder = recorder
+        self._tokens = {}
+        self.flows = [getattr(self, name) for name in FLOW_WEIGHTS]
+        self.weights = list(FLOW_WEIGHTS.values())
+        self.scheduled_date = self._next_monday_morning()
+
+    def run_session(self, http, rng):
+        """Run one randomly chosen flow"""
+        rng.choices(self.flows, self.weights)[0](http, rng)
+
+    def token(self, user_id):
+        # Tokens are deterministic per user, so a racing duplicate is harmless
+        token = self._tokens.get(user_id)
+        if token is None:
+            with self.app.app_context():
+                role = 'provider' if is_provider(user_id) else 'client'
+                token = self._tokens[user_id] = create_access_token(
+                    identity=user_id, additional_claims={'role': role, 'is_active': True}
+                )
+        return token
+
+    def warm_up(self, http, rng):
+        """Report every provider's position once so proximity queries have data"""
+        for provider_id in self.dataset['providers']:
+            lat, lng = random_point(rng)
+            self.recorder.call(http, 'warmup', 'POST', '/providers/location/update',
+                               self.token(provider_id), {'latitude': lat, 'longitude': lng})
+
+    # Flows
+
+    def location_updates(self, http, rng):
+        provider = self.token(rng.choice(self.dataset['providers']))
+        lat, lng = random_point(rng)
+        call = self.recorder.call
+        call(http, 'POST /providers/location/update', 'POST', '/providers/location/update',
+             provider, {'latitude': lat, 'longitude': lng})
+        fixes = [{'latitude': lat + i * 0.0001, 'longitude': lng, 'timestamp': time.time() - 5 + i}
+                 for i in range(5)]
+        call(http, 'POST /providers/location/batch', 'POST', '/providers/location/batch',
+             provider, {'locations': fixes})
+
+    def nearby_search(self, http, rng):
+        client = self.token(rng.choice(self.dataset['clients']))
+        lat, lng = random_point(rng)
+        self.recorder.call(http, 'POST /providers/nearby', 'POST', '/providers/nearby', client, {
+            'latitude': lat,
+            'longitude': lng,
+            'serviceType': rng.choice(self.dataset['service_ids']),
+            'radius': rng.choice([5, 10, 20]),
+            'limit': 20
+        })
+
+    def chat(self, http, rng):
+        conversations = self.dataset['conversations']
+        conversation_id = rng.randint(1, len(conversations))
+        user = self.token(rng.choice(conversations[conversation_id - 1]))
+        base = f'/chat/conversations/{conversation_id}'
+        call = self.recorder.call
+
+        call(http, 'GET /chat/conversations', 'GET', '/chat/conversations', user)
+        page = call(http, 'GET /chat/conversations/<id>/messages', 'GET',
+                    f'{base}/messages?limit=50', user).get_json() or {}
+        sent = call(http, 'POST /chat/conversations/<id>/messages', 'POST', f'{base}/messages',
+                    user, {'content': 'Benchmark reply'}).get_json() or {}
+        since_id = sent.get('id') or (page.get('items') or [{}])[0].get('id', 0)
+        call(http, 'GET /chat/conversations/<id>/messages?since_id', 'GET',
+             f'{base}/messages?since_id={since_id}', user)
+        call(http, 'POST /chat/conversations/<id>/read', 'POST', f'{base}/read', user)
+
+    def client_browse(self, http, rng):
+        client = self.token(rng.choice(self.dataset['clients']))
+        call = self.recorder.call
+        call(http, 'GET /services', 'GET', '/services', client)
+        call(http, 'GET /me/badges', 'GET', '/me/badges', client)
+        call(http, 'GET /notifications', 'GET', '/notifications?limit=20', client)
+        call(http, 'GET /jobs/upcoming', 'GET', '/jobs/upcoming?limit=20', client)
+        call(http, 'GET /jobs/history', 'GET', '/jobs/history?limit=20', client)
+
+    def job_lifecycle(self, http, rng):
+        client_id = rng.choice(self.dataset['clients'])
+        client = self.token(client_id)
+        lat, lng = random_point(rng)
+        call = self.recorder.call
+
+        job = call(http, 'POST /jobs', 'POST', '/jobs', client, {
+            'service_id': rng.choice(self.dataset['service_ids']),
+            'title': 'Benchmark request',
+            'description': 'Created by the load test',
+            'latitude': lat,
+            'longitude': lng,
+            'scheduled_date': self.scheduled_date,
+            'estimated_price': rng.choice([500, 1000, 1500])
+        }).get_json() or {}
+        job_id = job.get('id')
+        if not job_id:
+            return
+
+        # Whoever dispatch offered the job sees it in their feed and races to accept
+        winner = None
+        for provider_id in self._offered_providers(job_id):
+            provider = self.token(provider_id)
+            call(http, 'GET /jobs/available', 'GET', '/jobs/available?limit=20', provider)
+            accepted = call(http, 'POST /jobs/<id>/accept', 'POST', f'/jobs/{job_id}/accept', provider)
+            if accepted.status_code == 200:
+                winner = provider
+                break
+
+        if winner is None:
+            call(http, 'POST /jobs/<id>/cancel', 'POST', f'/jobs/{job_id}/cancel', client)
+            return
+
+        call(http, 'POST /jobs/<id>/complete', 'POST', f'/jobs/{job_id}/complete', winner)
+        call(http, 'POST /jobs/<id>/review', 'POST', f'/jobs/{job_id}/review', client,
+             {'rating': rng.randint(3, 5), 'comment': 'Benchmark review'})
+
+    def payments(self, http, rng):
+        user = self.token(rng.randint(1, self.dataset['volumes']['users']))
+        self.recorder.call(http, 'GET /payments/history', 'GET', '/payments/history?limit=20', user)
+
+    def _next_monday_morning(self):
+        """
+        Local 10:00 next Monday, inside every seeded schedule
+
+        Jobs are booked for it so dispatch finds the same providers free
+        whatever day and time the benchmark runs.
+        """
+        now = datetime.utcnow() + timedelta(hours=self.app.config['LOCAL_UTC_OFFSET_HOURS'])
+        monday = now.date() + timedelta(days=7 - now.weekday())
+        return datetime.combine(monday, datetime.min.time()).replace(hour=10).isoformat()
+
+    def _offered_providers(self, job_id):
+        with self.app.app_context():
+            return [provider_id for (provider_id,) in JobOffer.query.with_entities(
+                JobOffer.provider_id
+            ).filter_by(job_id=job_id, status='offered')]
+
+
+def run_workers(app, mix, duration=None, sessions=None, concurrency=4, seed=42):
+    """
+    Drive the mix from several threads until duration or sessions run out
+
+    Returns:
+        float: Wall-clock seconds spent
+    """
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [sessions]
+    lock = threading.Lock()
+
+    def take():
+        with lock:
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return deadline is None or time.perf_counter() < deadline
+
+    def worker(index):
+        # No app context is held here: each request pushes and tears down
+        # its own, so sessions are scoped exactly as under a real server
+        rng = random.Random(seed + index)
+        http = app.test_client()
+        while take():
+            mix.run_session(http, rng)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), name=f'bench-{i}')
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
@@ -21,6 +21,117 @@ class Config:
     # Upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+    
+    # Rendered invoices, stored by content hash (share it between workers);
+    # bulk generation runs on INVOICE_WORKERS threads
+    INVOICE_DIR = os.environ.get('INVOICE_DIR') or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'invoices')
+    INVOICE_WORKERS = int(os.environ.get('INVOICE_WORKERS', 4))
+    INVOICE_TAX_RATE = float(os.environ.get('INVOICE_TAX_RATE', 0.0))
+    
+    # Provider location ingest: seconds between bulk flushes to provider_locations
+    LOCATION_FLUSH_INTERVAL = int(os.environ.get('LOCATION_FLUSH_INTERVAL', 5))
+    # Each worker loads fixes flushed by the others into its spatial index at
+    # most this often (and on first use, so a restarted worker starts warm)
+    LOCATION_SYNC_INTERVAL = int(os.environ.get('LOCATION_SYNC_INTERVAL', 5))
+    
+    # Job dispatch: offers go to DISPATCH_OFFER_SIZE providers per wave within
+    # DISPATCH_RADIUS_KM, each wave expiring after DISPATCH_OFFER_TIMEOUT seconds;
+    # jobs still unmatched after DISPATCH_MAX_WAVES waves (or that long) are closed
+    DISPATCH_OFFER_SIZE = int(os.environ.get('DISPATCH_OFFER_SIZE', 3))
+    DISPATCH_OFFER_TIMEOUT = int(os.environ.get('DISPATCH_OFFER_TIMEOUT', 60))
+    DISPATCH_MAX_WAVES = int(os.environ.get('DISPATCH_MAX_WAVES', 3))
+    DISPATCH_RADIUS_KM = float(os.environ.get('DISPATCH_RADIUS_KM', 15))
+    DISPATCH_INTERVAL = int(os.environ.get('DISPATCH_INTERVAL', 5))
+    
+    # Payment gateway used to look up payment outcomes: fake (in-memory) or daraja
+    PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY') or \
+        ('daraja' if os.environ.get('MPESA_CONSUMER_KEY') else 'fake')
+    MPESA_API_URL = os.environ.get('MPESA_API_URL', 'https://sandbox.safaricom.co.ke')
+    MPESA_CONSUMER_KEY = os.environ.get('MPESA_CONSUMER_KEY')
+    MPESA_CONSUMER_SECRET = os.environ.get('MPESA_CONSUMER_SECRET')
+    MPESA_SHORTCODE = os.environ.get('MPESA_SHORTCODE')
+    MPESA_PASSKEY = os.environ.get('MPESA_PASSKEY')
+    
+    # M-Pesa callbacks are stored on arrival and applied by MPESA_CALLBACK_WORKERS
+    # threads per process, MPESA_CALLBACK_BATCH_SIZE at a time; callbacks stored
+    # by other processes are picked up every MPESA_CALLBACK_POLL_INTERVAL seconds
+    MPESA_CALLBACK_WORKERS = int(os.environ.get('MPESA_CALLBACK_WORKERS', 2))
+    MPESA_CALLBACK_BATCH_SIZE = int(os.environ.get('MPESA_CALLBACK_BATCH_SIZE', 100))
+    MPESA_CALLBACK_POLL_INTERVAL = int(os.environ.get('MPESA_CALLBACK_POLL_INTERVAL', 5))
+    
+    # Payment status checks: answers are cached for PAYMENT_STATUS_CACHE_SECONDS;
+    # ?wait= long polls are held at most PAYMENT_STATUS_MAX_WAIT seconds and
+    # re-read the status every PAYMENT_STATUS_RECHECK_SECONDS in case another
+    # worker settled the payment
+    PAYMENT_STATUS_CACHE_SECONDS = float(os.environ.get('PAYMENT_STATUS_CACHE_SECONDS', 2))
+    PAYMENT_STATUS_MAX_WAIT = int(os.environ.get('PAYMENT_STATUS_MAX_WAIT', 25))
+    PAYMENT_STATUS_RECHECK_SECONDS = float(os.environ.get('PAYMENT_STATUS_RECHECK_SECONDS', 5))
+    
+    # Payment reconciliation: every PAYMENT_RECONCILE_INTERVAL seconds, M-Pesa
+    # payments unsettled for PAYMENT_RECONCILE_MIN_AGE seconds are looked up at
+    # the gateway, PAYMENT_RECONCILE_BATCH_SIZE at a time with at most
+    # PAYMENT_RECONCILE_CONCURRENCY queries in flight; those still unknown after
+    # PAYMENT_RECONCILE_EXPIRE_AFTER seconds are marked failed
+    PAYMENT_RECONCILE_INTERVAL = int(os.environ.get('PAYMENT_RECONCILE_INTERVAL', 300))
+    PAYMENT_RECONCILE_MIN_AGE = int(os.environ.get('PAYMENT_RECONCILE_MIN_AGE', 120))
+    PAYMENT_RECONCILE_EXPIRE_AFTER = int(os.environ.get('PAYMENT_RECONCILE_EXPIRE_AFTER', 24 * 3600))
+    PAYMENT_RECONCILE_BATCH_SIZE = int(os.environ.get('PAYMENT_RECONCILE_BATCH_SIZE', 200))
+    PAYMENT_RECONCILE_CONCURRENCY = int(os.environ.get('PAYMENT_RECONCILE_CONCURRENCY', 8))
+    
+    # Provider search: each worker rebuilds its in-memory index this often to
+    # pick up changes committed by other workers
+    SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 300))
+    
+    # Provider ranking score: the rating average after adding RATING_PRIOR_WEIGHT
+    # reviews of RATING_PRIOR_MEAN; run `flask reconcile-ratings` after changing
+    RATING_PRIOR_MEAN = float(os.environ.get('RATING_PRIOR_MEAN', 4.0))
+    RATING_PRIOR_WEIGHT = int(os.environ.get('RATING_PRIOR_WEIGHT', 5))
+    
+    # Local time (Nairobi is UTC+3): availability schedules and job scheduled
+    # dates are local wall-clock times
+    LOCAL_UTC_OFFSET_HOURS = int(os.environ.get('LOCAL_UTC_OFFSET_HOURS', 3))
+    
+    # Provider dashboard rollups are bucketed by local day
+    DASHBOARD_UTC_OFFSET_HOURS = int(os.environ.get('DASHBOARD_UTC_OFFSET_HOURS', LOCAL_UTC_OFFSET_HOURS))
+    
+    # Unread badge counters are recounted from notifications and conversations
+    # every BADGE_RECONCILE_INTERVAL seconds (run it on one worker, or use
+    # `flask reconcile-badges` from cron)
+    BADGE_RECONCILE_INTERVAL = int(os.environ.get('BADGE_RECONCILE_INTERVAL', 3600))
+    
+    # Real-time events: memory:// fans out within one process, redis://... across workers
+    BROKER_URL = os.environ.get('BROKER_URL', 'memory://')
+    SSE_HEARTBEAT_SECONDS = 15
+    
+    # Request profiling: statements slower than this are logged at WARNING;
+    # PROFILE_SAMPLE_RATE of requests (0.0-1.0) are dumped as cProfile stats
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    
+    # Password hashing runs in a pool of PASSWORD_HASH_WORKERS processes; at
+    # most PASSWORD_HASH_MAX_PENDING hashes wait or run at once and the rest
+    # get a 503 after PASSWORD_HASH_QUEUE_TIMEOUT seconds. Changing the method
+    # (e.g. scrypt:65536:8:1, pbkdf2:sha256:600000) rehashes users on login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+    
+    # HTTP caching of the service catalog and provider profiles: clients may
+    # reuse responses for *_CACHE_MAX_AGE seconds; each worker re-checks the
+    # data revision at most every CACHE_REVALIDATE_SECONDS (local writes apply
+    # immediately)
+    CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', 300))
+    PROFILE_CACHE_MAX_AGE = int(os.environ.get('PROFILE_CACHE_MAX_AGE', 60))
+    CACHE_REVALIDATE_SECONDS = int(os.environ.get('CACHE_REVALIDATE_SECONDS', 30))
+    
+    # Response compression: bodies smaller than COMPRESS_MIN_SIZE bytes are
+    # sent as-is; brotli is used when installed and accepted by the client
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
 
 
 class DevelopmentConfig(Config):
@@ -42,11 +153,37 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///wirasasa_test.db'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
+    LOCATION_FLUSH_INTERVAL = 0  # flush explicitly in tests
+    LOCATION_SYNC_INTERVAL = 0
+    DISPATCH_INTERVAL = 0
+    MPESA_CALLBACK_WORKERS = 0  # apply callbacks inline
+    PAYMENT_GATEWAY = 'fake'
+    PAYMENT_RECONCILE_INTERVAL = 0
+    BADGE_RECONCILE_INTERVAL = 0
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # fast hashes, inline
+    PASSWORD_HASH_WORKERS = 0
+    CACHE_REVALIDATE_SECONDS = 0
+    SEARCH_INDEX_MAX_AGE = 0
+    PAYMENT_STATUS_CACHE_SECONDS = 0
+    INVOICE_WORKERS = 0
+
+
+class BenchmarkConfig(Config):
+    """Benchmark configuration (see benchmarks/)"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL') or \
+        'sqlite:///wirasasa_bench.db'
+    # Background threads would add noise; the harness drives them itself
+    LOCATION_FLUSH_INTERVAL = 0
+    DISPATCH_INTERVAL = 0
+    MPESA_CALLBACK_WORKERS = 0
+    PAYMENT_RECONCILE_INTERVAL = 0
+    BADGE_RECONCILE_INTERVAL = 0
 
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
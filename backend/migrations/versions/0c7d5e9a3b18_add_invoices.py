@@ -0,0 +1,34 @@
+"""Add invoices
+
+Revision ID: 0c7d5e9a3b18
+Revises: f3b9e6a2d845
+Create Date: 2026-10-18 18:47:03.552190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c7d5e9a3b18'
+down_revision = 'f3b9e6a2d845'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('invoices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job_id')
+    )
+
+
+def downgrade():
+    op.drop_table('invoices')
@@ -0,0 +1,27 @@
+"""Add invoice source version
+
+Revision ID: 2f7c9a4e6b81
+Revises: 8e1b4d7a2c39
+Create Date: 2026-10-18 21:40:55.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f7c9a4e6b81'
+down_revision = '8e1b4d7a2c39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left empty: each existing invoice is generated again on its next fetch
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_column('source_version')
@@ -0,0 +1,37 @@
+"""Add provider locations
+
+Revision ID: 3c1d8e7f2a94
+Revises: af5b9660e539
+Create Date: 2026-10-18 10:55:12.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d8e7f2a94'
+down_revision = 'af5b9660e539'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('provider_locations',
+    sa.Column('provider_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('provider_id')
+    )
+    with op.batch_alter_table('provider_locations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_provider_locations_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('provider_locations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_provider_locations_updated_at'))
+
+    op.drop_table('provider_locations')
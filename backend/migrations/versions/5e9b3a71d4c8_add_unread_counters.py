@@ -0,0 +1,45 @@
+"""Add unread counters
+
+Revision ID: 5e9b3a71d4c8
+Revises: c48a0f3b9e21
+Create Date: 2026-10-18 11:41:36.092415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b3a71d4c8'
+down_revision = 'c48a0f3b9e21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('unread_counters',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('unread_notifications', sa.Integer(), nullable=False),
+    sa.Column('unread_messages', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('conversation_participants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill per-conversation counts; per-user rows are initialised on first read
+    op.execute("""
+        UPDATE conversation_participants SET unread_count = (
+            SELECT COUNT(*) FROM messages
+            WHERE messages.conversation_id = conversation_participants.conversation_id
+              AND messages.sender_id != conversation_participants.user_id
+              AND messages.is_read = false
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('conversation_participants', schema=None) as batch_op:
+        batch_op.drop_column('unread_count')
+
+    op.drop_table('unread_counters')
@@ -0,0 +1,38 @@
+"""Add provider lifetime stats rows
+
+Revision ID: 6a3f8d2c1e75
+Revises: 0c7d5e9a3b18
+Create Date: 2026-10-18 20:11:37.204816
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3f8d2c1e75'
+down_revision = '0c7d5e9a3b18'
+branch_labels = None
+depends_on = None
+
+LIFETIME_DAY = sa.bindparam('day', date(1, 1, 1), type_=sa.Date)  # StatsService.LIFETIME_DAY
+
+
+def upgrade():
+    # Seed each provider's cumulative row from the daily rows already there;
+    # StatsService keeps it current from here on
+    op.execute(sa.text(
+        'INSERT INTO provider_daily_stats '
+        '(provider_id, day, jobs_completed, jobs_cancelled, earnings, payments, rating_sum, reviews) '
+        'SELECT provider_id, :day, SUM(jobs_completed), SUM(jobs_cancelled), '
+        'SUM(earnings), SUM(payments), SUM(rating_sum), SUM(reviews) '
+        'FROM provider_daily_stats WHERE day <> :day GROUP BY provider_id'
+    ).bindparams(LIFETIME_DAY))
+
+
+def downgrade():
+    op.execute(sa.text(
+        'DELETE FROM provider_daily_stats WHERE day = :day'
+    ).bindparams(LIFETIME_DAY))
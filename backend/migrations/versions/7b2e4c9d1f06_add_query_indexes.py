@@ -0,0 +1,102 @@
+"""Add indexes for service query paths
+
+Revision ID: 7b2e4c9d1f06
+Revises: 3c1d8e7f2a94
+Create Date: 2026-10-18 11:02:47.518630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c9d1f06'
+down_revision = '3c1d8e7f2a94'
+branch_labels = None
+depends_on = None
+
+
+PENDING_UNASSIGNED = sa.text("status = 'pending' AND provider_id IS NULL")
+UNREAD = sa.text("is_read = false")
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_client_id_created_at', ['client_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_jobs_provider_id_created_at', ['provider_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_jobs_pending_unassigned', ['created_at', 'id'], unique=False,
+                              postgresql_where=PENDING_UNASSIGNED, sqlite_where=PENDING_UNASSIGNED)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reviews_job_id'), ['job_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_reviews_reviewee_id'), ['reviewee_id'], unique=False)
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_conversations_job_id'), ['job_id'], unique=False)
+
+    with op.batch_alter_table('conversation_participants', schema=None) as batch_op:
+        batch_op.create_index('ix_conversation_participants_conversation_id_user_id', ['conversation_id', 'user_id'], unique=False)
+        batch_op.create_index('ix_conversation_participants_user_id_conversation_id', ['user_id', 'conversation_id'], unique=False)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_conversation_id_created_at', ['conversation_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_notifications_user_id_unread', ['user_id'], unique=False,
+                              postgresql_where=UNREAD, sqlite_where=UNREAD)
+
+    with op.batch_alter_table('payment_methods', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payment_methods_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payments_job_id'), ['job_id'], unique=False)
+        batch_op.create_index('ix_payments_payer_id_created_at', ['payer_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_payments_payee_id_created_at', ['payee_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('provider_services', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_provider_services_provider_id'), ['provider_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_provider_services_service_id'), ['service_id'], unique=False)
+
+    with op.batch_alter_table('availability', schema=None) as batch_op:
+        batch_op.create_index('ix_availability_provider_id_day_of_week', ['provider_id', 'day_of_week'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('availability', schema=None) as batch_op:
+        batch_op.drop_index('ix_availability_provider_id_day_of_week')
+
+    with op.batch_alter_table('provider_services', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_provider_services_service_id'))
+        batch_op.drop_index(batch_op.f('ix_provider_services_provider_id'))
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_payee_id_created_at')
+        batch_op.drop_index('ix_payments_payer_id_created_at')
+        batch_op.drop_index(batch_op.f('ix_payments_job_id'))
+
+    with op.batch_alter_table('payment_methods', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payment_methods_user_id'))
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id_unread')
+        batch_op.drop_index('ix_notifications_user_id_created_at')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_conversation_id_created_at')
+
+    with op.batch_alter_table('conversation_participants', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversation_participants_user_id_conversation_id')
+        batch_op.drop_index('ix_conversation_participants_conversation_id_user_id')
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_conversations_job_id'))
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reviews_reviewee_id'))
+        batch_op.drop_index(batch_op.f('ix_reviews_job_id'))
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_pending_unassigned')
+        batch_op.drop_index('ix_jobs_provider_id_created_at')
+        batch_op.drop_index('ix_jobs_client_id_created_at')
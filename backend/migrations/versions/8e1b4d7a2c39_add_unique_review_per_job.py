@@ -0,0 +1,32 @@
+"""Add unique review per job and reviewer
+
+Revision ID: 8e1b4d7a2c39
+Revises: 6a3f8d2c1e75
+Create Date: 2026-10-18 21:02:18.630457
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1b4d7a2c39'
+down_revision = '6a3f8d2c1e75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the first of any duplicate reviews; run `flask reconcile-ratings` and
+    # `flask rebuild-dashboard-stats` afterwards if any were removed
+    op.execute(sa.text(
+        'DELETE FROM reviews WHERE id NOT IN '
+        '(SELECT MIN(id) FROM reviews GROUP BY job_id, reviewer_id)'
+    ))
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_reviews_job_id_reviewer_id', ['job_id', 'reviewer_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_reviews_job_id_reviewer_id', type_='unique')
@@ -0,0 +1,33 @@
+"""Add provider rating aggregates
+
+Revision ID: 9d4f2b6a8c13
+Revises: 5e9b3a71d4c8
+Create Date: 2026-10-18 13:05:12.447120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f2b6a8c13'
+down_revision = '5e9b3a71d4c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_score', sa.Float(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_provider_profiles_rating_score'), ['rating_score'], unique=False)
+
+    # rating, total_reviews and rating_score are filled by `flask reconcile-ratings`,
+    # which needs the configured prior
+
+
+def downgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_provider_profiles_rating_score'))
+        batch_op.drop_column('rating_score')
+        batch_op.drop_column('rating_sum')
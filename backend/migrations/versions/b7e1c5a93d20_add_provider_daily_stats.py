@@ -0,0 +1,46 @@
+"""Add provider daily stats rollups
+
+Revision ID: b7e1c5a93d20
+Revises: 9d4f2b6a8c13
+Create Date: 2026-10-18 14:22:40.913584
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1c5a93d20'
+down_revision = '9d4f2b6a8c13'
+branch_labels = None
+depends_on = None
+
+
+ACTIVE = sa.text("status IN ('accepted', 'in_progress')")
+
+
+def upgrade():
+    op.create_table('provider_daily_stats',
+    sa.Column('provider_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('jobs_completed', sa.Integer(), nullable=False),
+    sa.Column('jobs_cancelled', sa.Integer(), nullable=False),
+    sa.Column('earnings', sa.Float(), nullable=False),
+    sa.Column('payments', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('reviews', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('provider_id', 'day')
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_provider_id_active', ['provider_id'], unique=False,
+                              postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+
+    # Rows are backfilled by `flask rebuild-dashboard-stats`
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_provider_id_active')
+
+    op.drop_table('provider_daily_stats')
@@ -0,0 +1,50 @@
+"""Add job offers
+
+Revision ID: c48a0f3b9e21
+Revises: 7b2e4c9d1f06
+Create Date: 2026-10-18 11:20:05.731942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c48a0f3b9e21'
+down_revision = '7b2e4c9d1f06'
+branch_labels = None
+depends_on = None
+
+
+LIVE = sa.text("status = 'offered'")
+
+
+def upgrade():
+    op.create_table('job_offers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('provider_id', sa.Integer(), nullable=False),
+    sa.Column('wave', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('offered_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('responded_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_offers', schema=None) as batch_op:
+        batch_op.create_index('ix_job_offers_job_id_status', ['job_id', 'status'], unique=False)
+        batch_op.create_index('ix_job_offers_provider_id_status', ['provider_id', 'status', 'expires_at'], unique=False)
+        batch_op.create_index('ix_job_offers_live_expires_at', ['expires_at'], unique=False,
+                              postgresql_where=LIVE, sqlite_where=LIVE)
+
+
+def downgrade():
+    with op.batch_alter_table('job_offers', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_offers_live_expires_at')
+        batch_op.drop_index('ix_job_offers_provider_id_status')
+        batch_op.drop_index('ix_job_offers_job_id_status')
+
+    op.drop_table('job_offers')
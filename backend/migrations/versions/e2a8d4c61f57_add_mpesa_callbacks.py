@@ -0,0 +1,43 @@
+"""Add M-Pesa callback inbox
+
+Revision ID: e2a8d4c61f57
+Revises: b7e1c5a93d20
+Create Date: 2026-10-18 16:05:12.418277
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8d4c61f57'
+down_revision = 'b7e1c5a93d20'
+branch_labels = None
+depends_on = None
+
+
+RECEIVED = sa.text("status = 'received'")
+
+
+def upgrade():
+    op.create_table('mpesa_callbacks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('checkout_request_id', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('checkout_request_id')
+    )
+    with op.batch_alter_table('mpesa_callbacks', schema=None) as batch_op:
+        batch_op.create_index('ix_mpesa_callbacks_received', ['id'], unique=False,
+                              postgresql_where=RECEIVED, sqlite_where=RECEIVED)
+
+
+def downgrade():
+    with op.batch_alter_table('mpesa_callbacks', schema=None) as batch_op:
+        batch_op.drop_index('ix_mpesa_callbacks_received')
+
+    op.drop_table('mpesa_callbacks')
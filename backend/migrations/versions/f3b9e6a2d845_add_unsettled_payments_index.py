@@ -0,0 +1,30 @@
+"""Add partial index on unsettled payments
+
+Revision ID: f3b9e6a2d845
+Revises: e2a8d4c61f57
+Create Date: 2026-10-18 17:31:48.205634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9e6a2d845'
+down_revision = 'e2a8d4c61f57'
+branch_labels = None
+depends_on = None
+
+
+UNSETTLED = sa.text("status IN ('pending', 'processing')")
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_unsettled_created_at', ['created_at', 'id'], unique=False,
+                              postgresql_where=UNSETTLED, sqlite_where=UNSETTLED)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_unsettled_created_at')
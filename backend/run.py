@@ -13,10 +13,11 @@ def make_shell_context():
     """Make database and models available in Flask shell"""
     from app.models.user import User, ProviderProfile
     from app.models.service import Service, ProviderService, Availability
-    from app.models.job import Job, Review
+    from app.models.job import Job, JobOffer, Review
     from app.models.payment import PaymentMethod, Payment
-    from app.models.notification import Notification
+    from app.models.notification import Notification, UnreadCounter
     from app.models.chat import Conversation, ConversationParticipant, Message
+    from app.models.location import ProviderLocation
     
     return {
         'db': db,
@@ -26,13 +27,16 @@ def make_shell_context():
         'ProviderService': ProviderService,
         'Availability': Availability,
         'Job': Job,
+        'JobOffer': JobOffer,
         'Review': Review,
         'PaymentMethod': PaymentMethod,
         'Payment': Payment,
         'Notification': Notification,
+        'UnreadCounter': UnreadCounter,
         'Conversation': Conversation,
         'ConversationParticipant': ConversationParticipant,
-        'Message': Message
+        'Message': Message,
+        'ProviderLocation': ProviderLocation
     }
 
 
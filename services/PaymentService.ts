@@ -85,9 +85,11 @@ class PaymentService {
   }
 
   /**
-   * Check M-Pesa payment status
+   * Check M-Pesa payment status. The server holds the request for up to
+   * `waitSeconds` while the payment is pending and answers as soon as it
+   * settles, so callers should not poll in a tight loop.
    */
-  async checkMpesaPaymentStatus(transactionId: string): Promise<{
+  async checkMpesaPaymentStatus(transactionId: string, waitSeconds: number = 25): Promise<{
     status: 'pending' | 'success' | 'failed';
     message?: string;
   }> {
@@ -96,6 +98,8 @@ class PaymentService {
       const response = await axios.get(
         `${API_URL}/payments/mpesa/status/${transactionId}`,
         {
+          params: { wait: waitSeconds },
+          timeout: (waitSeconds + 10) * 1000,
           headers: {
             Authorization: `Bearer ${token}`,
           },